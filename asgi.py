@@ -0,0 +1,38 @@
+# asgi.py
+#
+# Mode ASGI (satu event loop untuk semua request):
+#
+#     uvicorn asgi:app --host 0.0.0.0 --port 8000
+#     python asgi.py
+#
+# View async (``/chat``, upload, long-poll, SSE) berjalan sebagai coroutine di
+# loop server, sehingga request yang sedang menunggu LLM/MCP tidak menahan
+# thread. Jalankan satu proses per core (mis. ``--workers``) jika CPU menjadi
+# batas; mode WSGI (``gunicorn -c gunicorn.conf.py``) tetap tersedia.
+
+from chats.base import create_app, shutdown_async, warm_up_async
+from config.mcp_settings import MCPSettings
+from utils.asgi import FlaskASGI
+
+flask_app = create_app()
+
+app = FlaskASGI(
+    flask_app,
+    on_startup=[lambda: warm_up_async(flask_app)],
+    on_shutdown=[lambda: shutdown_async(flask_app)],
+)
+
+if __name__ == "__main__":
+    import uvicorn
+
+    settings = MCPSettings()
+    host, _, port = settings.server_bind.rpartition(":")
+    uvicorn.run(
+        "asgi:app",
+        host=host or "0.0.0.0",
+        port=int(port),
+        timeout_keep_alive=5,
+        timeout_graceful_shutdown=settings.server_timeout_sec,
+        backlog=settings.server_backlog,
+        limit_concurrency=settings.server_max_connections or None,
+    )
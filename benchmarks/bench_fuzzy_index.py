@@ -0,0 +1,124 @@
+"""
+Benchmark resolusi nama proyek KAK: ``utils.helper.best_match`` (difflib, linear)
+vs ``utils.fuzzy_index.TrigramIndex``.
+
+Jalankan dari root repo:
+
+    python -m benchmarks.bench_fuzzy_index
+    python -m benchmarks.bench_fuzzy_index --sizes 1000 10000 100000 --queries 200
+
+difflib hanya diukur sampai ``--difflib-max`` nama karena di atas itu satu query
+sudah memakan waktu detik.
+"""
+
+from __future__ import annotations
+import argparse
+import random
+import statistics
+import time
+
+from utils.helper import best_match, infer_kak_md
+from utils.fuzzy_index import TrigramIndex
+
+WORDS = (
+    "pengadaan switch core internet dedicated vsat firewall jaringan data "
+    "center migrasi sdwan metro ethernet wifi managed service cctv "
+    "colocation backup link upgrade bandwidth radio fiber optik security "
+    "cloud"
+).split()
+CUSTOMERS = (
+    "bank_sumsel_babel pertamina pln telkom bri bni mandiri kemenkeu bpjs "
+    "pemprov_jabar pemkot_surabaya angkasa_pura"
+).split()
+
+
+def make_names(n: int, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < n:
+        topic = "_".join(rng.sample(WORDS, rng.randint(2, 4)))
+        names.add(f"{topic}_{rng.choice(CUSTOMERS)}_{rng.randint(2015, 2026)}.md")
+    return sorted(names)
+
+
+def make_queries(names: list[str], k: int, seed: int = 11) -> list[str]:
+    """Query bergaya user: 'buatkan proposal proyek <nama dengan sedikit typo>'."""
+    rng = random.Random(seed)
+    queries = []
+    for name in rng.sample(names, min(k, len(names))):
+        words = name[:-3].split("_")
+        if len(words) > 3 and rng.random() < 0.5:
+            words.pop(rng.randrange(len(words)))  # kata hilang
+        text = " ".join(words)
+        pos = rng.randrange(len(text))
+        text = text[:pos] + text[pos + 1 :]  # typo satu huruf
+        queries.append(f"buatkan proposal proyek {text}")
+    return queries
+
+
+def _percentiles(samples: list[float]) -> tuple[float, float]:
+    samples = sorted(samples)
+    p50 = statistics.median(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return p50, p95
+
+
+def bench(n: int, n_queries: int, difflib_max: int) -> None:
+    names = make_names(n)
+    queries = make_queries(names, n_queries)
+
+    t0 = time.perf_counter()
+    index = TrigramIndex(names)
+    build_ms = (time.perf_counter() - t0) * 1000
+
+    # Refresh inkremental: 1% nama berganti
+    churn = names[: max(1, n // 100)]
+    refreshed = names[len(churn) :] + [f"baru_{c}" for c in churn]
+    t0 = time.perf_counter()
+    index.update(refreshed)
+    index.update(names)
+    refresh_ms = (time.perf_counter() - t0) * 1000 / 2
+
+    idx_lat = []
+    for q in queries:
+        slug = infer_kak_md(q) or q
+        t0 = time.perf_counter()
+        index.best_match(slug)
+        idx_lat.append((time.perf_counter() - t0) * 1000)
+    p50, p95 = _percentiles(idx_lat)
+    print(
+        f"n={n:>7}  build={build_ms:8.1f}ms  refresh(1%)={refresh_ms:7.1f}ms  "
+        f"index p50={p50:.3f}ms p95={p95:.3f}ms",
+        end="",
+    )
+
+    if n > difflib_max:
+        print("  difflib=skipped")
+        return
+
+    dl_lat, agree = [], 0
+    for q in queries[: max(10, n_queries // 10)]:
+        slug = infer_kak_md(q) or q
+        t0 = time.perf_counter()
+        expected = best_match(names, slug)
+        dl_lat.append((time.perf_counter() - t0) * 1000)
+        agree += index.best_match(slug) == expected
+    d50, d95 = _percentiles(dl_lat)
+    print(
+        f"  difflib p50={d50:.1f}ms p95={d95:.1f}ms  "
+        f"agreement={agree}/{len(dl_lat)}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--difflib-max", type=int, default=10000)
+    args = parser.parse_args()
+    for n in args.sizes:
+        bench(n, args.queries, args.difflib_max)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Benchmark seleksi tool per query: ``services.tool_selector.ToolSelector``.
+
+Mengukur token skema tool yang dikirim ke LLM (semua tool vs subset top-k),
+latency seleksi, dan recall — apakah tool yang dimaksud query ikut terpilih.
+
+Jalankan dari root repo:
+
+    python -m benchmarks.bench_tool_selector
+    python -m benchmarks.bench_tool_selector --sizes 10 50 200 --top-k 6
+"""
+
+from __future__ import annotations
+import argparse
+import random
+import statistics
+import time
+
+from services.tool_selector import ToolSelector, schema_tokens, tool_name
+
+DOMAINS = (
+    "kak product proposal template project vendor invoice timeline budget "
+    "risk contract pricing network site survey ticket report meeting"
+).split()
+ACTIONS = "list read search create update delete summarize export".split()
+PINNED = {"chat": ["list_kak_files", "list_product_files"]}
+
+
+def make_tools(n: int, seed: int = 3) -> list[dict]:
+    rng = random.Random(seed)
+    tools = [
+        {
+            "type": "function",
+            "function": {
+                "name": name,
+                "description": f"{name.replace('_', ' ').capitalize()}.",
+                "parameters": {"type": "object", "properties": {}},
+            },
+        }
+        for name in PINNED["chat"]
+    ]
+    names = {tool_name(t) for t in tools}
+    while len(tools) < n:
+        action, domain = rng.choice(ACTIONS), rng.choice(DOMAINS)
+        name = f"{action}_{domain}_{rng.choice(DOMAINS)}"
+        if name in names:
+            continue
+        names.add(name)
+        tools.append(
+            {
+                "type": "function",
+                "function": {
+                    "name": name,
+                    "description": (
+                        f"{action.capitalize()} {domain} records stored in the "
+                        f"ProjectWise knowledge base and return them as JSON."
+                    ),
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            f"{domain}_id": {
+                                "type": "string",
+                                "description": f"Identifier {domain}",
+                            },
+                            "limit": {"type": "integer", "description": "Batas hasil"},
+                        },
+                    },
+                },
+            }
+        )
+    return tools
+
+
+def make_queries(tools: list[dict], k: int, seed: int = 5) -> list[tuple[str, str]]:
+    """Pasangan (query bergaya user, nama tool yang diharapkan)."""
+    rng = random.Random(seed)
+    queries = []
+    for tool in rng.sample(tools, min(k, len(tools))):
+        words = tool_name(tool).split("_")
+        queries.append((f"tolong {' '.join(words)} untuk proyek ini", tool_name(tool)))
+    return queries
+
+
+def bench(n: int, n_queries: int, top_k: int) -> None:
+    tools = make_tools(n)
+    queries = make_queries(tools, n_queries)
+    selector = ToolSelector(top_k=top_k, pinned=PINNED)
+    selector.select(tools, "warm up", "chat")  # bangun index di luar pengukuran
+
+    full = sum(schema_tokens(t) for t in tools)
+    lat, sent, hit = [], [], 0
+    for query, expected in queries:
+        t0 = time.perf_counter()
+        selected = selector.select(tools, query, "chat")
+        lat.append((time.perf_counter() - t0) * 1000)
+        sent.append(sum(schema_tokens(t) for t in selected))
+        hit += expected in {tool_name(t) for t in selected}
+
+    lat.sort()
+    p50 = statistics.median(lat)
+    p95 = lat[min(len(lat) - 1, int(len(lat) * 0.95))]
+    avg_sent = statistics.mean(sent)
+    print(
+        f"tools={n:>4}  schema full={full:>6} tok  sent avg={avg_sent:7.0f} tok "
+        f"({1 - avg_sent / full:6.1%} hemat)  select p50={p50:.3f}ms "
+        f"p95={p95:.3f}ms  recall={hit}/{len(queries)}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 30, 100, 300])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=6)
+    args = parser.parse_args()
+    for n in args.sizes:
+        bench(n, args.queries, args.top_k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""
+Load test offline untuk Flask UI: server MCP stub + server OpenAI palsu.
+
+Tanpa kredit OpenAI dan tanpa backend MCP sungguhan, harness ini menjalankan:
+
+- ``stub_mcp``     — server MCP streamable-HTTP dengan tool yang sama seperti
+  server ProjectWise (``list_kak_files``, ``read_project_markdown``,
+  ``get_template_placeholders``, ``generate_proposal_docx``, ``heartbeat``, ...)
+  plus REST API ingestion (``/api/upload-kak-tor/``, ``/api/check-status``).
+- ``fake_openai``  — server kompatibel OpenAI (``/v1/chat/completions``,
+  ``/v1/embeddings``) yang menjawab router, tool call, dan JSON docgen.
+- ``driver``       — klien HTTP yang menembak ``/chat``, endpoint ingestion,
+  dan docgen pada level konkurensi tertentu lalu melaporkan p50/p95/p99 & RPS;
+  bisa juga me-replay trace JSONL.
+
+Latency & failure rate kedua stub bisa diatur. Jalankan dari root repo:
+
+    python -m benchmarks.loadtest --concurrency 1 8 32 --duration 20
+    python -m benchmarks.loadtest --mix chat=8,docgen=1,ingest=1 --llm-latency-ms 400
+    python -m benchmarks.loadtest --concurrency 64 256 --asgi   # mode asgi.py
+    python -m benchmarks.loadtest --replay requests.jsonl --concurrency 4
+    python -m benchmarks.loadtest --target http://127.0.0.1:8000 --no-app
+
+Secara default mem0 diganti memori in-process (mem0 butuh Qdrant); pakai
+``--real-mem0`` jika Qdrant tersedia.
+"""
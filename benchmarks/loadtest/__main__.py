@@ -0,0 +1,166 @@
+"""Entry point ``python -m benchmarks.loadtest`` — lihat docstring paket."""
+
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List
+
+from benchmarks.loadtest import __doc__ as PACKAGE_DOC
+from benchmarks.loadtest import fake_openai, stub_mcp
+from benchmarks.loadtest.common import Faults, serve
+from benchmarks.loadtest.driver import (
+    load_replay,
+    parse_mix,
+    print_report,
+    run_closed,
+    run_replay,
+    warm_up,
+)
+
+
+class _StubMemory:
+    """Pengganti Mem0Manager in-process (mem0 asli butuh Qdrant)."""
+
+    def __init__(self, faults: Faults):
+        self._faults = faults
+
+    async def init(self) -> None:
+        pass
+
+    async def get_memories(
+        self, query: str, *, user_id: str = "default", limit: int = 5
+    ):
+        await self._faults.apply()
+        return []
+
+    async def add_conversation(self, messages, *, user_id: str = "default") -> None:
+        await self._faults.apply()
+
+
+def _start_app(args: argparse.Namespace) -> str:
+    """Jalankan Flask UI in-process (werkzeug threaded atau ASGI) yang diarahkan ke stub."""
+    base = f"http://{args.host}"
+    os.environ["MCP_SERVER_URL"] = f"{base}:{args.mcp_port}/projectwise/mcp"
+    os.environ["MCP_API_BASE_URL"] = f"{base}:{args.mcp_port}/api"
+    os.environ["OPENAI_BASE_URL"] = f"{base}:{args.openai_port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "loadtest")
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    # Import setelah env diset: settings dibaca saat modul di-import
+    from werkzeug.serving import make_server
+    from chats.base import create_app
+
+    app = create_app()
+    if not args.real_mem0:
+        mem = _StubMemory(Faults(args.mem0_latency_ms))
+        app.extensions["mcp_client"].memory_mgr = mem
+    if args.asgi:
+        from chats.base import warm_up_async
+        from utils.asgi import FlaskASGI
+
+        asgi_app = FlaskASGI(app, on_startup=[lambda: warm_up_async(app)])
+        serve(asgi_app, args.host, args.app_port, timeout=60)
+    else:
+        server = make_server(args.host, args.app_port, app, threaded=True)
+        threading.Thread(
+            target=server.serve_forever, name="flask-app", daemon=True
+        ).start()
+    return f"{base}:{args.app_port}"
+
+
+async def _run(args: argparse.Namespace, target: str) -> List[Dict[str, Any]]:
+    summaries = []
+    warm = await warm_up(target, timeout=args.timeout)
+    if not warm.ok:
+        print(f"Peringatan: warm-up gagal ({warm.status}): {warm.error}")
+
+    if args.replay:
+        jobs = load_replay(args.replay)
+        for c in args.concurrency:
+            report = await run_replay(
+                target, jobs, c, speed=args.speed, timeout=args.timeout
+            )
+            summaries.append(report.summary())
+            print_report(summaries[-1])
+    else:
+        mix = parse_mix(args.mix)
+        for c in args.concurrency:
+            report = await run_closed(
+                target, c, args.duration, mix, timeout=args.timeout
+            )
+            summaries.append(report.summary())
+            print_report(summaries[-1])
+    return summaries
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=PACKAGE_DOC.strip().split("\n\n")[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--duration", type=float, default=15.0, help="detik per level")
+    parser.add_argument("--mix", default="chat=8,docgen=1,ingest=1")
+    parser.add_argument("--replay", help="file JSONL untuk di-replay")
+    parser.add_argument("--speed", type=float, default=1.0, help="pengali laju replay")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--out", help="tulis ringkasan JSON ke file ini")
+
+    stub = parser.add_argument_group("stub")
+    stub.add_argument("--host", default="127.0.0.1")
+    stub.add_argument("--mcp-port", type=int, default=18500)
+    stub.add_argument("--openai-port", type=int, default=18501)
+    stub.add_argument("--mcp-latency-ms", type=float, default=20.0)
+    stub.add_argument("--mcp-jitter-ms", type=float, default=10.0)
+    stub.add_argument("--mcp-failure-rate", type=float, default=0.0)
+    stub.add_argument("--llm-latency-ms", type=float, default=300.0)
+    stub.add_argument("--llm-jitter-ms", type=float, default=150.0)
+    stub.add_argument("--llm-failure-rate", type=float, default=0.0)
+    stub.add_argument("--tool-call-rate", type=float, default=0.5)
+    stub.add_argument("--no-stubs", action="store_true", help="jangan start stub")
+
+    app = parser.add_argument_group("aplikasi")
+    app.add_argument("--app-port", type=int, default=18502)
+    app.add_argument(
+        "--target", help="URL Flask UI yang sudah jalan (lewati app in-process)"
+    )
+    app.add_argument(
+        "--real-mem0", action="store_true", help="pakai mem0 asli (butuh Qdrant)"
+    )
+    app.add_argument("--mem0-latency-ms", type=float, default=5.0)
+    app.add_argument(
+        "--asgi", action="store_true", help="sajikan app lewat adapter ASGI (uvicorn)"
+    )
+    args = parser.parse_args()
+
+    if not args.no_stubs:
+        mcp_faults = Faults(
+            args.mcp_latency_ms, args.mcp_jitter_ms, args.mcp_failure_rate
+        )
+        llm_faults = Faults(
+            args.llm_latency_ms, args.llm_jitter_ms, args.llm_failure_rate
+        )
+        serve(stub_mcp.build_app(mcp_faults), args.host, args.mcp_port)
+        serve(
+            fake_openai.build_app(llm_faults, args.tool_call_rate),
+            args.host,
+            args.openai_port,
+        )
+
+    target = args.target or _start_app(args)
+    summaries = asyncio.run(_run(args, target))
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(summaries, f, indent=2)
+        print(f"\nRingkasan ditulis ke {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Utilitas bersama stub load test: injeksi latency/kegagalan & server uvicorn."""
+
+from __future__ import annotations
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass
+
+import uvicorn
+
+
+@dataclass
+class Faults:
+    """Latency (rata-rata ± jitter, ms) dan probabilitas gagal per panggilan."""
+
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    failure_rate: float = 0.0
+
+    async def apply(self) -> bool:
+        """Tidur sesuai latency; ``True`` jika panggilan ini harus gagal."""
+        delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        return random.random() < self.failure_rate
+
+
+def serve(app, host: str, port: int, timeout: float = 10.0) -> uvicorn.Server:
+    """Jalankan *app* ASGI di thread daemon dan tunggu sampai siap menerima."""
+    server = uvicorn.Server(
+        uvicorn.Config(app, host=host, port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, name=f"stub-{port}", daemon=True).start()
+    deadline = time.monotonic() + timeout
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"Stub di port {port} tidak kunjung start")
+        time.sleep(0.05)
+    return server
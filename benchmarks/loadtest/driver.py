@@ -0,0 +1,244 @@
+"""
+Driver load test: tembak Flask UI pada level konkurensi tertentu atau replay
+trace JSONL, lalu ringkas latency (p50/p95/p99) dan throughput per skenario.
+
+Skenario:
+
+- ``chat``    — ``POST /chat`` pertanyaan umum (router → LLM ± tool MCP).
+- ``docgen``  — ``POST /chat`` permintaan proposal (pipeline docgen penuh).
+- ``ingest``  — ``POST /upload-kak-via-flask/`` file KAK kecil (streaming ke MCP).
+
+Format replay (satu objek JSON per baris), semua field opsional kecuali isi:
+
+    {"scenario": "chat", "message": "...", "offset_ms": 1200}
+    {"request_id": "...", "title": "...", "body": "..."}   # gaya requests.jsonl
+
+Jika setiap baris punya ``offset_ms`` replay berjalan open-loop sesuai jadwal
+(dikali ``--speed``); jika tidak, baris dikirim closed-loop secepat konkurensi.
+"""
+
+from __future__ import annotations
+import asyncio
+import json
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import httpx
+
+CHAT_MESSAGES = [
+    "Apa saja file KAK yang sudah tersedia?",
+    "Ringkas kebutuhan proyek migrasi sdwan pln 2025",
+    "Produk apa yang cocok untuk internet dedicated?",
+    "Jelaskan ruang lingkup pengadaan switch core telkom",
+    "Halo, apa yang bisa kamu bantu?",
+]
+DOCGEN_MESSAGES = [
+    "Buatkan proposal untuk proyek pengadaan_switch_core_bank_sumsel_babel_2024",
+    "Tolong buat proposal migrasi_sdwan_pln_2025",
+    "Generate proposal internet_dedicated_telkom_2025",
+]
+SCENARIOS = ("chat", "docgen", "ingest")
+
+
+@dataclass
+class Job:
+    scenario: str
+    message: str = ""
+    offset_ms: Optional[float] = None
+
+
+@dataclass
+class Result:
+    scenario: str
+    status: int
+    latency: float
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and 200 <= self.status < 400
+
+
+@dataclass
+class Report:
+    label: str
+    elapsed: float
+    results: List[Result] = field(default_factory=list)
+
+    def summary(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "label": self.label,
+            "elapsed_sec": round(self.elapsed, 2),
+        }
+        groups: Dict[str, List[Result]] = {"all": self.results}
+        for r in self.results:
+            groups.setdefault(r.scenario, []).append(r)
+        for name, rows in groups.items():
+            lat = sorted(r.latency * 1000 for r in rows)
+            out[name] = {
+                "requests": len(rows),
+                "errors": sum(not r.ok for r in rows),
+                # Ditolak admission control (bagian dari errors)
+                "rejected": sum(r.status == 429 for r in rows),
+                "rps": round(len(rows) / self.elapsed, 2) if self.elapsed else 0.0,
+                "p50_ms": _pct(lat, 50),
+                "p95_ms": _pct(lat, 95),
+                "p99_ms": _pct(lat, 99),
+                "max_ms": round(lat[-1], 1) if lat else None,
+            }
+        return out
+
+
+def _pct(sorted_ms: Sequence[float], p: float) -> Optional[float]:
+    """Persentil nearest-rank (cukup untuk ribuan sampel)."""
+    if not sorted_ms:
+        return None
+    idx = max(0, min(len(sorted_ms) - 1, int(round(p / 100 * len(sorted_ms))) - 1))
+    return round(sorted_ms[idx], 1)
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """``"chat=8,docgen=1,ingest=1"`` → bobot per skenario."""
+    mix: Dict[str, float] = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Skenario tidak dikenal: {name!r} (pilih {SCENARIOS})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def load_replay(path: str | Path) -> List[Job]:
+    jobs: List[Job] = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            rec = json.loads(line)
+            message = rec.get("message") or rec.get("body") or rec.get("title") or ""
+            scenario = rec.get("scenario") or "chat"
+            if scenario not in SCENARIOS:
+                raise ValueError(f"Skenario tidak dikenal di replay: {scenario!r}")
+            jobs.append(Job(scenario, message, rec.get("offset_ms")))
+    return jobs
+
+
+def _random_job(mix: Dict[str, float], rng: random.Random) -> Job:
+    scenario = rng.choices(list(mix), weights=list(mix.values()))[0]
+    if scenario == "chat":
+        return Job("chat", rng.choice(CHAT_MESSAGES))
+    if scenario == "docgen":
+        return Job("docgen", rng.choice(DOCGEN_MESSAGES))
+    return Job("ingest")
+
+
+async def _send(client: httpx.AsyncClient, job: Job) -> Result:
+    start = time.perf_counter()
+    try:
+        if job.scenario == "ingest":
+            # Isi acak → tidak kena dedup, setiap upload benar-benar diteruskan
+            content = os.urandom(64 * 1024)
+            resp = await client.post(
+                "/upload-kak-via-flask/",
+                data={"project_name": "loadtest", "pelanggan": "stub", "tahun": "2025"},
+                files={"file": ("loadtest.pdf", content, "application/pdf")},
+            )
+        else:
+            resp = await client.post("/chat", json={"message": job.message})
+        error = None if resp.status_code < 400 else resp.text[:200]
+        return Result(
+            job.scenario, resp.status_code, time.perf_counter() - start, error
+        )
+    except httpx.HTTPError as e:
+        return Result(job.scenario, 0, time.perf_counter() - start, repr(e))
+
+
+async def warm_up(base_url: str, timeout: float = 120.0) -> Result:
+    """Satu request chat (koneksi MCP, listing tool, pool HTTP) di luar pengukuran."""
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout) as client:
+        return await _send(client, Job("chat", CHAT_MESSAGES[0]))
+
+
+async def run_closed(
+    base_url: str,
+    concurrency: int,
+    duration: float,
+    mix: Dict[str, float],
+    timeout: float = 120.0,
+    seed: int = 11,
+) -> Report:
+    """*concurrency* worker mengirim request terus-menerus selama *duration* detik."""
+    rng = random.Random(seed)
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+    report = Report(f"closed c={concurrency}", 0.0)
+    stop_at = time.perf_counter() + duration
+
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=timeout, limits=limits
+    ) as client:
+
+        async def worker() -> None:
+            while time.perf_counter() < stop_at:
+                report.results.append(await _send(client, _random_job(mix, rng)))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        report.elapsed = time.perf_counter() - start
+    return report
+
+
+async def run_replay(
+    base_url: str,
+    jobs: List[Job],
+    concurrency: int,
+    speed: float = 1.0,
+    timeout: float = 120.0,
+) -> Report:
+    """Replay *jobs*: open-loop sesuai ``offset_ms`` jika ada, selain itu closed-loop."""
+    timed = all(j.offset_ms is not None for j in jobs)
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+    report = Report(f"replay {'timed' if timed else 'closed'} c={concurrency}", 0.0)
+    sem = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=timeout, limits=limits
+    ) as client:
+        start = time.perf_counter()
+
+        async def fire(job: Job) -> None:
+            if timed:
+                delay = job.offset_ms / 1000 / speed - (time.perf_counter() - start)  # type: ignore[operator]
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            async with sem:
+                report.results.append(await _send(client, job))
+
+        await asyncio.gather(*(fire(j) for j in jobs))
+        report.elapsed = time.perf_counter() - start
+    return report
+
+
+def print_report(summary: Dict[str, Any]) -> None:
+    print(f"\n== {summary['label']}  ({summary['elapsed_sec']}s)")
+    print(
+        f"{'skenario':<8} {'req':>6} {'err':>5} {'429':>5} {'rps':>8} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+    )
+    for name, row in summary.items():
+        if not isinstance(row, dict):
+            continue
+        print(
+            f"{name:<8} {row['requests']:>6} {row['errors']:>5} {row['rejected']:>5} "
+            f"{row['rps']:>8} "
+            f"{row['p50_ms']!s:>9} {row['p95_ms']!s:>9} {row['p99_ms']!s:>9} "
+            f"{row['max_ms']!s:>9}"
+        )
@@ -0,0 +1,179 @@
+"""
+Server palsu kompatibel OpenAI (``/v1/chat/completions``, ``/v1/embeddings``).
+
+Jawaban dibuat dari bentuk request, bukan model:
+
+- ``response_format`` json_schema (router intent) → objek sesuai skema;
+  intent ``generate_document`` jika pesan user menyebut proposal.
+- ``response_format`` json_object (shard placeholder docgen) → nilai untuk
+  setiap key pada baris ``Key: [...]``.
+- ``tool_choice`` fungsi tertentu → tool call ke fungsi tersebut; ``auto``
+  dengan tools → tool call dengan probabilitas ``tool_call_rate``.
+- Selain itu → teks biasa.
+
+Kegagalan buatan dikembalikan sebagai 429/500 agar retry gateway teruji.
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import random
+import re
+import time
+import uuid
+from typing import Any, Dict, List
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from benchmarks.loadtest.common import Faults
+
+_KEYS_RE = re.compile(r"Key: (\[.*?\])\s*$", re.S)
+_DOCGEN_RE = re.compile(r"proposal|buatkan dokumen|generate", re.I)
+EMBED_DIM = 1536
+
+
+def _tokens(payload: Any) -> int:
+    return max(1, len(json.dumps(payload, ensure_ascii=False)) // 4)
+
+
+def _last_user(messages: List[Dict[str, Any]]) -> str:
+    for m in reversed(messages):
+        if m.get("role") == "user" and isinstance(m.get("content"), str):
+            return m["content"]
+    return ""
+
+
+def _from_schema(schema: Dict[str, Any], query: str) -> Any:
+    if "enum" in schema:
+        options = schema["enum"]
+        if "generate_document" in options:
+            return "generate_document" if _DOCGEN_RE.search(query) else "other"
+        return options[0]
+    kind = schema.get("type")
+    if kind == "object":
+        return {
+            name: _from_schema(sub, query)
+            for name, sub in schema.get("properties", {}).items()
+        }
+    return {
+        "number": 0.95,
+        "integer": 1,
+        "boolean": True,
+        "array": [],
+        "string": "stub",
+    }.get(kind, None)
+
+
+def _tool_call(name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": f"call_{uuid.uuid4().hex[:12]}",
+        "type": "function",
+        "function": {"name": name, "arguments": json.dumps(args)},
+    }
+
+
+def _reply(body: Dict[str, Any], tool_call_rate: float) -> Dict[str, Any]:
+    messages = body.get("messages") or []
+    query = _last_user(messages)
+    fmt = body.get("response_format") or {}
+    tools = body.get("tools") or []
+    choice = body.get("tool_choice")
+
+    if fmt.get("type") == "json_schema":
+        schema = fmt.get("json_schema", {}).get("schema", {})
+        return {"content": json.dumps(_from_schema(schema, query))}
+    if fmt.get("type") == "json_object":
+        match = _KEYS_RE.search(query)
+        keys = json.loads(match.group(1)) if match else []
+        return {"content": json.dumps({k: f"Isi {k} (stub)" for k in keys})}
+
+    if isinstance(choice, dict):
+        return {"tool_calls": [_tool_call(choice["function"]["name"], {})]}
+    last_role = messages[-1].get("role") if messages else None
+    if tools and choice != "none" and last_role == "user":
+        if random.random() < tool_call_rate:
+            name = random.choice(tools)["function"]["name"]
+            return {"tool_calls": [_tool_call(name, {})]}
+    return {"content": f"Jawaban stub untuk: {query[:80]}"}
+
+
+def build_app(faults: Faults, tool_call_rate: float = 0.5) -> Starlette:
+    async def chat_completions(request: Request) -> JSONResponse:
+        body = await request.json()
+        if await faults.apply():
+            status = random.choice([429, 500])
+            return JSONResponse(
+                {
+                    "error": {
+                        "message": "stub: kegagalan buatan",
+                        "type": "server_error",
+                    }
+                },
+                status_code=status,
+                headers={"retry-after": "0.1"} if status == 429 else None,
+            )
+        reply = _reply(body, tool_call_rate)
+        message = {"role": "assistant", "content": reply.get("content")}
+        if reply.get("tool_calls"):
+            message["tool_calls"] = reply["tool_calls"]
+        prompt_tokens = _tokens(body.get("messages")) + _tokens(body.get("tools") or [])
+        completion_tokens = _tokens(message)
+        return JSONResponse(
+            {
+                "id": f"chatcmpl-{uuid.uuid4().hex[:16]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": message,
+                        "finish_reason": "tool_calls"
+                        if reply.get("tool_calls")
+                        else "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                    "prompt_tokens_details": {"cached_tokens": 0},
+                },
+            }
+        )
+
+    async def embeddings(request: Request) -> JSONResponse:
+        body = await request.json()
+        await faults.apply()
+        inputs = body.get("input")
+        inputs = inputs if isinstance(inputs, list) else [inputs]
+        data = []
+        for i, text in enumerate(inputs):
+            # Vektor deterministik per teks (mem0 butuh dimensi konsisten)
+            rng = random.Random(hashlib.sha256(str(text).encode()).digest())
+            data.append(
+                {
+                    "object": "embedding",
+                    "index": i,
+                    "embedding": [rng.uniform(-1, 1) for _ in range(EMBED_DIM)],
+                }
+            )
+        tokens = _tokens(inputs)
+        return JSONResponse(
+            {
+                "object": "list",
+                "data": data,
+                "model": body.get("model", "stub"),
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+            }
+        )
+
+    return Starlette(
+        routes=[
+            Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+            Route("/v1/embeddings", embeddings, methods=["POST"]),
+        ]
+    )
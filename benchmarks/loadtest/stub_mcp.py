@@ -0,0 +1,138 @@
+"""
+Server MCP stub (streamable-HTTP) + REST API ingestion untuk load test.
+
+Tool & bentuk payload meniru server ProjectWise secukupnya agar alur chat dan
+pipeline docgen berjalan penuh; isi datanya sintetis.
+"""
+
+from __future__ import annotations
+import itertools
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from mcp.server.fastmcp import FastMCP
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from benchmarks.loadtest.common import Faults
+
+PROJECTS = [
+    f"{topic}_{customer}_{year}"
+    for topic, customer, year in itertools.product(
+        ["pengadaan_switch_core", "migrasi_sdwan", "internet_dedicated"],
+        ["bank_sumsel_babel", "pln", "telkom"],
+        [2024, 2025],
+    )
+]
+PLACEHOLDERS = [
+    "nama_pelanggan",
+    "judul_proyek",
+    "latar_belakang",
+    "ruang_lingkup",
+    "solusi_teknis",
+    "jadwal_pelaksanaan",
+    "asumsi",
+    "penutup",
+]
+KAK_PARAGRAPH = (
+    "Pelanggan membutuhkan {topic} dengan ketersediaan tinggi, dukungan 24x7, "
+    "serta dokumentasi lengkap. Ruang lingkup meliputi survei lokasi, instalasi, "
+    "konfigurasi, uji terima, dan pelatihan operator."
+)
+# Job ingestion selesai setelah N kali dicek statusnya
+INGEST_POLLS_TO_SUCCESS = 3
+
+
+def build_app(faults: Faults, path: str = "/projectwise/mcp", kak_paragraphs: int = 40):
+    """ASGI app: endpoint MCP di *path* dan REST ingestion di ``/api``."""
+    mcp = FastMCP("projectwise-stub", streamable_http_path=path, log_level="WARNING")
+
+    async def _maybe_fail(name: str) -> None:
+        if await faults.apply():
+            raise RuntimeError(f"stub: kegagalan buatan pada {name}")
+
+    @mcp.tool()
+    async def heartbeat() -> str:
+        """Cek server hidup."""
+        return "ok"
+
+    @mcp.tool()
+    async def list_kak_files() -> str:
+        """Daftar file markdown KAK/TOR proyek yang sudah diingest."""
+        await _maybe_fail("list_kak_files")
+        return json.dumps([{"name": f"{p}.md", "size": 4096} for p in PROJECTS])
+
+    @mcp.tool()
+    async def list_product_files() -> str:
+        """Daftar file product knowledge yang sudah diingest."""
+        await _maybe_fail("list_product_files")
+        return json.dumps(["switch_core_datasheet.md", "sdwan_overview.md"])
+
+    @mcp.tool()
+    async def read_project_markdown(project_name: str) -> Dict[str, Any]:
+        """Baca isi markdown KAK/TOR sebuah proyek."""
+        await _maybe_fail("read_project_markdown")
+        topic = project_name.replace("_", " ")
+        text = "\n\n".join(
+            KAK_PARAGRAPH.format(topic=topic) for _ in range(kak_paragraphs)
+        )
+        return {"status": "success", "project": project_name, "text": text}
+
+    @mcp.tool()
+    async def get_template_placeholders(
+        override_template: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Daftar placeholder pada template proposal."""
+        await _maybe_fail("get_template_placeholders")
+        return {"placeholders": PLACEHOLDERS}
+
+    @mcp.tool()
+    async def generate_proposal_docx(
+        context: Optional[Dict[str, Any]] = None,
+        override_template: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Render proposal .docx dari context placeholder."""
+        await _maybe_fail("generate_proposal_docx")
+        return {
+            "status": "success",
+            "path": f"/data/proposals/stub_{time.time_ns()}.docx",
+        }
+
+    jobs: Dict[str, int] = {}
+    counter = itertools.count(1)
+
+    async def upload(request: Request) -> JSONResponse:
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+        if await faults.apply():
+            return JSONResponse({"detail": "stub: upload gagal"}, status_code=503)
+        job_id = f"job-{next(counter)}"
+        jobs[job_id] = 0
+        return JSONResponse({"job_id": job_id, "bytes": size})
+
+    async def check_status(request: Request) -> JSONResponse:
+        job_id = request.query_params.get("job_id", "")
+        if job_id not in jobs:
+            return JSONResponse({"status": "failure", "message": "job tidak dikenal"})
+        jobs[job_id] += 1
+        if jobs[job_id] < INGEST_POLLS_TO_SUCCESS:
+            return JSONResponse({"status": "processing", "message": "ingesting"})
+        return JSONResponse(
+            {
+                "status": "success",
+                "message": "selesai",
+                "result": {"summary": "Ringkasan stub", "summary_file": f"{job_id}.md"},
+            }
+        )
+
+    app = mcp.streamable_http_app()
+    routes: List[Route] = [
+        Route("/api/upload-kak-tor/", upload, methods=["POST"]),
+        Route("/api/upload-product/", upload, methods=["POST"]),
+        Route("/api/check-status", check_status, methods=["GET"]),
+    ]
+    app.router.routes.extend(routes)
+    return app
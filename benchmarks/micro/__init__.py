@@ -0,0 +1,19 @@
+"""
+Micro-benchmark kerja CPU per request, dengan baseline & ambang regresi.
+
+Kasus (lihat ``cases.py``) memakai ukuran input realistis: teks KAK panjang,
+listing ribuan file, riwayat chat SQLite berisi ribuan pesan.
+
+Jalankan dari root repo:
+
+    python -m benchmarks.micro                  # bandingkan dengan baseline
+    python -m benchmarks.micro --save           # simpan hasil sebagai baseline
+    python -m benchmarks.micro -k kak --repeat 9
+    python -m benchmarks.micro --threshold 0.3  # ambang global (30% lebih lambat)
+
+Waktu per panggilan diukur dengan ``timeit`` (jumlah loop dikalibrasi
+otomatis); yang dibandingkan adalah nilai minimum antar-repeat karena paling
+tahan noise. Exit code 1 jika ada kasus yang melewati ambang, sehingga bisa
+dipasang di CI sebelum deploy. Baseline bergantung mesin: simpan ulang
+(``--save``) di mesin CI yang sama setelah perubahan performa yang disengaja.
+"""
@@ -0,0 +1,106 @@
+"""Entry point ``python -m benchmarks.micro`` — lihat docstring paket."""
+
+from __future__ import annotations
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import timeit
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from benchmarks.micro import __doc__ as PACKAGE_DOC
+from benchmarks.micro.cases import CASES, THRESHOLDS
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+
+
+def measure(fn, repeat: int) -> Dict[str, float]:
+    """Waktu per panggilan (µs): min & median dari *repeat* pengulangan."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()  # ≥ 0,2 detik per repeat
+    per_call = [t / number * 1e6 for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "min_us": round(min(per_call), 3),
+        "median_us": round(statistics.median(per_call), 3),
+        "loops": number,
+    }
+
+
+def load_baseline(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=PACKAGE_DOC.strip().split("\n\n")[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("-k", "--filter", default="", help="substring nama kasus")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="tulis hasil ke baseline")
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.baseline)
+    base_cases = (baseline or {}).get("cases", {})
+    if baseline is None and not args.save:
+        print(f"Belum ada baseline di {args.baseline}; jalankan dengan --save.\n")
+
+    results: Dict[str, Dict[str, float]] = {}
+    regressions = []
+    print(f"{'kasus':<36} {'min µs':>12} {'median µs':>12} {'baseline':>12} {'Δ':>8}")
+    for name, setup in CASES.items():
+        if args.filter not in name:
+            continue
+        row = results[name] = measure(setup(), args.repeat)
+        base = base_cases.get(name)
+        delta = ""
+        if base:
+            change = row["min_us"] / base["min_us"] - 1
+            limit = THRESHOLDS.get(name, args.threshold)
+            delta = f"{change:+.1%}"
+            if change > limit:
+                regressions.append((name, change, limit))
+                delta += " !"
+        print(
+            f"{name:<36} {row['min_us']:>12.2f} {row['median_us']:>12.2f} "
+            f"{base['min_us'] if base else '-':>12} {delta:>8}"
+        )
+
+    if args.save:
+        merged = {**base_cases, **results}
+        args.baseline.write_text(
+            json.dumps(
+                {
+                    "meta": {
+                        "python": platform.python_version(),
+                        "machine": platform.machine(),
+                        "platform": platform.platform(),
+                        "saved_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    },
+                    "cases": dict(sorted(merged.items())),
+                },
+                indent=2,
+            )
+            + "\n",
+            encoding="utf-8",
+        )
+        print(f"\nBaseline disimpan ke {args.baseline}")
+        return
+
+    if regressions:
+        print("\nRegresi performa:")
+        for name, change, limit in regressions:
+            print(f"  {name}: {change:+.1%} (ambang {limit:.0%})")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Daftar kasus micro-benchmark. Setiap kasus adalah fungsi *setup* yang
+menyiapkan input (di luar pengukuran) dan mengembalikan callable tanpa argumen
+yang diukur.
+"""
+
+from __future__ import annotations
+import atexit
+import json
+import random
+import shutil
+import tempfile
+import types
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from benchmarks.bench_fuzzy_index import make_names, make_queries
+
+Bench = Callable[[], object]
+
+# Ambang regresi per kasus (default global dipakai jika tidak ada di sini);
+# I/O SQLite lebih bising daripada kode murni CPU.
+THRESHOLDS: Dict[str, float] = {"history.fetch_sqlite": 0.5}
+
+WORDS = (
+    "pengadaan perangkat jaringan switch core router firewall instalasi "
+    "konfigurasi pelanggan layanan ketersediaan dukungan dokumentasi migrasi "
+    "sdwan bandwidth survei lokasi uji terima pelatihan operator garansi "
+    "spesifikasi teknis jadwal pelaksanaan ruang lingkup pekerjaan vendor"
+).split()
+PLACEHOLDERS = [
+    "nama_pelanggan",
+    "judul_proyek",
+    "latar_belakang",
+    "ruang_lingkup",
+    "solusi_teknis",
+    "jadwal_pelaksanaan",
+    "spesifikasi_perangkat",
+    "garansi_dukungan",
+]
+
+
+def make_kak(n_paragraphs: int = 400, seed: int = 1) -> str:
+    """Teks KAK sintetis; 400 paragraf ≈ 120 ribu karakter (KAK tender besar)."""
+    rng = random.Random(seed)
+    paragraphs = []
+    for i in range(n_paragraphs):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(30, 60))]
+        paragraphs.append(f"{i + 1}. " + " ".join(words).capitalize() + ".")
+    return "\n\n".join(paragraphs)
+
+
+def make_history(n: int = 10, seed: int = 2) -> List[Dict[str, str]]:
+    rng = random.Random(seed)
+    return [
+        {
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 200))),
+        }
+        for i in range(n)
+    ]
+
+
+# ---------------------------------------------------------------- helper
+
+
+def truncate_short() -> Bench:
+    from utils.helper import truncate_by_tokens
+
+    text = make_history(1)[0]["content"]
+    return lambda: truncate_by_tokens(text)
+
+
+def truncate_long_kak() -> Bench:
+    from utils.helper import truncate_by_tokens
+
+    text = make_kak()
+    return lambda: truncate_by_tokens(text, 4000)
+
+
+def slugify_query() -> Bench:
+    from utils.helper import slugify
+
+    query = (
+        "Buatkan proposal untuk proyek Pengadaan Switch Core — Bank Sumsel Babel 2025"
+    )
+    return lambda: slugify(query)
+
+
+def infer_kak_md_query() -> Bench:
+    from utils.helper import infer_kak_md
+
+    query = "tolong buatkan proposal proyek migrasi sdwan metro ethernet pln 2025"
+    return lambda: infer_kak_md(query)
+
+
+def best_match_difflib_1k() -> Bench:
+    from utils.helper import best_match, infer_kak_md
+
+    names = make_names(1_000)
+    slug = infer_kak_md(make_queries(names, 1)[0]) or ""
+    return lambda: best_match(names, slug)
+
+
+def best_match_trigram_10k() -> Bench:
+    from utils.fuzzy_index import TrigramIndex
+    from utils.helper import infer_kak_md
+
+    names = make_names(10_000)
+    index = TrigramIndex()
+    index.update(names)
+    slug = infer_kak_md(make_queries(names, 1)[0]) or ""
+    return lambda: index.best_match(slug)
+
+
+def trigram_index_build_10k() -> Bench:
+    from utils.fuzzy_index import TrigramIndex
+
+    names = make_names(10_000)
+    return lambda: TrigramIndex().update(names)
+
+
+# ------------------------------------------------------------- chat route
+
+
+def chat_prompt_assembly() -> Bench:
+    from services.mcp_client import build_chat_prompt
+
+    messages = make_history(10) + [{"role": "user", "content": "status proyek?"}]
+    memories = [m["content"] for m in make_history(5, seed=3)]
+    return lambda: build_chat_prompt(messages, memories)
+
+
+def history_fetch_sqlite() -> Bench:
+    """``MCPClient._get_short_term`` pada DB berisi 5.000 pesan / 50 user."""
+    import sqlalchemy as sa
+    from sqlalchemy.orm import sessionmaker
+
+    from services.mcp_client import Base, ChatSession, MCPClient, Message
+
+    tmp = Path(tempfile.mkdtemp(prefix="bench_history_"))
+    atexit.register(shutil.rmtree, tmp, True)
+    engine = sa.create_engine(f"sqlite:///{tmp / 'history.sqlite'}")
+    Base.metadata.create_all(engine)
+    DBSession = sessionmaker(bind=engine)
+    db = DBSession()
+    history = make_history(100)
+    for u in range(50):
+        db.add(ChatSession(user_id=f"user{u}"))
+        db.add_all(
+            Message(user_id=f"user{u}", role=m["role"], content=m["content"])
+            for m in history
+        )
+    db.commit()
+    db.close()
+
+    fake_client = types.SimpleNamespace(DBSession=DBSession)
+    return lambda: MCPClient._get_short_term(fake_client, "user25", limit=10)  # type: ignore[arg-type]
+
+
+# ------------------------------------------------------------ docgen pipeline
+
+
+def _kak_payload() -> str:
+    return json.dumps({"status": "success", "text": make_kak()}, ensure_ascii=False)
+
+
+def pipeline_parse_tool_payload() -> Bench:
+    """``json.loads`` hasil read_project_markdown (post-processing tool result)."""
+    raw = _kak_payload()
+    return lambda: json.loads(raw)
+
+
+def pipeline_chunk_kak() -> Bench:
+    from services.pipeline_product_proposal import _chunk_kak
+
+    text = make_kak()
+    return lambda: _chunk_kak(text)
+
+
+def pipeline_kak_slice() -> Bench:
+    from services.pipeline_product_proposal import _chunk_kak, _kak_slice
+
+    chunks = _chunk_kak(make_kak())
+    keys = PLACEHOLDERS[:4]
+    return lambda: _kak_slice(chunks, keys)
+
+
+CASES: Dict[str, Callable[[], Bench]] = {
+    "helper.truncate_by_tokens.short": truncate_short,
+    "helper.truncate_by_tokens.kak_120k": truncate_long_kak,
+    "helper.slugify": slugify_query,
+    "helper.infer_kak_md": infer_kak_md_query,
+    "helper.best_match.difflib_1k": best_match_difflib_1k,
+    "fuzzy.best_match.trigram_10k": best_match_trigram_10k,
+    "fuzzy.index_build_10k": trigram_index_build_10k,
+    "chat.build_prompt": chat_prompt_assembly,
+    "history.fetch_sqlite": history_fetch_sqlite,
+    "pipeline.parse_tool_payload": pipeline_parse_tool_payload,
+    "pipeline.chunk_kak": pipeline_chunk_kak,
+    "pipeline.kak_slice": pipeline_kak_slice,
+}
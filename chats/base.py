@@ -1,5 +1,8 @@
 # your_app/chat/base.py
 
+import asyncio
+from pathlib import Path
+
 from flask import Flask
 
 # from flask_sqlalchemy import SQLAlchemy
@@ -7,8 +10,14 @@ from utils.logger import get_logger
 from chats.controllers.chat import chat_bp
 from chats.controllers.mcp_control import mcp_control_bp
 from chats.controllers.ingestion_pipeline import ingestion_bp
+from chats.controllers.debug import debug_bp
 from services.mcp_client import MCPClient
+from services.ingestion_client import IngestionClient
+from services.ingestion_status import IngestionStatusHub
+from services.ingestion_dedup import IngestionDedupIndex
+from services.chunked_upload import ChunkedUploadStore
 from config.mcp_settings import MCPSettings
+from utils.event_loop import get_background_loop
 # from config.flask_settings import FlaskConfig
 
 
@@ -28,8 +37,39 @@ def create_app(config_object=None):
     model_name = app.config.get(mcp_set.llm_model, "gpt-4o")
     mcp = MCPClient(model=model_name)
     app.extensions["mcp_client"] = mcp
+    app.extensions["admission"] = mcp.admission
     logger.info("MCPClient instance created")
 
+    # Client HTTP ber-pool untuk upload & status ingestion
+    ingestion_client = IngestionClient()
+    app.extensions["ingestion_client"] = ingestion_client
+
+    # Staging upload bertahap (resumable) di disk lokal
+    app.extensions["chunked_uploads"] = ChunkedUploadStore(
+        Path(mcp_set.cache_dir) / "uploads",
+        chunk_size=mcp_set.upload_chunk_size_mb * 1024 * 1024,
+        ttl_sec=mcp_set.upload_staging_ttl_sec,
+    )
+
+    # Index hash file → job ingestion sebelumnya (dedup upload)
+    dedup = IngestionDedupIndex(mcp.engine)
+    app.extensions["ingestion_dedup"] = dedup
+
+    # Status hub: satu poller per job untuk semua tab/subscriber
+    status_hub = IngestionStatusHub(ingestion_client)
+
+    def _on_ingestion_done(job_id, kind, snapshot):
+        dedup.update_job(job_id, snapshot)
+        if snapshot.get("status") != "success":
+            return
+        if kind == "kak":
+            mcp.invalidate_kak_cache()
+        elif kind == "product":
+            mcp.invalidate_product_cache()
+
+    status_hub.add_listener(_on_ingestion_done)
+    app.extensions["ingestion_status"] = status_hub
+
     # Init DB
     # db.init_app(app)
     # with app.app_context():
@@ -39,6 +79,7 @@ def create_app(config_object=None):
     app.register_blueprint(chat_bp)
     app.register_blueprint(mcp_control_bp)
     app.register_blueprint(ingestion_bp)
+    app.register_blueprint(debug_bp)
     logger.info("Blueprints registered!")
 
     @app.before_request
@@ -47,3 +88,57 @@ def create_app(config_object=None):
         logger.info("Connected" if ok else "Connect failed")
 
     return app
+
+
+def warm_up(app) -> bool:
+    """Siapkan satu worker sebelum menerima request (dipanggil setelah fork).
+
+    Tokenizer & modul sudah dimuat di master (preload); di sini per worker:
+    buang koneksi SQLite warisan master, buka sesi MCP di background loop
+    (sekaligus init Mem0 & ambil skema tool), dan isi listing KAK.
+    """
+    logger = get_logger(app.import_name)
+    mcp = app.extensions["mcp_client"]
+    timeout = MCPSettings().server_warmup_timeout_sec
+
+    # Koneksi pool yang ikut ter-fork tidak boleh dipakai dua proses
+    mcp.engine.dispose(close=False)
+
+    bg = get_background_loop()
+    try:
+        ok = bg.submit(mcp.connect()).result(timeout)
+        if ok:
+            bg.submit(mcp.list_kak_files()).result(timeout)
+    except Exception as e:
+        logger.warning("Warm-up worker gagal: %s", e)
+        return False
+    logger.info("Warm-up worker %s", "selesai" if ok else "gagal konek MCP")
+    return ok
+
+
+async def warm_up_async(app) -> bool:
+    """Warm-up mode ASGI (startup lifespan), di event loop server.
+
+    Loop server dijadikan background loop sehingga sesi MCP, pool httpx dan
+    request berbagi satu loop; lalu sama seperti :func:`warm_up`.
+    """
+    logger = get_logger(app.import_name)
+    mcp = app.extensions["mcp_client"]
+    timeout = MCPSettings().server_warmup_timeout_sec
+
+    get_background_loop().adopt()
+    try:
+        ok = await asyncio.wait_for(mcp.connect(), timeout)
+        if ok:
+            await asyncio.wait_for(mcp.list_kak_files(), timeout)
+    except Exception as e:
+        logger.warning("Warm-up ASGI gagal: %s", e)
+        return False
+    logger.info("Warm-up ASGI %s", "selesai" if ok else "gagal konek MCP")
+    return ok
+
+
+async def shutdown_async(app) -> None:
+    """Tutup sesi MCP & client HTTP ingestion saat server ASGI berhenti."""
+    await app.extensions["mcp_client"].cleanup()
+    await app.extensions["ingestion_client"].aclose()
@@ -4,6 +4,18 @@
 from flask import Blueprint, render_template, request, jsonify, current_app
 # from werkzeug.utils import secure_filename
 from utils.logger import get_logger
+from utils.profiling import should_profile
+from utils.tracing import new_trace_id
+from utils.deadline import (
+    ClientDisconnected,
+    DeadlineExceeded,
+    deadline_scope,
+    disconnect_waiter,
+)
+from services.admission import AdmissionRejected
+from config.mcp_settings import MCPSettings
+
+settings = MCPSettings()
 
 # Ekstensi file yang diizinkan untuk upload
 ALLOWED_EXTENSIONS = {"pdf", "docx", "txt", "md"}
@@ -22,29 +34,66 @@ def index():
     return render_template("index.html")
 
 
+def _busy_response(e: AdmissionRejected):
+    resp = jsonify({"error": "Server sedang sibuk, coba lagi nanti.", "reason": e.reason})
+    resp.status_code = 429
+    resp.headers["Retry-After"] = str(e.retry_after)
+    return resp
+
+
 @chat_bp.route("/chat", methods=["POST"])
 async def chat():
     data = request.get_json(silent=True) or {}
     message = data.get("message")
     if not message:
         return jsonify({"error": "No message provided"}), 400
+    user_id = data.get("user_id")
+    # Kuota admission per user; UI tidak mengirim user_id → per alamat client,
+    # bukan satu bucket "default" untuk semua pengunjung
+    client_id = str(user_id or request.remote_addr or "default")
+    user_id = str(user_id or "default")
 
     # Ambil instance MCPClient di sini, dalam aplikasi context
     mcp_client = current_app.extensions["mcp_client"]
-
-    # Pastikan terhubung
-    if not mcp_client.is_connected():
-        connected = await mcp_client.connect()
-        if not connected:
-            logger.error("Gagal terhubung ke MCP server sebelum chat")
-            return jsonify({"error": "Connection to MCP server failed"}), 500
-
-    try:
-        response = await mcp_client.process_query(message)
-        return jsonify({"response": response})
-    except Exception as e:
-        logger.error(f"Error saat memproses chat: {e}", exc_info=True)
-        return jsonify({"error": "Internal server error"}), 500
+    admission = current_app.extensions["admission"]
+
+    trace_id = new_trace_id()
+    # Satu deadline untuk seluruh request; dibaca tiap tahap di bawahnya
+    with deadline_scope(
+        settings.chat_deadline_sec, disconnect_waiter(request.environ)
+    ) as deadline:
+        try:
+            # Tolak cepat saat penuh, sebelum menyentuh MCP/LLM
+            async with admission.admit("chat", client_id):
+                # Pastikan terhubung
+                if not mcp_client.is_connected():
+                    connected = await mcp_client.connect()
+                    if not connected:
+                        logger.error("Gagal terhubung ke MCP server sebelum chat")
+                        return jsonify({"error": "Connection to MCP server failed"}), 500
+
+                response = await deadline.run(
+                    mcp_client.process_query(
+                        message,
+                        user_id=user_id,
+                        trace_id=trace_id,
+                        profile=should_profile(request.headers.get("X-Profile")),
+                        client_id=client_id,
+                    ),
+                    stage="chat",
+                )
+            return jsonify({"response": response, "trace_id": trace_id})
+        except AdmissionRejected as e:
+            return _busy_response(e)
+        except DeadlineExceeded as e:
+            logger.warning("[%s] Chat melebihi deadline di %s", trace_id, e.stage)
+            return jsonify({"error": "Request timeout", "trace_id": trace_id}), 504
+        except ClientDisconnected:
+            # Client sudah pergi; status ala nginx hanya untuk log/metrik
+            return jsonify({"error": "Client closed request"}), 499
+        except Exception as e:
+            logger.error("Error saat memproses chat: %s", e, exc_info=True)
+            return jsonify({"error": "Internal server error"}), 500
 
 
 mcp_control_bp = Blueprint("mcp_control", __name__)
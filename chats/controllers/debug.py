@@ -0,0 +1,94 @@
+import re
+from typing import Any, Dict, List
+
+from flask import Blueprint, Response, jsonify, render_template, request
+from utils.logger import get_logger
+from utils.profiling import load_profile
+from utils.tracing import get_tracer
+
+
+debug_bp = Blueprint("debug", __name__, url_prefix="/debug")
+logger = get_logger(__name__)
+
+_TRACE_ID_RE = re.compile(r"^[0-9a-f]{4,32}$")
+
+
+def _waterfall(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Susun span menjadi baris waterfall (urutan DFS, offset & lebar relatif)."""
+    t0 = min(s["start"] for s in spans)
+    t_end = max(s["start"] + (s["duration_ms"] or 0) / 1000 for s in spans)
+    total_ms = max((t_end - t0) * 1000, 0.001)
+
+    children: Dict[Any, List[Dict[str, Any]]] = {}
+    ids = {s["span_id"] for s in spans}
+    for s in spans:
+        # Span yang induknya hilang (file dirotasi) ditampilkan sebagai root
+        parent = s["parent_id"] if s["parent_id"] in ids else None
+        children.setdefault(parent, []).append(s)
+
+    rows: List[Dict[str, Any]] = []
+
+    def walk(parent: Any, depth: int) -> None:
+        for s in sorted(children.get(parent, []), key=lambda s: s["start"]):
+            offset = (s["start"] - t0) * 1000
+            duration = s["duration_ms"] or 0
+            rows.append(
+                {
+                    **s,
+                    "depth": depth,
+                    "offset_ms": round(offset, 1),
+                    "left_pct": round(offset / total_ms * 100, 2),
+                    "width_pct": max(round(duration / total_ms * 100, 2), 0.3),
+                }
+            )
+            walk(s["span_id"], depth + 1)
+
+    walk(None, 0)
+    return {"total_ms": round(total_ms, 1), "rows": rows}
+
+
+@debug_bp.route("/traces", methods=["GET"])
+def list_traces():
+    """Trace terbaru (root span), yang paling lambat di atas dengan ?sort=slow."""
+    traces = get_tracer().sink.recent()  # type: ignore[union-attr]
+    if request.args.get("sort") == "slow":
+        traces.sort(key=lambda t: t["duration_ms"] or 0, reverse=True)
+    if request.args.get("format") == "json":
+        return jsonify({"traces": traces})
+    return render_template("debug_traces.html", traces=traces, trace=None)
+
+
+@debug_bp.route("/traces/<trace_id>", methods=["GET"])
+def show_trace(trace_id: str):
+    """Waterfall satu trace: di mana waktu request dihabiskan."""
+    if not _TRACE_ID_RE.match(trace_id):
+        return jsonify({"error": "trace_id tidak valid"}), 400
+    spans = get_tracer().sink.read(trace_id)  # type: ignore[union-attr]
+    if not spans:
+        return jsonify({"error": "Trace tidak ditemukan"}), 404
+
+    waterfall = _waterfall(spans)
+    if request.args.get("format") == "json":
+        return jsonify({"trace_id": trace_id, **waterfall})
+    return render_template(
+        "debug_traces.html",
+        trace_id=trace_id,
+        trace=waterfall,
+        traces=None,
+        has_profile=load_profile(trace_id) is not None,
+    )
+
+
+@debug_bp.route("/profiles/<trace_id>", methods=["GET"])
+def show_profile(trace_id: str):
+    """Ringkasan profil (wall vs CPU, frame teratas); ?format=folded untuk flamegraph.
+
+    Output folded bisa langsung dibuka di speedscope.app atau ``flamegraph.pl``.
+    """
+    folded = request.args.get("format") == "folded"
+    data = load_profile(trace_id, folded=folded)
+    if data is None:
+        return jsonify({"error": "Profil tidak ditemukan"}), 404
+    if folded:
+        return Response(data, mimetype="text/plain")
+    return Response(data, mimetype="application/json")
@@ -1,106 +1,520 @@
 # chats/controllers/ingestion_pipeline.py
 
-import requests
-from flask import Blueprint, current_app, request, jsonify
+import asyncio
+import hashlib
+import json
+import time
+
+import httpx
+from flask import Blueprint, Response, current_app, request, jsonify
 from utils.logger import get_logger
+from utils.multipart_stream import UPLOAD_CHUNK_SIZE, HashingUpload
+from services.ingestion_client import KAK_UPLOAD_PATH, PRODUCT_UPLOAD_PATH
+from services.ingestion_status import TERMINAL_STATUSES, UNTRACKED
+from services.chunked_upload import ChunkedUploadError
+from config.mcp_settings import MCPSettings
 
 
 ingestion_bp = Blueprint("ingestion", __name__)
 logger = get_logger(__name__)
+settings = MCPSettings()
 
-MCP_UPLOAD_URL = "http://127.0.0.1:5000/api/upload-kak-tor/"
-TIMEOUT = 360  # Waktu tunggu response API
+KAK_REQUIRED_FIELDS = ("project_name", "pelanggan", "tahun")
+PRODUCT_REQUIRED_FIELDS = ("name",)
+LONG_POLL_MAX_SEC = 55
+SSE_HEARTBEAT_SEC = 15
+# Interval cek ulang SSE untuk job yang tidak dipantau hub worker ini
+UNTRACKED_POLL_SEC = 3.0
+DONE_STATUSES = TERMINAL_STATUSES | {"error"}
+FORCE_VALUES = {"1", "true", "on", "yes"}
 
 
-CHECK_STATUS_URL = "http://127.0.0.1:5000/api/check-status?job_id="
+def _wants_force(fields) -> bool:
+    """Opsi eksplisit "force re-ingest" (field form atau query string)."""
+    value = fields.get("force_reingest") or request.args.get("force_reingest", "")
+    return value.strip().lower() in FORCE_VALUES
 
 
-def check_status(job_id):
-    return f"{CHECK_STATUS_URL}{job_id}"
+def _duplicate_response(hit):
+    """Respons untuk file yang isinya sudah pernah diingest."""
+    body = {
+        "duplicate": True,
+        "job_id": hit["job_id"],
+        "status": hit["status"],
+        "summary": hit["summary"],
+        "summary_location": hit["summary_location"],
+        "message": f"File sama dengan '{hit['filename']}' yang sudah diingest, "
+        "memakai hasil sebelumnya.",
+    }
+    if hit["status"] != "success":
+        # Job lama masih berjalan: client cukup memantau job tersebut
+        body["status_url"] = f"/proxy-check-status/{hit['job_id']}"
+        body["events_url"] = f"/ingestion/status/{hit['job_id']}/stream"
+    return body
 
 
-@ingestion_bp.route("/upload-kak-via-flask/", methods=["POST"])
-def upload_kak_via_flask():
-    # 1. Tangkap metadata & file dari form
-    project_name = request.form.get("project_name")
-    pelanggan = request.form.get("pelanggan")
-    tahun = request.form.get("tahun")
-    kak_file = request.files.get("file")
-
-    # Validasi input
-    if not all([project_name, pelanggan, tahun, kak_file]):
+def _accepted_response(job_id):
+    return {
+        "job_id": job_id,
+        "status_url": f"/proxy-check-status/{job_id}",
+        "events_url": f"/ingestion/status/{job_id}/stream",
+        "message": "Upload diterima, polling status ingestion.",
+    }
+
+
+def _file_sha256(f):
+    """Hash file yang sudah di-stage Werkzeug, lalu rewind untuk diupload."""
+    sha, size = hashlib.sha256(), 0
+    f.stream.seek(0)
+    for chunk in iter(lambda: f.stream.read(UPLOAD_CHUNK_SIZE), b""):
+        sha.update(chunk)
+        size += len(chunk)
+    f.stream.seek(0)
+    return sha.hexdigest(), size
+
+
+async def _stream_upload(kind, required_fields, path, label):
+    """Proxy upload multipart ke MCP secara streaming (dipakai KAK & product).
+
+    Field form (termasuk ``force_reingest``) harus dikirim sebelum part file.
+    Dedup sebelum upload hanya berlaku bila client mengirim header
+    ``X-Content-SHA256``: body langsung diteruskan ke MCP sambil di-hash, jadi
+    hash hasil streaming baru diketahui setelah MCP menerima file dan hanya
+    dicatat untuk upload berikutnya.
+    """
+    # 1. Body multipart dibaca bertahap (tidak lewat request.files) agar PDF
+    #    tidak di-spool utuh sebelum diteruskan ke MCP.
+    boundary = request.mimetype_params.get("boundary")
+    if request.mimetype != "multipart/form-data" or not boundary:
+        return jsonify({"error": "Request harus multipart/form-data."}), 400
+
+    upload = HashingUpload(request.stream, boundary)
+    fields = await upload.read_head()
+
+    # Validasi input (field form dikirim sebelum file)
+    if not all(fields.get(k) for k in required_fields) or not upload.filename:
         return jsonify({"error": "Semua field wajib diisi."}), 400
 
-    # 2. Prepare payload & files untuk MCP
-    data = {
-        "project_name": project_name,
-        "pelanggan": pelanggan,
-        "tahun": tahun,
-    }
-    files = {"file": (kak_file.filename, kak_file.stream, kak_file.mimetype)}  # type: ignore
+    # Dedup: hanya lewat hash yang diumumkan client (lihat docstring)
+    dedup = current_app.extensions["ingestion_dedup"]
+    force = _wants_force(fields)
+    claimed = (request.headers.get("X-Content-SHA256") or "").strip().lower()
+    if claimed and not force:
+        hit = dedup.lookup(claimed, kind)
+        if hit is not None:
+            logger.info(
+                f"Upload {label} '{upload.filename}' duplikat → job {hit['job_id']}"
+            )
+            return jsonify(_duplicate_response(hit)), 200
 
-    # 3. Kirim ke MCP dan tunggu respons berisi job_id
+    # 2. Stream body apa adanya ke MCP dan tunggu respons berisi job_id
+    ingestion = current_app.extensions["ingestion_client"]
     try:
-        resp = requests.post(
-            MCP_UPLOAD_URL,
-            data=data,
-            files=files,
-            timeout=TIMEOUT,
+        mcp_json = await ingestion.upload_stream(
+            upload.body(),
+            content_type=request.content_type,  # type: ignore[arg-type]
+            content_length=request.content_length,
+            path=path,
         )
-        resp.raise_for_status()
-    except requests.RequestException as e:
+    except (httpx.HTTPError, ValueError) as e:
         current_app.logger.exception("Gagal meng_forward ke MCP")
         return jsonify({"error": "Gagal mengirim ke MCP: " + str(e)}), 502
 
-    # 4. Ambil job_id dari JSON response MCP
-    mcp_json = resp.json()
+    # 3. Ambil job_id dari JSON response MCP
     job_id = mcp_json.get("job_id")
     if not job_id:
         return jsonify({"error": "MCP tidak mengembalikan job_id."}), 502
 
-    # 5. Kembalikan job_id dan URL untuk polling status
+    logger.info(
+        f"Upload {label} '{upload.filename}' ({upload.bytes_read} bytes) → job {job_id}"
+    )
+    digest = upload.sha256
+    if claimed and digest != claimed:
+        logger.warning(f"X-Content-SHA256 tidak cocok untuk '{upload.filename}'")
+    if digest:
+        dedup.record(
+            digest,
+            kind,
+            job_id,
+            filename=upload.filename,
+            size=upload.file_size,
+            project_name=fields.get("project_name") or fields.get("name"),
+        )
+    await current_app.extensions["ingestion_status"].track(job_id, kind=kind)
+
+    # 4. Kembalikan job_id dan URL untuk memantau status
+    return jsonify(_accepted_response(job_id)), 202
+
+
+@ingestion_bp.route("/upload-kak-via-flask/", methods=["POST"])
+async def upload_kak_via_flask():
+    return await _stream_upload("kak", KAK_REQUIRED_FIELDS, KAK_UPLOAD_PATH, "KAK")
+
+
+@ingestion_bp.route("/upload-product", methods=["POST"])
+async def upload_product():
+    return await _stream_upload(
+        "product", PRODUCT_REQUIRED_FIELDS, PRODUCT_UPLOAD_PATH, "product"
+    )
+
+
+def _batch_metadata(files, form):
+    """Gabungkan metadata bersama (field form) dengan override per file.
+
+    Field ``metadata`` (opsional) berupa JSON: list yang sejajar urutan file,
+    atau dict ``{filename: {project_name, pelanggan, tahun}}``.
+    """
+    shared = {k: form.get(k, "").strip() for k in KAK_REQUIRED_FIELDS}
+    overrides = json.loads(form.get("metadata") or "{}")
+
+    metas = []
+    for i, f in enumerate(files):
+        if isinstance(overrides, list):
+            own = overrides[i] if i < len(overrides) else {}
+        else:
+            own = overrides.get(f.filename, {})
+        meta = dict(shared)
+        meta.update(
+            {k: str(v).strip() for k, v in (own or {}).items() if k in shared and v}
+        )
+        metas.append(meta)
+    return metas
+
+
+@ingestion_bp.route("/upload-kak-batch/", methods=["POST"])
+async def upload_kak_batch():
+    # 1. File di-stage oleh Werkzeug (spool ke disk bila besar), lalu
+    #    diteruskan satu per satu ke MCP dengan paralelisme terbatas.
+    files = [f for f in request.files.getlist("files") if f.filename]
+    if not files:
+        return jsonify({"error": "Tidak ada file yang diupload."}), 400
+    if len(files) > settings.upload_batch_max_files:
+        return jsonify(
+            {"error": f"Maksimal {settings.upload_batch_max_files} file per batch."}
+        ), 400
+
+    try:
+        metas = _batch_metadata(files, request.form)
+    except (ValueError, AttributeError, TypeError):
+        return jsonify({"error": "Field metadata harus JSON yang valid."}), 400
+
+    incomplete = [f.filename for f, m in zip(files, metas) if not all(m.values())]
+    if incomplete:
+        return jsonify({"error": "Semua field wajib diisi.", "files": incomplete}), 400
+
+    ingestion = current_app.extensions["ingestion_client"]
+    dedup = current_app.extensions["ingestion_dedup"]
+    force = _wants_force(request.form)
+
+    async def forward(f, meta):
+        item = {"filename": f.filename, "job_id": None, "error": None}
+        digest, size = await asyncio.to_thread(_file_sha256, f)
+        hit = None if force else dedup.lookup(digest, "kak")
+        if hit is not None:
+            item.update(job_id=hit["job_id"], duplicate=True)
+            if hit["status"] == "success":
+                item["result"] = {
+                    k: hit[k] for k in ("status", "summary", "summary_location")
+                }
+            return item
+        try:
+            mcp_json = await ingestion.upload_file(
+                f.stream,
+                f.filename,
+                meta,
+                content_type=f.mimetype or "application/octet-stream",
+            )
+            item["job_id"] = mcp_json.get("job_id")
+            if not item["job_id"]:
+                item["error"] = "MCP tidak mengembalikan job_id."
+            else:
+                dedup.record(
+                    digest,
+                    "kak",
+                    item["job_id"],
+                    filename=f.filename,
+                    size=size,
+                    project_name=meta["project_name"],
+                )
+        except (httpx.HTTPError, ValueError) as e:
+            logger.warning(f"Upload batch '{f.filename}' gagal: {e}")
+            item["error"] = "Gagal mengirim ke MCP: " + str(e)
+        return item
+
+    # 2. Semaphore upload di IngestionClient membatasi upload simultan
+    items = await asyncio.gather(*(forward(f, m) for f, m in zip(files, metas)))
+
+    # 3. Daftarkan batch di status hub (tiap job langsung dipantau)
+    hub = current_app.extensions["ingestion_status"]
+    batch_id = await hub.create_batch(items)
+    accepted = sum(1 for item in items if item["job_id"])
+    logger.info(f"Upload batch {batch_id}: {accepted}/{len(items)} file diterima MCP")
+
+    for item in items:
+        if item["job_id"] and "result" not in item:
+            item["status_url"] = f"/proxy-check-status/{item['job_id']}"
+            item["events_url"] = f"/ingestion/status/{item['job_id']}/stream"
+
     return jsonify(
         {
-            "job_id": job_id,
-            "status_url": f"/proxy-check-status/{job_id}",
-            "message": "Upload diterima, polling status ingestion.",
+            "batch_id": batch_id,
+            "status_url": f"/ingestion/batch/{batch_id}",
+            "files": items,
+            "message": f"{accepted}/{len(items)} file diterima, polling status ingestion.",
         }
-    ), 202
+    ), (202 if accepted else 502)
 
 
-@ingestion_bp.route("/proxy-check-status/<job_id>", methods=["GET"])
-def proxy_check_status(job_id):
+@ingestion_bp.route("/ingestion/batch/<batch_id>", methods=["GET"])
+async def batch_status(batch_id):
+    """Status gabungan batch beserta status per file."""
+    status = await current_app.extensions["ingestion_status"].batch_status(batch_id)
+    if status is None:
+        return jsonify({"error": "Batch tidak ditemukan."}), 404
+    return jsonify(status), 200
+
+
+@ingestion_bp.route("/uploads/kak", methods=["POST"])
+def init_chunked_upload():
+    """Mulai sesi upload bertahap (resumable) untuk satu file KAK.
+
+    Body JSON: ``filename``, ``size``, field KAK wajib, opsional ``sha256``
+    dan ``force_reingest``. Client lalu mengirim tiap chunk lewat
+    ``PUT /uploads/<id>?offset=<n>`` (boleh paralel) dan memanggil finalize.
+    """
+    body = request.get_json(silent=True) or {}
+    fields = {k: str(body.get(k) or "").strip() for k in KAK_REQUIRED_FIELDS}
+    filename, size = body.get("filename"), body.get("size")
+    if not all(fields.values()) or not filename or not isinstance(size, int):
+        return jsonify({"error": "Semua field wajib diisi."}), 400
+    if size > settings.upload_max_size_mb * 1024 * 1024:
+        return jsonify(
+            {"error": f"Ukuran file maksimal {settings.upload_max_size_mb} MB."}
+        ), 413
+
+    sha256 = str(body.get("sha256") or "").strip().lower() or None
+    force = bool(body.get("force_reingest"))
+    if sha256 and not force:
+        hit = current_app.extensions["ingestion_dedup"].lookup(sha256, "kak")
+        if hit is not None:
+            return jsonify(_duplicate_response(hit)), 200
+
+    store = current_app.extensions["chunked_uploads"]
+    try:
+        meta = store.create(filename, size, fields, sha256=sha256, force=force)
+    except ChunkedUploadError as e:
+        return jsonify({"error": str(e)}), 400
+
+    upload_id = meta["upload_id"]
+    return jsonify(
+        {
+            "upload_id": upload_id,
+            "size": size,
+            "chunk_size": store.chunk_size,
+            "upload_url": f"/uploads/{upload_id}",
+            "finalize_url": f"/uploads/{upload_id}/finalize",
+        }
+    ), 201
+
+
+@ingestion_bp.route("/uploads/<upload_id>", methods=["PUT"])
+async def put_upload_chunk(upload_id):
+    """Terima satu chunk (body mentah) dan tulis ke offset-nya di file staging."""
+    offset = request.args.get("offset", type=int)
+    if offset is None:
+        return jsonify({"error": "Parameter offset wajib diisi."}), 400
+
+    store = current_app.extensions["chunked_uploads"]
+    try:
+        written = await asyncio.to_thread(
+            store.write_chunk, upload_id, offset, request.stream
+        )
+    except ChunkedUploadError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"offset": offset, "written": written}), 200
+
+
+@ingestion_bp.route("/uploads/<upload_id>", methods=["GET"])
+def chunked_upload_status(upload_id):
+    """Range byte yang sudah diterima (untuk melanjutkan upload yang terputus)."""
+    try:
+        status = current_app.extensions["chunked_uploads"].status(upload_id)
+    except ChunkedUploadError as e:
+        return jsonify({"error": str(e)}), 404
+    return jsonify(status), 200
+
+
+@ingestion_bp.route("/uploads/<upload_id>/finalize", methods=["POST"])
+async def finalize_chunked_upload(upload_id):
+    """Teruskan file yang sudah lengkap ke MCP (idempoten)."""
+    store = current_app.extensions["chunked_uploads"]
     try:
-        # 1. Panggil MCP Server
-        resp = requests.get(check_status(job_id), timeout=TIMEOUT)
-        resp.raise_for_status()
-
-        # 2. Parse JSON
-        data = resp.json()
-        # data sekarang:
-        # {
-        #   "status": "success",
-        #   "message": "KAK berhasil diingest dan diringkas.",
-        #   "result": { ... }
-        # }
-
-        # 3. Ambil field–field yang Anda butuhkan
-        status = data.get("status")
-        message = data.get("message")
-        result = data.get("result", {})
-        summary = result.get("summary")
-        summary_file = result.get("summary_file")
-
-        # 4. Kembalikan ke client sesuai format yang diinginkan
+        status = store.status(upload_id)
+    except ChunkedUploadError as e:
+        return jsonify({"error": str(e)}), 404
+    if status["job_id"]:
+        return jsonify(_accepted_response(status["job_id"])), 202
+    if not status["complete"]:
         return jsonify(
-            {
-                "status": status,
-                "message": message,
-                "summary": summary,
-                "summary_location": summary_file,
-            }
-        ), 200
-
-    except requests.RequestException as e:
-        current_app.logger.exception("Gagal mengambil status dari MCP Server")
-        return jsonify({"error": f"Gagal fetch status MCP: {e}"}), 502
+            {"error": "Upload belum lengkap.", "received": status["received"]}
+        ), 409
+
+    # Finalize paralel (retry client, worker lain) → hanya satu yang forward
+    if not store.claim_finalize(upload_id):
+        status = store.status(upload_id)
+        if status["job_id"]:
+            return jsonify(_accepted_response(status["job_id"])), 202
+        return jsonify({"error": "Upload sedang difinalisasi."}), 409
+
+    job_id = None
+    try:
+        meta = store.meta(upload_id)
+        digest = await asyncio.to_thread(store.sha256, upload_id)
+        if meta["sha256"] and meta["sha256"] != digest:
+            store.discard(upload_id)
+            return jsonify({"error": "Checksum file tidak cocok, ulangi upload."}), 422
+
+        dedup = current_app.extensions["ingestion_dedup"]
+        hit = None if meta["force"] else dedup.lookup(digest, "kak")
+        if hit is not None:
+            store.discard(upload_id)
+            return jsonify(_duplicate_response(hit)), 200
+
+        # File staging sudah utuh di tempatnya; langsung di-stream ke MCP
+        ingestion = current_app.extensions["ingestion_client"]
+        try:
+            with open(store.data_path(upload_id), "rb") as f:
+                mcp_json = await ingestion.upload_file(
+                    f, meta["filename"], meta["fields"]
+                )
+        except (httpx.HTTPError, ValueError) as e:
+            current_app.logger.exception("Gagal meng_forward ke MCP")
+            return jsonify({"error": "Gagal mengirim ke MCP: " + str(e)}), 502
+
+        job_id = mcp_json.get("job_id")
+        if not job_id:
+            return jsonify({"error": "MCP tidak mengembalikan job_id."}), 502
+
+        logger.info(
+            f"Upload bertahap '{meta['filename']}' ({meta['size']} bytes) → job {job_id}"
+        )
+        store.mark_finalized(upload_id, job_id)
+    finally:
+        if not job_id:
+            # Gagal sebelum ada job → lepas klaim agar finalize bisa diulang
+            store.release_finalize(upload_id)
+    dedup.record(
+        digest,
+        "kak",
+        job_id,
+        filename=meta["filename"],
+        size=meta["size"],
+        project_name=meta["fields"].get("project_name"),
+    )
+    await current_app.extensions["ingestion_status"].track(job_id, kind="kak")
+    return jsonify(_accepted_response(job_id)), 202
+
+
+@ingestion_bp.route("/ingestion/dedup/<sha256>", methods=["GET"])
+def dedup_lookup(sha256):
+    """Cek apakah file dengan hash ini sudah pernah diingest (pre-check UI)."""
+    kind = request.args.get("kind", "kak")
+    hit = current_app.extensions["ingestion_dedup"].lookup(sha256, kind)
+    if hit is None:
+        return jsonify({"duplicate": False}), 404
+    return jsonify(_duplicate_response(hit)), 200
+
+
+@ingestion_bp.route("/proxy-check-status/<job_id>", methods=["GET"])
+async def proxy_check_status(job_id):
+    """Status job dari status hub (bukan poll langsung ke MCP).
+
+    Tanpa parameter respons langsung dikembalikan (perilaku lama). Long-poll
+    opsional: ``?since=<version>&wait=<detik>`` menahan respons sampai status
+    berubah dari versi yang sudah dimiliki client.
+
+    Hanya job yang didaftarkan hub (``track``, saat upload diterima) yang
+    dipoll di background. Job lain (mis. diterima worker lain) dicek sekali
+    ke MCP tanpa memulai poller dan dikembalikan dengan ``version`` 0.
+    """
+    since = request.args.get("since", default=0, type=int)
+    wait = min(request.args.get("wait", default=0, type=float), LONG_POLL_MAX_SEC)
+
+    hub = current_app.extensions["ingestion_status"]
+    version, snapshot = await hub.wait(job_id, since=since, timeout=wait)
+    if version == UNTRACKED:
+        snapshot, version = await hub.check_once(job_id), 0
+
+    if snapshot is None:
+        return jsonify({"status": "pending", "message": None, "version": 0}), 200
+    if snapshot.get("status") == "error":
+        return jsonify({"error": snapshot.get("message")}), 502
+    return jsonify({**snapshot, "version": version}), 200
+
+
+def _sse_step(version, new_version, snapshot):
+    """Satu hasil ``hub.wait`` → (versi, chunk SSE atau None, selesai)."""
+    if snapshot is not None and new_version > version:
+        event = f"id: {new_version}\nevent: status\ndata: {json.dumps(snapshot)}\n\n"
+        return new_version, event, snapshot.get("status") in DONE_STATUSES
+    if snapshot is None or snapshot.get("status") not in DONE_STATUSES:
+        return version, ": keep-alive\n\n", False
+    # Status final (termasuk reconnect dengan Last-Event-ID terakhir)
+    return version, None, True
+
+
+def _sse_untracked(last_status, snapshot):
+    """Hasil ``hub.check_once`` → (status, chunk SSE, selesai); tanpa ``id``."""
+    status = snapshot.get("status")
+    done = status in DONE_STATUSES
+    if status == last_status:
+        return status, ": keep-alive\n\n", done
+    return status, f"event: status\ndata: {json.dumps(snapshot)}\n\n", done
+
+
+@ingestion_bp.route("/ingestion/status/<job_id>/stream", methods=["GET"])
+def stream_ingestion_status(job_id):
+    """Server-Sent Events: satu event ``status`` setiap kali status job berubah.
+
+    Job yang tidak dipantau hub (lihat ``hub.wait``) dicek sekali ke MCP
+    setiap ``UNTRACKED_POLL_SEC`` tanpa memulai poller.
+    """
+    hub = current_app.extensions["ingestion_status"]
+    since = request.headers.get("Last-Event-ID", type=int) or request.args.get(
+        "since", default=0, type=int
+    )
+
+    def events():
+        version, done, last = since, False, None
+        while not done:
+            result = hub.wait_sync(job_id, since=version, timeout=SSE_HEARTBEAT_SEC)
+            if result[0] == UNTRACKED:
+                last, chunk, done = _sse_untracked(last, hub.check_once_sync(job_id))
+                yield chunk
+                if not done:
+                    time.sleep(UNTRACKED_POLL_SEC)
+                continue
+            version, chunk, done = _sse_step(version, *result)
+            if chunk:
+                yield chunk
+
+    async def aevents():
+        # Mode ASGI: menunggu di event loop server tanpa menahan thread
+        version, done, last = since, False, None
+        while not done:
+            result = await hub.wait(job_id, since=version, timeout=SSE_HEARTBEAT_SEC)
+            if result[0] == UNTRACKED:
+                last, chunk, done = _sse_untracked(last, await hub.check_once(job_id))
+                yield chunk
+                if not done:
+                    await asyncio.sleep(UNTRACKED_POLL_SEC)
+                continue
+            version, chunk, done = _sse_step(version, *result)
+            if chunk:
+                yield chunk
+
+    return Response(
+        aevents() if "asgi.scope" in request.environ else events(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
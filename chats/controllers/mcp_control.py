@@ -1,10 +1,52 @@
-from flask import Blueprint, jsonify, current_app
+import time
+
+from flask import Blueprint, Response, jsonify, current_app, g, request
 from utils.logger import get_logger
+from utils import metrics
 
 
 mcp_control_bp = Blueprint("mcp_control", __name__)
 logger = get_logger(__name__)
 
+HTTP_LATENCY = metrics.histogram(
+    "projectwise_http_request_seconds",
+    "Latency request HTTP per endpoint",
+    ["endpoint", "method", "status"],
+)
+HTTP_IN_FLIGHT = metrics.gauge(
+    "projectwise_http_requests_in_flight",
+    "Request HTTP yang sedang diproses per endpoint",
+    ["endpoint"],
+)
+
+
+# Instrumentasi request (berlaku untuk semua blueprint)
+@mcp_control_bp.before_app_request
+def _metrics_start():
+    g.metrics_start = time.perf_counter()
+    g.metrics_endpoint = request.endpoint or "unknown"
+    HTTP_IN_FLIGHT.inc(endpoint=g.metrics_endpoint)
+
+
+@mcp_control_bp.after_app_request
+def _metrics_observe(response):
+    start = g.get("metrics_start")
+    if start is not None:
+        HTTP_LATENCY.observe(
+            time.perf_counter() - start,
+            endpoint=g.metrics_endpoint,
+            method=request.method,
+            status=response.status_code,
+        )
+    return response
+
+
+@mcp_control_bp.teardown_app_request
+def _metrics_done(exc):
+    endpoint = g.pop("metrics_endpoint", None)
+    if endpoint is not None:
+        HTTP_IN_FLIGHT.dec(endpoint=endpoint)
+
 
 @mcp_control_bp.route("/connect", methods=["POST"])
 async def mcp_connect():
@@ -31,3 +73,20 @@ async def mcp_disconnect():
 def mcp_status():
     mcp = current_app.extensions["mcp_client"]
     return jsonify({"connected": mcp.is_connected()})
+
+
+@mcp_control_bp.route("/llm/metrics", methods=["GET"])
+def llm_metrics():
+    mcp = current_app.extensions["mcp_client"]
+    return jsonify(
+        {
+            "llm": mcp.gateway.metrics(),
+            "tool_selection": mcp.tool_selector.metrics(),
+        }
+    )
+
+
+@mcp_control_bp.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Metrik format teks Prometheus (latency, error, token, cache, in-flight)."""
+    return Response(metrics.REGISTRY.render(), mimetype="text/plain; version=0.0.4")
@@ -85,68 +85,294 @@ document.addEventListener("DOMContentLoaded", () => {
     });
   });
 
-  // Fungsi polling status ingestion
-  async function pollStatus(jobId, statusUrl, interval = 5000) {
-    appendMessage(`Memeriksa status job ${jobId}`, "assistant");
-    const timer = setInterval(async () => {
+  const DONE_STATUSES = ["success", "failure", "failed", "error"];
+  const UNTRACKED_POLL_MS = 3000;
+
+  // Tampilkan satu snapshot status; return true jika job sudah selesai
+  function renderStatus(data) {
+    appendMessage(`Status: ${data.status}`, "assistant");
+    if (data.status === "success" || data.status === "failure" || data.status === "failed") {
+      appendMessage(
+        data.status === "success"
+          ? data.message
+          : `Ingestion gagal: ${data.message}`,
+        "assistant"
+      );
+      if (data.status === "success" && data.summary) {
+        appendMessage(
+          `${data.summary}`,
+          "assistant"
+        );
+      }
+      return true;
+    }
+    return false;
+  }
+
+  // Fallback: long-poll, server menahan respons sampai versi status berubah
+  async function longPollStatus(statusUrl, since = 0, render = renderStatus) {
+    let lastStatus = null;
+    while (true) {
       try {
-        const res  = await fetch(statusUrl);
+        const res  = await fetch(`${statusUrl}?since=${since}&wait=25`);
         const data = await res.json();
         if (!res.ok) throw new Error(data.error || res.statusText);
-
-        appendMessage(`Status: ${data.status}`, "assistant");
-        if (data.status === "success" || data.status === "failure") {
-          clearInterval(timer);
-          appendMessage(
-            data.status === "success"
-              ? data.message
-              : `Ingestion gagal: ${data.message}`,
-            "assistant"
-          );
-          if (data.status === "success" && data.summary) {
-            appendMessage(
-              `${data.summary}`,
-              "assistant"
-            );
+        if (!data.version) {
+          // Job tidak dipantau worker ini (version 0): poll biasa berinterval
+          if (data.status !== lastStatus) {
+            lastStatus = data.status;
+            if (render(data)) return;
           }
+          await new Promise(r => setTimeout(r, UNTRACKED_POLL_MS));
+        } else if (data.version > since) {
+          since = data.version;
+          if (render(data)) return;
         }
       } catch (err) {
-        clearInterval(timer);
-        appendMessage(`Error checking status: ${err.message}`, "assistant");
+        render({ status: "error", message: err.message });
+        return;
+      }
+    }
+  }
+
+  // Pantau status ingestion lewat SSE (push), fallback ke long-poll.
+  // `render(data)` dipanggil tiap perubahan status, return true jika selesai.
+  function watchStatus(statusUrl, eventsUrl, render) {
+    if (!eventsUrl || !window.EventSource) {
+      longPollStatus(statusUrl, 0, render);
+      return;
+    }
+    let since = 0;
+    const source = new EventSource(eventsUrl);
+    source.addEventListener("status", ev => {
+      since = Number(ev.lastEventId) || since;
+      if (render(JSON.parse(ev.data))) source.close();
+    });
+    source.onerror = () => {
+      // Stream ditutup server setelah status final; selain itu pindah ke long-poll
+      if (source.readyState === EventSource.CLOSED) return;
+      source.close();
+      longPollStatus(statusUrl, since, render);
+    };
+  }
+
+  function pollStatus(jobId, statusUrl, eventsUrl) {
+    appendMessage(`Memeriksa status job ${jobId}`, "assistant");
+    watchStatus(statusUrl, eventsUrl, data => {
+      if (data.status === "error") {
+        appendMessage(`Error checking status: ${data.message}`, "assistant");
+        return true;
+      }
+      return renderStatus(data);
+    });
+  }
+
+  // Progres batch: satu baris per file, diperbarui di tempat
+  function watchBatch(batch) {
+    const rows = batch.files.map(f => ({
+      filename: f.filename,
+      status: f.result ? f.result.status : f.job_id ? "pending" : "failure",
+      message: f.error || (f.duplicate ? "duplikat, memakai hasil sebelumnya" : ""),
+    }));
+    const msg = appendMessage("", "assistant");
+    const draw = () => {
+      const done = rows.filter(r => DONE_STATUSES.includes(r.status)).length;
+      const lines = rows.map(r =>
+        `- **${r.filename}**: ${r.status}${r.message ? ` — ${r.message}` : ""}`
+      );
+      msg.innerHTML = md.render(
+        [`Batch ${batch.batch_id}: ${done}/${rows.length} selesai`, "", ...lines].join("\n")
+      );
+    };
+    draw();
+    batch.files.forEach((f, i) => {
+      if (!f.job_id || f.result) return;
+      watchStatus(f.status_url, f.events_url, data => {
+        rows[i].status = data.status;
+        rows[i].message = data.status === "success" ? "" : (data.message || "");
+        draw();
+        return DONE_STATUSES.includes(data.status);
+      });
+    });
+  }
+
+  // SHA-256 isi file (hex); null jika WebCrypto tidak tersedia (non-HTTPS)
+  // (WebCrypto tidak bisa streaming, jadi file sangat besar dilewati)
+  const HASH_MAX_BYTES = 256 * 1024 * 1024;
+  async function sha256Hex(file) {
+    if (!window.crypto || !crypto.subtle || file.size > HASH_MAX_BYTES) return null;
+    const digest = await crypto.subtle.digest("SHA-256", await file.arrayBuffer());
+    return Array.from(new Uint8Array(digest))
+      .map(b => b.toString(16).padStart(2, "0"))
+      .join("");
+  }
+
+  // Tampilkan hasil ingestion sebelumnya untuk file duplikat
+  function showDuplicate(data) {
+    appendMessage(data.message, "assistant");
+    if (data.status === "success") {
+      if (data.summary) appendMessage(`${data.summary}`, "assistant");
+    } else {
+      pollStatus(data.job_id, data.status_url, data.events_url);
+    }
+  }
+
+  // Upload bertahap (resumable) untuk file besar: chunk dikirim paralel,
+  // sesi disimpan di localStorage agar bisa dilanjutkan setelah gagal.
+  const CHUNKED_THRESHOLD = 8 * 1024 * 1024;
+  const CHUNK_PARALLEL = 4;
+  const CHUNK_RETRIES = 3;
+
+  async function chunkedUpload(file, formData, digest) {
+    const sessionKey = `kak-upload:${file.name}:${file.size}:${file.lastModified}`;
+    let session = null;
+    let received = [];
+
+    // Lanjutkan sesi lama jika masih ada di server
+    const savedId = localStorage.getItem(sessionKey);
+    if (savedId) {
+      const res = await fetch(`/uploads/${savedId}`);
+      if (res.ok) {
+        const st = await res.json();
+        session = {
+          upload_id: savedId,
+          chunk_size: st.chunk_size,
+          upload_url: `/uploads/${savedId}`,
+          finalize_url: `/uploads/${savedId}/finalize`,
+        };
+        received = st.received;
+      }
+    }
+    if (!session) {
+      const res = await fetch("/uploads/kak", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({
+          filename: file.name,
+          size: file.size,
+          project_name: formData.get("project_name"),
+          pelanggan: formData.get("pelanggan"),
+          tahun: formData.get("tahun"),
+          sha256: digest,
+          force_reingest: Boolean(formData.get("force_reingest")),
+        }),
+      });
+      const data = await res.json();
+      if (res.status === 200 && data.duplicate) return { res, data };
+      if (!res.ok) throw new Error(data.error || res.statusText);
+      session = data;
+      localStorage.setItem(sessionKey, session.upload_id);
+    }
+
+    // Chunk yang belum sepenuhnya diterima server
+    const covered = (start, end) => received.some(([a, b]) => a <= start && end <= b);
+    const pending = [];
+    for (let offset = 0; offset < file.size; offset += session.chunk_size) {
+      const end = Math.min(offset + session.chunk_size, file.size);
+      if (!covered(offset, end)) pending.push([offset, end]);
+    }
+
+    const progress = appendMessage("", "assistant");
+    const total = Math.ceil(file.size / session.chunk_size);
+    let done = total - pending.length;
+    const draw = () => {
+      progress.innerHTML = md.render(`Upload ${file.name}: ${done}/${total} chunk`);
+    };
+    draw();
+
+    const sendChunk = async ([offset, end]) => {
+      for (let attempt = 1; ; attempt++) {
+        try {
+          const res = await fetch(`${session.upload_url}?offset=${offset}`, {
+            method: "PUT",
+            headers: { "Content-Type": "application/octet-stream" },
+            body: file.slice(offset, end),
+          });
+          if (!res.ok) throw new Error((await res.json()).error || res.statusText);
+          done += 1;
+          draw();
+          return;
+        } catch (err) {
+          if (attempt >= CHUNK_RETRIES) throw err;
+          await new Promise(r => setTimeout(r, 500 * 2 ** attempt));
+        }
       }
-    }, interval);
+    };
+    const worker = async () => {
+      while (pending.length) await sendChunk(pending.shift());
+    };
+    await Promise.all(Array.from({ length: CHUNK_PARALLEL }, worker));
+
+    const res = await fetch(session.finalize_url, { method: "POST" });
+    const data = await res.json();
+    if (res.ok || res.status === 422) localStorage.removeItem(sessionKey);
+    return { res, data };
   }
 
   // 5) Submit form KAK
   formKak.addEventListener("submit", async e => {
     e.preventDefault();
     const formData = new FormData(formKak);
+    const files = formKak.querySelector('input[type="file"]').files;
+    const isBatch = files.length > 1;
+    if (isBatch) {
+      // Lebih dari satu file → endpoint batch (field `files`)
+      formData.delete("file");
+      Array.from(files).forEach(f => formData.append("files", f));
+    }
     
     // Tutup modal ketika submit 
     modalKak.classList.add("hidden");
 
     appendMessage("Upload KAK/TOR diterima, menunggu job_id…", "assistant");
     try {
-      const res  = await fetch("/upload-kak-via-flask/", {
-        method: "POST",
-        body: formData
-      });
-    
+      // Cek duplikat sebelum upload (kecuali "paksa ingest ulang")
+      const headers = {};
+      let digest = null;
+      if (!isBatch && !formData.get("force_reingest")) {
+        digest = await sha256Hex(files[0]);
+        if (digest) {
+          headers["X-Content-SHA256"] = digest;
+          const dup = await fetch(`/ingestion/dedup/${digest}`);
+          if (dup.ok) {
+            showDuplicate(await dup.json());
+            return;
+          }
+        }
+      }
+
+      let res, data;
+      if (!isBatch && files[0].size > CHUNKED_THRESHOLD) {
+        // File besar → upload bertahap yang bisa dilanjutkan
+        ({ res, data } = await chunkedUpload(files[0], formData, digest));
+      } else {
+        res  = await fetch(isBatch ? "/upload-kak-batch/" : "/upload-kak-via-flask/", {
+          method: "POST",
+          headers,
+          body: formData
+        });
+
         // Baca content-type
-    const contentType = res.headers.get("content-type") || "";
-    let data;
-    if (contentType.includes("application/json")) {
-      data = await res.json();
-    } else {
-      // kalau bukan JSON, ambil text untuk debug
-      const text = await res.text();
-      throw new Error(`Expected JSON, got:\n${text}`);
-    }
+        const contentType = res.headers.get("content-type") || "";
+        if (contentType.includes("application/json")) {
+          data = await res.json();
+        } else {
+          // kalau bukan JSON, ambil text untuk debug
+          const text = await res.text();
+          throw new Error(`Expected JSON, got:\n${text}`);
+        }
+      }
 
-      if (res.status === 202) {
+      if (res.status === 200 && data.duplicate) {
+        showDuplicate(data);
+      } else if (res.status === 202) {
         appendMessage(data.message, "assistant");
-        // Mulai polling menggunakan job_id dan status_url
-        pollStatus(data.job_id, data.status_url);
+        // Pantau status menggunakan job_id, events_url & status_url
+        if (isBatch) {
+          watchBatch(data);
+        } else {
+          pollStatus(data.job_id, data.status_url, data.events_url);
+        }
       } else {
         throw new Error(data.error || res.statusText);
       }
@@ -165,10 +391,14 @@ document.addEventListener("DOMContentLoaded", () => {
     try {
       const res  = await fetch("/upload-product", { method: "POST", body: data });
       const json = await res.json();
-      appendMessage(res.ok
-        ? "Product berhasil diupload."
-        : `Error: ${json.error||res.statusText}`, "assistant"
-      );
+      if (res.status === 200 && json.duplicate) {
+        showDuplicate(json);
+      } else if (res.status === 202) {
+        appendMessage("Product berhasil diupload.", "assistant");
+        pollStatus(json.job_id, json.status_url, json.events_url);
+      } else {
+        appendMessage(`Error: ${json.error||res.statusText}`, "assistant");
+      }
     } catch (err) {
       appendMessage("Upload Product gagal: " + err.message, "assistant");
     } finally {
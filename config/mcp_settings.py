@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+from typing import Dict, List
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -26,3 +27,98 @@ class MCPSettings(BaseSettings):
     llm_model: str = "gpt-4o-mini"
     embed_model: str = "text-embedding-3-small"
     llm_temperature: float = 0.0
+
+    # Gateway LLM (pool koneksi, konkurensi, retry, hedging)
+    llm_max_concurrency: int = 16
+    llm_purpose_concurrency: Dict[str, int] = {
+        "router": 8,
+        "chat": 8,
+        "docgen": 6,
+        "memory": 4,
+    }
+    llm_max_retries: int = 4
+    llm_timeout_sec: float = 60.0
+    llm_pool_max_connections: int = 32
+    llm_hedge_after_sec: float = 1.5
+
+    # Seleksi subset tool per query (hemat token skema tool di prompt)
+    tool_top_k: int = 6
+    tool_pinned: Dict[str, List[str]] = {
+        "docgen": [
+            "read_project_markdown",
+            "get_template_placeholders",
+            "generate_proposal_docx",
+        ],
+        "chat": ["list_kak_files", "list_product_files"],
+    }
+
+    # Cache respons LLM deterministik (temperature 0). Mode (env LLM_CACHE_MODE):
+    # off | auto (hanya panggilan deterministik) | record | replay (fixture offline)
+    llm_cache_mode: str = "auto"
+    llm_cache_dir: str = str(Path(__file__).resolve().parent.parent / "cache" / "llm")
+    llm_cache_max_mb: int = 128
+    llm_cache_ttl_sec: int = 7 * 24 * 60 * 60
+
+    # Logging lewat antrean (listener thread), file JSON per modul.
+    # Level per modul: LOG_LEVELS="MCPClient=DEBUG,llm_gateway=WARNING"
+    log_level: str = "INFO"
+    log_levels: str = ""
+    log_json: bool = True
+    log_max_arg_chars: int = 1000
+    log_queue_size: int = 10000
+
+    # Tracing span per request (JSONL lokal, waterfall di /debug/traces/<id>)
+    trace_enabled: bool = True
+    trace_file: str = str(
+        Path(__file__).resolve().parent.parent / "logs" / "traces.jsonl"
+    )
+    trace_max_mb: int = 50
+
+    # Profiling per request: header "X-Profile: 1" atau sampling acak.
+    # Folded stacks + ringkasan wall/CPU di <profile_dir>/<trace_id>.*
+    profile_header_enabled: bool = True
+    profile_sample_rate: float = 0.0
+    profile_interval_ms: float = 5.0
+    profile_max_concurrent: int = 2
+    profile_keep: int = 200
+    profile_dir: str = str(Path(__file__).resolve().parent.parent / "logs" / "profiles")
+
+    # Server produksi: gunicorn -c gunicorn.conf.py (worker di-fork dari
+    # master yang sudah preload app, lalu warm-up per worker)
+    server_bind: str = "0.0.0.0:8000"
+    server_workers: int = 0  # 0 = otomatis (2×CPU+1, maks 8)
+    server_threads: int = 8
+    server_timeout_sec: int = 300
+    server_warmup_timeout_sec: float = 30.0
+    # Mode ASGI (asgi.py): antrean accept & batas koneksi terbuka (0 = tanpa batas)
+    server_backlog: int = 2048
+    server_max_connections: int = 0
+
+    # Batas waktu total satu request /chat (router, mem0, tool loop, docgen);
+    # tiap tahap dipotong sisa waktu ini dan dibatalkan saat client disconnect
+    chat_deadline_sec: float = 240.0
+
+    # Admission control /chat: batas in-flight & antrean per rute, deadline
+    # antrean, dan token bucket per user_id (token/detik, burst)
+    admission_enabled: bool = True
+    admission_max_in_flight: Dict[str, int] = {"chat": 32, "docgen": 4}
+    admission_max_queue: Dict[str, int] = {"chat": 64, "docgen": 4}
+    admission_queue_timeout_sec: float = 2.0
+    admission_user_rate: Dict[str, float] = {"chat": 1.0, "docgen": 1 / 60}
+    admission_user_burst: Dict[str, int] = {"chat": 20, "docgen": 3}
+
+    # Cache lokal (payload tool MCP, dsb.)
+    cache_dir: str = str(Path(__file__).resolve().parent.parent / "cache")
+    payload_cache_max_mb: int = 256
+    payload_cache_ttl_sec: int = 24 * 60 * 60
+
+    # REST API MCP (upload & status ingestion)
+    mcp_api_base_url: str = "http://127.0.0.1:5000/api"
+    upload_timeout_sec: int = 360
+    upload_max_concurrency: int = 4
+    upload_batch_max_files: int = 50
+    # Upload bertahap (resumable) untuk dokumen besar
+    upload_chunk_size_mb: int = 8
+    upload_max_size_mb: int = 512
+    upload_staging_ttl_sec: int = 24 * 60 * 60
+    http_pool_max_connections: int = 20
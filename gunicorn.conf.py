@@ -0,0 +1,35 @@
+# gunicorn.conf.py
+#
+# Mode produksi (multi-proses):
+#
+#     gunicorn -c gunicorn.conf.py
+#
+# Master memuat app sekali (preload: modul, tokenizer, template) lalu fork
+# worker; tiap worker melakukan warm-up (sesi MCP, Mem0, skema tool, listing
+# KAK) sebelum menerima request. Skema tool, respons LLM (router/intent) dan
+# payload tool di-cache di disk (``cache_dir``) sehingga dipakai bersama
+# semua worker. Untuk development tetap pakai ``python runserver.py``.
+
+import multiprocessing
+
+from config.mcp_settings import MCPSettings
+
+settings = MCPSettings()
+
+wsgi_app = "runserver:app"
+bind = settings.server_bind
+workers = settings.server_workers or min(multiprocessing.cpu_count() * 2 + 1, 8)
+# View async Flask memakai satu thread per request selama menunggu I/O
+worker_class = "gthread"
+threads = settings.server_threads
+preload_app = True
+# Pipeline docgen bisa berjalan beberapa menit
+timeout = settings.server_timeout_sec
+graceful_timeout = 30
+keepalive = 5
+
+
+def post_worker_init(worker):
+    from chats.base import warm_up
+
+    warm_up(worker.wsgi)
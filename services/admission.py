@@ -0,0 +1,229 @@
+from __future__ import annotations
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from utils.logger import get_logger
+from utils.event_loop import get_background_loop
+from utils import metrics
+from config.mcp_settings import MCPSettings
+
+settings = MCPSettings()
+logger = get_logger("admission")
+
+MAX_BUCKETS = 10_000
+RETRY_AFTER_MAX_SEC = 60
+# Bobot EWMA durasi layanan (dipakai menaksir Retry-After)
+SERVICE_EWMA_ALPHA = 0.2
+
+ADMISSION_IN_FLIGHT = metrics.gauge(
+    "projectwise_admission_in_flight",
+    "Request yang sedang dilayani per rute",
+    ["route"],
+)
+ADMISSION_QUEUED = metrics.gauge(
+    "projectwise_admission_queued", "Request yang menunggu slot per rute", ["route"]
+)
+ADMISSION_REJECTED = metrics.counter(
+    "projectwise_admission_rejected_total",
+    "Request yang ditolak admission control per rute & alasan",
+    ["route", "reason"],
+)
+ADMISSION_WAIT = metrics.histogram(
+    "projectwise_admission_wait_seconds",
+    "Lama menunggu di antrean sebelum mendapat slot",
+    ["route"],
+    buckets=(0.005, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+
+class AdmissionRejected(RuntimeError):
+    """Request ditolak karena rute penuh atau kuota user habis (→ HTTP 429)."""
+
+    def __init__(self, route: str, reason: str, retry_after: float):
+        super().__init__(f"{route}: {reason}")
+        self.route = route
+        self.reason = reason
+        self.retry_after = max(1, min(math.ceil(retry_after), RETRY_AFTER_MAX_SEC))
+
+
+class _Gate:
+    """Batas in-flight + antrean FIFO berbatas dengan deadline tunggu."""
+
+    def __init__(self, route: str, limit: int, max_queue: int, queue_timeout: float):
+        self.route = route
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.service_sec = 1.0
+
+    def retry_after(self) -> float:
+        # Waktu sampai antrean saat ini habis dilayani
+        return self.service_sec * (len(self.waiters) + 1) / max(self.limit, 1)
+
+    async def acquire(self) -> None:
+        if self.in_flight < self.limit and not self.waiters:
+            self.in_flight += 1
+            return
+        if len(self.waiters) >= self.max_queue:
+            raise AdmissionRejected(self.route, "queue_full", self.retry_after())
+
+        fut = asyncio.get_running_loop().create_future()
+        self.waiters.append(fut)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(fut, self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if fut.done() and not fut.cancelled():
+                # Slot sudah diserahkan tepat saat timeout/cancel → kembalikan
+                self.release(0.0)
+            else:
+                self._discard(fut)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise AdmissionRejected(
+                self.route, "queue_timeout", self.retry_after()
+            ) from None
+        ADMISSION_WAIT.observe(time.perf_counter() - start, route=self.route)
+
+    def _discard(self, fut: asyncio.Future) -> None:
+        try:
+            self.waiters.remove(fut)
+        except ValueError:
+            pass
+
+    def release(self, elapsed: float) -> None:
+        if elapsed > 0:
+            self.service_sec += SERVICE_EWMA_ALPHA * (elapsed - self.service_sec)
+        # Serahkan slot langsung ke penunggu terdepan (in_flight tetap)
+        while self.waiters:
+            fut = self.waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self.in_flight -= 1
+
+
+class _TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Ambil satu token; 0 jika berhasil, selain itu detik sampai token tersedia."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """Admission control per rute (``chat``, ``docgen``) untuk menahan burst.
+
+    - Batas request in-flight per rute; kelebihannya menunggu di antrean
+      FIFO pendek dengan deadline, lalu ditolak cepat (429 + ``Retry-After``)
+      alih-alih ikut menambah beban router LLM, mem0, tool loop dan MCP.
+    - Token bucket per user (``user_id``) per rute agar satu user tidak
+      menghabiskan kapasitas.
+    - ``docgen`` punya batas sendiri yang lebih kecil; slot-nya diambil
+      setelah intent diketahui, di dalam slot ``chat`` yang sudah dipegang.
+
+    State hidup di background event loop (aman dari loop/thread mana pun);
+    batas berlaku per proses worker.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: Optional[Dict[str, int]] = None,
+        max_queue: Optional[Dict[str, int]] = None,
+        queue_timeout: float = settings.admission_queue_timeout_sec,
+        user_rate: Optional[Dict[str, float]] = None,
+        user_burst: Optional[Dict[str, int]] = None,
+        enabled: bool = settings.admission_enabled,
+    ):
+        self.enabled = enabled
+        self._bg = get_background_loop()
+        max_in_flight = max_in_flight or settings.admission_max_in_flight
+        max_queue = max_queue or settings.admission_max_queue
+        self._gates = {
+            route: _Gate(route, limit, max_queue.get(route, 0), queue_timeout)
+            for route, limit in max_in_flight.items()
+        }
+        self._user_rate = dict(user_rate or settings.admission_user_rate)
+        self._user_burst = dict(user_burst or settings.admission_user_burst)
+        self._buckets: OrderedDict[tuple, _TokenBucket] = OrderedDict()
+        for route, gate in self._gates.items():
+            ADMISSION_IN_FLIGHT.set_function(lambda g=gate: g.in_flight, route=route)
+            ADMISSION_QUEUED.set_function(lambda g=gate: len(g.waiters), route=route)
+
+    @asynccontextmanager
+    async def admit(
+        self, route: str, user_id: Optional[str] = None
+    ) -> AsyncIterator[None]:
+        """Pegang satu slot *route* selama blok; raise :class:`AdmissionRejected` jika penuh."""
+        if not self.enabled or route not in self._gates:
+            yield
+            return
+        await self._bg.run(self._acquire(route, user_id))
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            # Lewat call_soon agar slot tetap kembali meski pemanggil di-cancel
+            self._bg.loop.call_soon_threadsafe(
+                self._gates[route].release, time.perf_counter() - start
+            )
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        return {
+            route: {
+                "in_flight": gate.in_flight,
+                "queued": len(gate.waiters),
+                "limit": gate.limit,
+                "service_sec": round(gate.service_sec, 3),
+            }
+            for route, gate in self._gates.items()
+        }
+
+    # ------------- internal (background loop) -------------------------
+    def _check_user(self, route: str, user_id: str) -> None:
+        rate = self._user_rate.get(route)
+        if not rate:
+            return
+        key = (route, user_id)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            burst = self._user_burst.get(route, 1)
+            bucket = self._buckets[key] = _TokenBucket(rate, burst)
+            while len(self._buckets) > MAX_BUCKETS:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        wait = bucket.take()
+        if wait:
+            raise AdmissionRejected(route, "user_rate", wait)
+
+    async def _acquire(self, route: str, user_id: Optional[str]) -> None:
+        try:
+            if user_id is not None:
+                self._check_user(route, user_id)
+            await self._gates[route].acquire()
+        except AdmissionRejected as e:
+            ADMISSION_REJECTED.inc(route=route, reason=e.reason)
+            logger.debug(
+                "Request %s ditolak (%s), retry-after=%ss",
+                route,
+                e.reason,
+                e.retry_after,
+            )
+            raise
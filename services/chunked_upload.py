@@ -0,0 +1,237 @@
+from __future__ import annotations
+import fcntl
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional
+
+from utils.logger import get_logger
+
+
+logger = get_logger("chunked_upload")
+
+WRITE_BLOCK_SIZE = 64 * 1024
+_UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+# Klaim finalize dianggap basi (worker mati di tengah jalan) setelah ini
+FINALIZE_STALE_SEC = 10 * 60
+
+
+class ChunkedUploadError(ValueError):
+    """Request chunk tidak valid (offset di luar batas, sesi tidak ada, ...)."""
+
+
+def _merge_ranges(ranges: List[List[int]]) -> List[List[int]]:
+    merged: List[List[int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+class ChunkedUploadStore:
+    """Staging upload bertahap (resumable) di disk lokal.
+
+    Setiap sesi punya satu file data yang dialokasikan sebesar ukuran akhir;
+    chunk ditulis langsung ke offset-nya dengan ``os.pwrite`` sehingga chunk
+    boleh datang paralel/tidak berurutan dan tidak ada langkah penggabungan.
+    Range yang sudah diterima disimpan di ``meta.json`` agar client bisa
+    melanjutkan upload setelah koneksi putus atau proses di-restart.
+
+    Chunk paralel bisa jatuh ke worker gunicorn yang berbeda, jadi setiap
+    read-modify-write ``meta.json`` dikunci dengan ``flock`` antar-proses.
+    """
+
+    def __init__(self, directory: str | Path, chunk_size: int, ttl_sec: int):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.chunk_size = chunk_size
+        self.ttl_sec = ttl_sec
+
+    # ---------------- helper path & meta ----------------
+    def _dir(self, upload_id: str) -> Path:
+        if not _UPLOAD_ID_RE.match(upload_id):
+            raise ChunkedUploadError("upload_id tidak valid.")
+        return self.directory / upload_id
+
+    def data_path(self, upload_id: str) -> Path:
+        return self._dir(upload_id) / "data"
+
+    def _load_meta(self, upload_id: str) -> Dict[str, Any]:
+        try:
+            return json.loads((self._dir(upload_id) / "meta.json").read_text())
+        except FileNotFoundError:
+            raise ChunkedUploadError("Sesi upload tidak ditemukan.") from None
+
+    @contextmanager
+    def _meta_lock(self, upload_id: str) -> Iterator[None]:
+        # File lock terpisah: meta.json diganti (os.replace) tiap kali disimpan
+        path = self._dir(upload_id)
+        if not path.is_dir():
+            raise ChunkedUploadError("Sesi upload tidak ditemukan.")
+        with open(path / "meta.lock", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _save_meta(self, upload_id: str, meta: Dict[str, Any]) -> None:
+        path = self._dir(upload_id) / "meta.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, path)
+
+    def purge_expired(self) -> int:
+        """Hapus sesi yang tidak disentuh lebih lama dari TTL."""
+        removed = 0
+        cutoff = time.time() - self.ttl_sec
+        for path in self.directory.iterdir():
+            try:
+                if path.is_dir() and path.stat().st_mtime < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+                    removed += 1
+            except OSError:
+                continue
+        if removed:
+            logger.info(f"Staging upload: {removed} sesi kedaluwarsa dihapus")
+        return removed
+
+    # ---------------- API ----------------
+    def create(
+        self,
+        filename: str,
+        size: int,
+        fields: Dict[str, str],
+        sha256: Optional[str] = None,
+        force: bool = False,
+    ) -> Dict[str, Any]:
+        if size <= 0:
+            raise ChunkedUploadError("Ukuran file harus lebih dari 0.")
+        self.purge_expired()
+
+        upload_id = uuid.uuid4().hex
+        path = self._dir(upload_id)
+        path.mkdir()
+        with open(path / "data", "wb") as f:
+            f.truncate(size)  # file sparse, terisi saat chunk datang
+        meta = {
+            "upload_id": upload_id,
+            "filename": os.path.basename(filename),
+            "size": size,
+            "fields": fields,
+            "sha256": sha256,
+            "force": force,
+            "ranges": [],
+            "job_id": None,
+            "created_at": time.time(),
+        }
+        self._save_meta(upload_id, meta)
+        return meta
+
+    def write_chunk(self, upload_id: str, offset: int, stream: BinaryIO) -> int:
+        """Tulis body chunk ke *offset*; kembalikan jumlah byte yang ditulis (blocking)."""
+        meta = self._load_meta(upload_id)
+        if meta["job_id"] or meta.get("finalizing"):
+            raise ChunkedUploadError("Upload sudah difinalisasi.")
+        size = meta["size"]
+        if offset < 0 or offset >= size:
+            raise ChunkedUploadError("Offset di luar ukuran file.")
+
+        written = 0
+        fd = os.open(self.data_path(upload_id), os.O_WRONLY)
+        try:
+            while True:
+                block = stream.read(WRITE_BLOCK_SIZE)
+                if not block:
+                    break
+                if offset + written + len(block) > size:
+                    raise ChunkedUploadError("Chunk melebihi ukuran file.")
+                if written + len(block) > self.chunk_size:
+                    raise ChunkedUploadError("Chunk melebihi ukuran maksimum.")
+                os.pwrite(fd, block, offset + written)
+                written += len(block)
+        finally:
+            os.close(fd)
+
+        if written:
+            with self._meta_lock(upload_id):
+                meta = self._load_meta(upload_id)
+                meta["ranges"] = _merge_ranges(
+                    meta["ranges"] + [[offset, offset + written]]
+                )
+                self._save_meta(upload_id, meta)
+        return written
+
+    def status(self, upload_id: str) -> Dict[str, Any]:
+        meta = self._load_meta(upload_id)
+        received = sum(end - start for start, end in meta["ranges"])
+        return {
+            "upload_id": upload_id,
+            "filename": meta["filename"],
+            "size": meta["size"],
+            "chunk_size": self.chunk_size,
+            "received": meta["ranges"],
+            "received_bytes": received,
+            "complete": received == meta["size"],
+            "job_id": meta["job_id"],
+        }
+
+    def meta(self, upload_id: str) -> Dict[str, Any]:
+        return self._load_meta(upload_id)
+
+    def sha256(self, upload_id: str) -> str:
+        sha = hashlib.sha256()
+        with open(self.data_path(upload_id), "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(block)
+        return sha.hexdigest()
+
+    def claim_finalize(self, upload_id: str) -> bool:
+        """Tandai sesi sedang difinalisasi (atomik antar-worker).
+
+        False jika sesi sudah punya job_id atau finalize lain sedang berjalan,
+        sehingga file yang sama tidak diteruskan ke MCP dua kali.
+        """
+        with self._meta_lock(upload_id):
+            meta = self._load_meta(upload_id)
+            started = meta.get("finalizing")
+            if meta["job_id"] or (
+                started and time.time() - started < FINALIZE_STALE_SEC
+            ):
+                return False
+            meta["finalizing"] = time.time()
+            self._save_meta(upload_id, meta)
+            return True
+
+    def release_finalize(self, upload_id: str) -> None:
+        """Lepas klaim finalize yang gagal agar client bisa mencoba lagi."""
+        try:
+            with self._meta_lock(upload_id):
+                meta = self._load_meta(upload_id)
+                meta["finalizing"] = None
+                self._save_meta(upload_id, meta)
+        except ChunkedUploadError:
+            pass  # sesi sudah dibuang
+
+    def mark_finalized(self, upload_id: str, job_id: str) -> None:
+        """Simpan job_id (finalize idempoten) dan buang file data."""
+        with self._meta_lock(upload_id):
+            meta = self._load_meta(upload_id)
+            meta["job_id"] = job_id
+            meta["finalizing"] = None
+            self._save_meta(upload_id, meta)
+        try:
+            self.data_path(upload_id).unlink()
+        except FileNotFoundError:
+            pass
+
+    def discard(self, upload_id: str) -> None:
+        shutil.rmtree(self._dir(upload_id), ignore_errors=True)
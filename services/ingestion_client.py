@@ -0,0 +1,115 @@
+from __future__ import annotations
+import asyncio
+from typing import Any, AsyncIterator, BinaryIO, Dict, Optional
+
+import httpx
+
+from utils.logger import get_logger
+from utils.event_loop import get_background_loop
+from config.mcp_settings import MCPSettings
+
+settings = MCPSettings()
+logger = get_logger("ingestion_client")
+
+KAK_UPLOAD_PATH = "/upload-kak-tor/"
+PRODUCT_UPLOAD_PATH = "/upload-product/"
+CHECK_STATUS_PATH = "/check-status"
+
+
+class IngestionClient:
+    """Client HTTP async ber-pool untuk REST API ingestion di server MCP.
+
+    Satu ``httpx.AsyncClient`` (keep-alive) hidup di background event loop
+    sehingga koneksi dipakai ulang lintas upload dan cek status, walaupun
+    setiap view Flask berjalan di event loop-nya sendiri. Jumlah upload
+    simultan ke MCP dibatasi semaphore.
+    """
+
+    def __init__(
+        self,
+        base_url: str = settings.mcp_api_base_url,
+        timeout: float = settings.upload_timeout_sec,
+        max_uploads: int = settings.upload_max_concurrency,
+        max_connections: int = settings.http_pool_max_connections,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self._timeout = httpx.Timeout(timeout, connect=10.0)
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=60.0,
+        )
+        self._max_uploads = max_uploads
+        self._bg = get_background_loop()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._upload_sem: Optional[asyncio.Semaphore] = None
+
+    # Dipanggil hanya dari background loop
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url, timeout=self._timeout, limits=self._limits
+            )
+            self._upload_sem = asyncio.Semaphore(self._max_uploads)
+        return self._client
+
+    async def _upload(
+        self, path: str, body: AsyncIterator[bytes], headers: Dict[str, str]
+    ) -> Dict[str, Any]:
+        client = self._http()
+        async with self._upload_sem:  # type: ignore[union-attr]
+            resp = await client.post(path, content=body, headers=headers)
+            resp.raise_for_status()
+            return resp.json()
+
+    async def _upload_form(
+        self,
+        path: str,
+        fields: Dict[str, str],
+        file: tuple,
+    ) -> Dict[str, Any]:
+        client = self._http()
+        async with self._upload_sem:  # type: ignore[union-attr]
+            resp = await client.post(path, data=fields, files={"file": file})
+            resp.raise_for_status()
+            return resp.json()
+
+    async def _get_json(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        resp = await self._http().get(path, params=params)
+        resp.raise_for_status()
+        return resp.json()
+
+    # ------------- API publik (boleh dari loop mana pun) ---------------
+    async def upload_stream(
+        self,
+        body: AsyncIterator[bytes],
+        content_type: str,
+        content_length: Optional[int] = None,
+        path: str = KAK_UPLOAD_PATH,
+    ) -> Dict[str, Any]:
+        """Teruskan body multipart mentah ke MCP secara streaming."""
+        headers = {"Content-Type": content_type}
+        if content_length is not None:
+            headers["Content-Length"] = str(content_length)
+        return await self._bg.run(self._upload(path, body, headers))
+
+    async def upload_file(
+        self,
+        fileobj: BinaryIO,
+        filename: str,
+        fields: Dict[str, str],
+        content_type: str = "application/octet-stream",
+        path: str = KAK_UPLOAD_PATH,
+    ) -> Dict[str, Any]:
+        """Upload satu file (sudah di-stage di disk) beserta field form-nya."""
+        return await self._bg.run(
+            self._upload_form(path, fields, (filename, fileobj, content_type))
+        )
+
+    async def check_status(self, job_id: str) -> Dict[str, Any]:
+        return await self._bg.run(self._get_json(CHECK_STATUS_PATH, {"job_id": job_id}))
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._bg.run(self._client.aclose())
+            self._client = None
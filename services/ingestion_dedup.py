@@ -0,0 +1,127 @@
+from __future__ import annotations
+import time
+from typing import Any, Dict, Optional
+
+import sqlalchemy as sa
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from utils.logger import get_logger
+
+
+logger = get_logger("ingestion_dedup")
+
+FAILED_STATUSES = {"failure", "failed", "error"}
+# Entri yang tak kunjung selesai (poller berhenti, MCP restart) dianggap basi
+PENDING_MAX_AGE_SEC = 60 * 60
+
+Base = declarative_base()
+
+
+class IngestedFile(Base):
+    __tablename__ = "ingested_files"
+    sha256 = sa.Column(sa.String(64), primary_key=True)
+    kind = sa.Column(sa.String(16), primary_key=True)
+    filename = sa.Column(sa.String(255), nullable=False)
+    size = sa.Column(sa.Integer, nullable=False)
+    project_name = sa.Column(sa.String(255))
+    job_id = sa.Column(sa.String(128), nullable=False, index=True)
+    status = sa.Column(sa.String(32), nullable=False)
+    summary = sa.Column(sa.Text)
+    summary_location = sa.Column(sa.String(512))
+    updated_at = sa.Column(sa.Float, nullable=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "sha256": self.sha256,
+            "kind": self.kind,
+            "filename": self.filename,
+            "size": self.size,
+            "project_name": self.project_name,
+            "job_id": self.job_id,
+            "status": self.status,
+            "summary": self.summary,
+            "summary_location": self.summary_location,
+        }
+
+
+class IngestionDedupIndex:
+    """Index hash isi file → job ingestion sebelumnya (beserta ringkasannya).
+
+    Upload dengan hash yang sama tidak perlu diingest ulang oleh MCP: selama
+    job lama masih berjalan atau sudah sukses, hasilnya dipakai kembali. Job
+    yang gagal dihapus dari index sehingga upload berikutnya diproses normal.
+    """
+
+    def __init__(self, engine: sa.Engine):
+        Base.metadata.create_all(engine)
+        self.DBSession = sessionmaker(bind=engine)
+
+    def lookup(self, sha256: str, kind: str = "kak") -> Optional[Dict[str, Any]]:
+        db = self.DBSession()
+        try:
+            row = db.get(IngestedFile, (sha256.lower(), kind))
+            if row is None:
+                return None
+            if (
+                row.status != "success"
+                and time.time() - row.updated_at > PENDING_MAX_AGE_SEC
+            ):
+                return None
+            return row.to_dict()
+        except Exception as e:
+            logger.warning(f"Gagal membaca dedup index {sha256[:12]}: {e}")
+            return None
+        finally:
+            db.close()
+
+    def record(
+        self,
+        sha256: str,
+        kind: str,
+        job_id: str,
+        filename: str,
+        size: int,
+        project_name: Optional[str] = None,
+    ) -> None:
+        db = self.DBSession()
+        try:
+            db.merge(
+                IngestedFile(
+                    sha256=sha256.lower(),
+                    kind=kind,
+                    filename=filename,
+                    size=size,
+                    project_name=project_name,
+                    job_id=job_id,
+                    status="processing",
+                    updated_at=time.time(),
+                )
+            )
+            db.commit()
+        except Exception as e:
+            # Dedup hanya optimasi, jangan sampai menggagalkan upload
+            logger.warning(f"Gagal menyimpan dedup index {sha256[:12]}: {e}")
+        finally:
+            db.close()
+
+    def update_job(self, job_id: str, snapshot: Dict[str, Any]) -> None:
+        """Perbarui status/ringkasan entri milik *job_id* (listener status hub)."""
+        db = self.DBSession()
+        try:
+            query = db.query(IngestedFile).filter_by(job_id=job_id)
+            if snapshot.get("status") in FAILED_STATUSES:
+                query.delete()
+            else:
+                query.update(
+                    {
+                        "status": snapshot.get("status") or "processing",
+                        "summary": snapshot.get("summary"),
+                        "summary_location": snapshot.get("summary_location"),
+                        "updated_at": time.time(),
+                    }
+                )
+            db.commit()
+        except Exception as e:
+            logger.warning(f"Gagal memperbarui dedup index job {job_id}: {e}")
+        finally:
+            db.close()
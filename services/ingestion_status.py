@@ -0,0 +1,307 @@
+from __future__ import annotations
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from utils.logger import get_logger
+from utils.event_loop import get_background_loop
+from .ingestion_client import IngestionClient
+
+
+logger = get_logger("ingestion_status")
+
+TERMINAL_STATUSES = {"success", "failure", "failed"}
+POLL_MIN_SEC = 1.0
+POLL_MAX_SEC = 15.0
+POLL_BACKOFF = 1.5
+# Poller berhenti jika tidak ada subscriber selama ini
+POLL_IDLE_SEC = 120.0
+MAX_POLL_ERRORS = 5
+TERMINAL_CACHE_SIZE = 1000
+TERMINAL_CACHE_TTL_SEC = 60 * 60
+MAX_BATCHES = 500
+# Versi dari wait() untuk job yang tidak didaftarkan lewat track()
+UNTRACKED = -1
+
+Snapshot = Dict[str, Any]
+CompletionListener = Callable[[str, str, Snapshot], None]
+
+
+def to_snapshot(data: Dict[str, Any]) -> Snapshot:
+    """Normalisasi respons ``check-status`` MCP ke format yang dipakai UI."""
+    result = data.get("result") or {}
+    return {
+        "status": data.get("status"),
+        "message": data.get("message"),
+        "summary": result.get("summary"),
+        "summary_location": result.get("summary_file"),
+    }
+
+
+@dataclass
+class _Job:
+    kind: str
+    snapshot: Optional[Snapshot] = None
+    version: int = 0
+    waiters: int = 0
+    last_seen: float = field(default_factory=time.monotonic)
+    changed: asyncio.Condition = field(default_factory=asyncio.Condition)
+    poller: Optional[asyncio.Task] = None
+
+
+class IngestionStatusHub:
+    """Satu poller upstream per job, dibagikan ke banyak subscriber.
+
+    Berapa pun tab browser yang memantau job yang sama, hanya ada satu poller
+    ke API ``check-status`` MCP dengan interval adaptif (cepat setelah ada
+    perubahan, melambat saat status diam). Subscriber menunggu perubahan
+    versi lewat :meth:`wait` (dipakai endpoint SSE dan long-poll). Hasil
+    terminal di-cache sehingga tidak pernah dipoll ulang, dan listener
+    dipanggil saat job selesai (mis. invalidasi cache listing KAK).
+
+    Semua state hidup di background event loop.
+    """
+
+    def __init__(self, client: IngestionClient):
+        self._client = client
+        self._bg = get_background_loop()
+        self._jobs: Dict[str, _Job] = {}
+        self._terminal: OrderedDict[str, Tuple[float, int, Snapshot]] = OrderedDict()
+        self._listeners: List[CompletionListener] = []
+        self._batches: OrderedDict[str, List[Dict[str, Any]]] = OrderedDict()
+
+    def add_listener(self, listener: CompletionListener) -> None:
+        """Daftarkan callback ``listener(job_id, kind, snapshot)`` untuk job selesai.
+
+        Listener dipanggil di thread pool, bukan di background loop.
+        """
+        self._listeners.append(listener)
+
+    # ------------- API publik (boleh dari loop mana pun) ---------------
+    async def track(self, job_id: str, kind: str = "kak") -> None:
+        """Mulai memantau job baru (dipanggil setelah upload diterima MCP)."""
+        await self._bg.run(self._track(job_id, kind))
+
+    async def wait(
+        self, job_id: str, since: int = 0, timeout: float = 25.0
+    ) -> Tuple[int, Optional[Snapshot]]:
+        """Tunggu sampai versi status > *since* atau *timeout*; kembalikan (versi, snapshot).
+
+        Job yang tidak didaftarkan lewat :meth:`track` (id sembarang, atau job
+        yang diterima worker lain) tidak pernah dipoll: hasilnya langsung
+        ``(UNTRACKED, None)`` dan pemanggil memakai :meth:`check_once`.
+        """
+        return await self._bg.run(self._wait(job_id, since, timeout))
+
+    def wait_sync(
+        self, job_id: str, since: int = 0, timeout: float = 25.0
+    ) -> Tuple[int, Optional[Snapshot]]:
+        """Versi blocking dari :meth:`wait` untuk generator SSE (sinkron)."""
+        if self._bg.in_loop():
+            raise RuntimeError(
+                "wait_sync() akan memblokir background loop; pakai wait()"
+            )
+        fut = self._bg.submit(self._wait(job_id, since, timeout))
+        return fut.result(timeout + 10)
+
+    async def check_once(self, job_id: str) -> Snapshot:
+        """Cek status satu kali ke MCP tanpa memulai poller (untuk job UNTRACKED)."""
+        return await self._bg.run(self._check_once(job_id))
+
+    def check_once_sync(self, job_id: str) -> Snapshot:
+        """Versi blocking dari :meth:`check_once` untuk generator SSE (sinkron)."""
+        if self._bg.in_loop():
+            raise RuntimeError(
+                "check_once_sync() akan memblokir background loop; pakai check_once()"
+            )
+        return self._bg.submit(self._check_once(job_id)).result()
+
+    async def create_batch(self, items: List[Dict[str, Any]]) -> str:
+        """Daftarkan batch upload; *items* berisi ``filename``, ``job_id``, ``error``."""
+        return await self._bg.run(self._create_batch(items))
+
+    async def batch_status(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Status gabungan batch dari status tiap job di dalamnya."""
+        return await self._bg.run(self._batch_status(batch_id))
+
+    # ------------- internal (background loop) -------------------------
+    async def _create_batch(self, items: List[Dict[str, Any]]) -> str:
+        batch_id = uuid.uuid4().hex
+        self._batches[batch_id] = items
+        while len(self._batches) > MAX_BATCHES:
+            self._batches.popitem(last=False)
+        for item in items:
+            # Item duplikat yang sudah sukses membawa hasilnya sendiri
+            if item.get("job_id") and "result" not in item:
+                await self._track(item["job_id"], item.get("kind", "kak"))
+        return batch_id
+
+    async def _peek(self, job_id: str) -> Optional[Snapshot]:
+        cached = self._cached_terminal(job_id)
+        if cached is not None:
+            return cached[1]
+        job = self._jobs.get(job_id)
+        if job is None:
+            # Poller job ini sudah berhenti: cek sekali, error sementara → pending
+            snapshot = await self._check_once(job_id)
+            return None if snapshot.get("status") == "error" else snapshot
+        if job.poller is None or job.poller.done():
+            await self._track(job_id, job.kind)
+        job.last_seen = time.monotonic()
+        return job.snapshot
+
+    async def _check_once(self, job_id: str) -> Snapshot:
+        try:
+            snapshot = to_snapshot(await self._client.check_status(job_id))
+        except (httpx.HTTPError, ValueError) as e:
+            return {"status": "error", "message": f"Gagal fetch status MCP: {e}"}
+        if snapshot.get("status") in TERMINAL_STATUSES:
+            # Hasil final tidak berubah lagi; listener tetap milik worker pemantau
+            self._cache_terminal(job_id, 1, snapshot)
+        return snapshot
+
+    async def _batch_status(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        items = self._batches.get(batch_id)
+        if items is None:
+            return None
+
+        files = []
+        counts: Dict[str, int] = {}
+        for item in items:
+            entry = {"filename": item["filename"], "job_id": item.get("job_id")}
+            if item.get("result"):
+                snapshot = item["result"]
+            elif item.get("job_id"):
+                snapshot = await self._peek(item["job_id"]) or {"status": "pending"}
+            else:
+                snapshot = {"status": "failure", "message": item.get("error")}
+            entry.update(snapshot)
+            files.append(entry)
+            counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+
+        done = sum(n for s, n in counts.items() if s in TERMINAL_STATUSES | {"error"})
+        ok = counts.get("success", 0)
+        if done < len(files):
+            status = "processing"
+        elif ok == len(files):
+            status = "success"
+        elif ok == 0:
+            status = "failure"
+        else:
+            status = "partial"
+        return {
+            "batch_id": batch_id,
+            "status": status,
+            "total": len(files),
+            "completed": done,
+            "counts": counts,
+            "files": files,
+        }
+
+    def _cached_terminal(self, job_id: str) -> Optional[Tuple[int, Snapshot]]:
+        entry = self._terminal.get(job_id)
+        if entry is None:
+            return None
+        stored_at, version, snapshot = entry
+        if time.monotonic() - stored_at > TERMINAL_CACHE_TTL_SEC:
+            del self._terminal[job_id]
+            return None
+        return version, snapshot
+
+    async def _track(self, job_id: str, kind: str) -> _Job:
+        job = self._jobs.get(job_id)
+        if job is None:
+            job = self._jobs[job_id] = _Job(kind=kind)
+        job.last_seen = time.monotonic()
+        if job.poller is None or job.poller.done():
+            job.poller = asyncio.create_task(self._poll(job_id, job))
+        return job
+
+    async def _wait(
+        self, job_id: str, since: int, timeout: float
+    ) -> Tuple[int, Optional[Snapshot]]:
+        cached = self._cached_terminal(job_id)
+        if cached is not None:
+            return cached
+
+        job = self._jobs.get(job_id)
+        if job is None:
+            return UNTRACKED, None
+        if job.poller is None or job.poller.done():
+            await self._track(job_id, job.kind)
+        job.waiters += 1
+        try:
+            async with job.changed:
+                await asyncio.wait_for(
+                    job.changed.wait_for(lambda: job.version > since), timeout
+                )
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            job.waiters -= 1
+            job.last_seen = time.monotonic()
+        return job.version, job.snapshot
+
+    async def _publish(self, job: _Job, snapshot: Snapshot) -> None:
+        async with job.changed:
+            job.snapshot = snapshot
+            job.version += 1
+            job.changed.notify_all()
+
+    async def _poll(self, job_id: str, job: _Job) -> None:
+        interval = POLL_MIN_SEC
+        errors = 0
+        while True:
+            try:
+                snapshot = to_snapshot(await self._client.check_status(job_id))
+                errors = 0
+            except (httpx.HTTPError, ValueError) as e:
+                errors += 1
+                logger.warning(f"Polling status job {job_id} gagal ({errors}x): {e}")
+                if errors >= MAX_POLL_ERRORS:
+                    await self._publish(
+                        job,
+                        {"status": "error", "message": f"Gagal fetch status MCP: {e}"},
+                    )
+                    self._jobs.pop(job_id, None)
+                    return
+                await asyncio.sleep(min(interval * POLL_BACKOFF, POLL_MAX_SEC))
+                continue
+
+            if snapshot != job.snapshot:
+                await self._publish(job, snapshot)
+                interval = POLL_MIN_SEC
+            else:
+                interval = min(interval * POLL_BACKOFF, POLL_MAX_SEC)
+
+            if snapshot.get("status") in TERMINAL_STATUSES:
+                await self._finish(job_id, job, snapshot)
+                return
+
+            idle = time.monotonic() - job.last_seen
+            if job.waiters == 0 and idle > POLL_IDLE_SEC:
+                logger.info(f"Polling job {job_id} dihentikan (tanpa subscriber)")
+                self._jobs.pop(job_id, None)
+                return
+            await asyncio.sleep(interval)
+
+    def _cache_terminal(self, job_id: str, version: int, snapshot: Snapshot) -> None:
+        self._terminal[job_id] = (time.monotonic(), version, snapshot)
+        while len(self._terminal) > TERMINAL_CACHE_SIZE:
+            self._terminal.popitem(last=False)
+
+    async def _finish(self, job_id: str, job: _Job, snapshot: Snapshot) -> None:
+        self._cache_terminal(job_id, job.version, snapshot)
+        self._jobs.pop(job_id, None)
+        logger.info(f"Job {job_id} selesai: status={snapshot.get('status')}")
+        for listener in self._listeners:
+            try:
+                # Listener boleh blocking (DB, disk): jangan tahan loop bersama
+                await asyncio.to_thread(listener, job_id, job.kind, snapshot)
+            except Exception as e:
+                logger.warning(f"Listener job {job_id} gagal: {e}")
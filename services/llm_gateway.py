@@ -0,0 +1,458 @@
+from __future__ import annotations
+import asyncio
+import random
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Deque, Dict, Optional, TypeVar
+
+import httpx
+import openai
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from openai.types.chat import ChatCompletion, ParsedChatCompletion
+
+from utils.logger import get_logger
+from utils.event_loop import get_background_loop
+from utils.disk_cache import DiskCache, content_key
+from utils.tracing import span
+from utils.deadline import time_left, within
+from utils import metrics
+from config.mcp_settings import MCPSettings
+
+settings = MCPSettings()
+logger = get_logger("llm_gateway")
+
+T = TypeVar("T")
+
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+BACKOFF_BASE_SEC = 0.5
+BACKOFF_MAX_SEC = 20.0
+# Retry-After lebih lama dari ini tidak ditunggu (langsung gagal)
+RETRY_AFTER_MAX_SEC = 60.0
+LATENCY_WINDOW = 1000
+
+LLM_LATENCY = metrics.histogram(
+    "projectwise_llm_request_seconds",
+    "Latency panggilan OpenAI per purpose",
+    ["purpose"],
+)
+LLM_TOKENS = metrics.counter(
+    "projectwise_llm_tokens_total",
+    "Token OpenAI per purpose (prompt, cached, completion)",
+    ["purpose", "type"],
+)
+LLM_ERRORS = metrics.counter(
+    "projectwise_llm_errors_total",
+    "Panggilan OpenAI gagal (setelah retry)",
+    ["purpose"],
+)
+LLM_RETRIES = metrics.counter(
+    "projectwise_llm_retries_total", "Retry panggilan OpenAI", ["purpose"]
+)
+LLM_IN_FLIGHT = metrics.gauge(
+    "projectwise_llm_in_flight", "Panggilan OpenAI yang sedang berjalan", ["purpose"]
+)
+
+CACHE_MODES = ("off", "auto", "record", "replay")
+CACHE_NAMESPACE = "llm"
+# Respons terpotong / terfilter tidak layak di-cache
+CACHEABLE_FINISH_REASONS = {"stop", "tool_calls"}
+
+
+class LLMCacheMiss(RuntimeError):
+    """Mode replay: tidak ada rekaman untuk request ini."""
+
+
+def cache_key(method: str, kwargs: Dict[str, Any]) -> str:
+    """Hash stabil dari request (model, messages, tools, tool_choice, dst.)."""
+    key_args = dict(kwargs)
+    fmt = key_args.get("response_format")
+    if isinstance(fmt, type):
+        # Kelas pydantic (structured output) → pakai skemanya
+        key_args["response_format"] = {
+            "name": fmt.__name__,
+            "schema": fmt.model_json_schema(),
+        }
+    return content_key(method, key_args)
+
+
+def _load_cached(method: str, kwargs: Dict[str, Any], raw: str) -> Any:
+    fmt = kwargs.get("response_format")
+    if method == "parse" and isinstance(fmt, type):
+        return ParsedChatCompletion[fmt].model_validate_json(raw)  # type: ignore[valid-type]
+    return ChatCompletion.model_validate_json(raw)
+
+
+def _is_cacheable(resp: Any) -> bool:
+    choices = getattr(resp, "choices", None) or []
+    return bool(choices) and all(
+        c.finish_reason in CACHEABLE_FINISH_REASONS for c in choices
+    )
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Baca ``retry-after-ms`` / ``retry-after`` dari respons error OpenAI."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRY_STATUS
+    return isinstance(error, httpx.TransportError)
+
+
+class _PurposeStats:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.in_flight = 0
+        self.prompt_tokens = 0
+        # Token prompt yang dilayani dari prompt cache OpenAI (prefix identik)
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def snapshot(self) -> Dict[str, Any]:
+        lat = sorted(self.latencies)
+
+        def pct(p: float) -> Optional[float]:
+            if not lat:
+                return None
+            return round(lat[min(len(lat) - 1, int(p * len(lat)))] * 1000, 1)
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "in_flight": self.in_flight,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "prompt_cache_ratio": (
+                round(self.cached_tokens / self.prompt_tokens, 3)
+                if self.prompt_tokens
+                else None
+            ),
+            "completion_tokens": self.completion_tokens,
+            "latency_ms": {"p50": pct(0.5), "p95": pct(0.95), "p99": pct(0.99)},
+        }
+
+
+class LLMGateway:
+    """Satu pintu untuk semua panggilan OpenAI.
+
+    - Satu ``AsyncOpenAI`` dengan connection pool httpx yang di-tuning, hidup
+      di background event loop (dipakai bersama lintas request Flask).
+    - Semaphore global + per *purpose* (``router``, ``chat``, ``docgen``,
+      ``memory``) agar satu jenis beban tidak menghabiskan kuota yang lain.
+    - Retry dengan backoff ber-jitter yang menghormati ``Retry-After``.
+    - Hedged request untuk panggilan kecil (router intent).
+    - Cache respons di disk untuk panggilan deterministik, plus mode
+      record/replay (``LLM_CACHE_MODE``) untuk fixture pengujian offline.
+    - Metrik latency & token per purpose (:meth:`metrics`).
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = settings.llm_max_concurrency,
+        purpose_limits: Optional[Dict[str, int]] = None,
+        max_retries: int = settings.llm_max_retries,
+        timeout: float = settings.llm_timeout_sec,
+        max_connections: int = settings.llm_pool_max_connections,
+        cache_mode: str = settings.llm_cache_mode,
+        cache_dir: str = settings.llm_cache_dir,
+    ):
+        self._max_concurrency = max_concurrency
+        self._purpose_limits = dict(purpose_limits or settings.llm_purpose_concurrency)
+        self._max_retries = max_retries
+        self._timeout = timeout
+        self._max_connections = max_connections
+        self._bg = get_background_loop()
+        self._client: Optional[AsyncOpenAI] = None
+        self._global_sem: Optional[asyncio.Semaphore] = None
+        self._purpose_sems: Dict[str, asyncio.Semaphore] = {}
+        self._stats: Dict[str, _PurposeStats] = {}
+
+        if cache_mode not in CACHE_MODES:
+            raise ValueError(f"llm_cache_mode harus salah satu dari {CACHE_MODES}")
+        self.cache_mode = cache_mode
+        self.cache: Optional[DiskCache] = None
+        if cache_mode != "off":
+            self.cache = DiskCache(
+                cache_dir,
+                max_bytes=settings.llm_cache_max_mb * 1024 * 1024,
+                default_ttl=settings.llm_cache_ttl_sec,
+            )
+            metrics.register_cache("llm", self.cache)
+
+    # ------------- internal (background loop) -------------------------
+    def _openai(self) -> AsyncOpenAI:
+        if self._client is None:
+            http_client = DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=self._max_connections,
+                    max_keepalive_connections=self._max_connections,
+                    keepalive_expiry=90.0,
+                ),
+                timeout=httpx.Timeout(self._timeout, connect=10.0),
+            )
+            # Retry ditangani gateway (bukan SDK) agar semaphore tidak ditahan
+            # selama backoff dan metrik retry tercatat.
+            self._client = AsyncOpenAI(http_client=http_client, max_retries=0)
+            self._global_sem = asyncio.Semaphore(self._max_concurrency)
+        return self._client
+
+    def _sem(self, purpose: str) -> asyncio.Semaphore:
+        sem = self._purpose_sems.get(purpose)
+        if sem is None:
+            limit = self._purpose_limits.get(purpose, self._max_concurrency)
+            sem = self._purpose_sems[purpose] = asyncio.Semaphore(limit)
+        return sem
+
+    def _stat(self, purpose: str) -> _PurposeStats:
+        return self._stats.setdefault(purpose, _PurposeStats())
+
+    async def _limited(self, purpose: str, coro: Awaitable[T]) -> T:
+        self._openai()
+        stats = self._stat(purpose)
+        async with self._sem(purpose), self._global_sem:  # type: ignore[union-attr]
+            stats.in_flight += 1
+            LLM_IN_FLIGHT.inc(purpose=purpose)
+            try:
+                return await coro
+            finally:
+                stats.in_flight -= 1
+                LLM_IN_FLIGHT.dec(purpose=purpose)
+
+    async def _call(self, purpose: str, method: str, kwargs: Dict[str, Any]) -> Any:
+        completions = self._openai().chat.completions
+        fn = completions.parse if method == "parse" else completions.create
+        stats = self._stat(purpose)
+
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                with span("llm.attempt", attempt=attempt + 1) as s:
+                    resp = await within(
+                        self._limited(purpose, fn(**kwargs)), stage=f"llm.{purpose}"
+                    )
+                    usage = getattr(resp, "usage", None)
+                    cached = 0
+                    if usage is not None:
+                        details = getattr(usage, "prompt_tokens_details", None)
+                        cached = getattr(details, "cached_tokens", None) or 0
+                        s.set(
+                            prompt_tokens=usage.prompt_tokens,
+                            completion_tokens=usage.completion_tokens,
+                            cached_tokens=cached,
+                        )
+            except Exception as e:
+                wait = _retry_after(e)
+                backoff = random.uniform(
+                    0, min(BACKOFF_MAX_SEC, BACKOFF_BASE_SEC * 2**attempt)
+                )
+                delay = max(wait or 0.0, backoff)
+                left = time_left()
+                if (
+                    not _is_retryable(e)
+                    or attempt >= self._max_retries
+                    or (wait or 0) > RETRY_AFTER_MAX_SEC
+                    # Retry tidak mungkin selesai sebelum deadline request
+                    or (left is not None and left <= delay)
+                ):
+                    stats.errors += 1
+                    LLM_ERRORS.inc(purpose=purpose)
+                    raise
+                attempt += 1
+                stats.retries += 1
+                LLM_RETRIES.inc(purpose=purpose)
+                logger.warning(
+                    "LLM %s gagal (%s), retry %s/%s dalam %.2fs",
+                    purpose,
+                    type(e).__name__,
+                    attempt,
+                    self._max_retries,
+                    delay,
+                )
+                await asyncio.sleep(delay)
+                continue
+
+            elapsed = time.perf_counter() - start
+            stats.calls += 1
+            stats.latencies.append(elapsed)
+            LLM_LATENCY.observe(elapsed, purpose=purpose)
+            if usage is not None:
+                stats.prompt_tokens += usage.prompt_tokens or 0
+                stats.cached_tokens += cached
+                stats.completion_tokens += usage.completion_tokens or 0
+                LLM_TOKENS.inc(usage.prompt_tokens or 0, purpose=purpose, type="prompt")
+                LLM_TOKENS.inc(cached, purpose=purpose, type="cached")
+                LLM_TOKENS.inc(
+                    usage.completion_tokens or 0, purpose=purpose, type="completion"
+                )
+            logger.debug(
+                "LLM %s %s %.0fms tokens=%s/%s cached=%s",
+                purpose,
+                kwargs.get("model"),
+                elapsed * 1000,
+                getattr(usage, "prompt_tokens", "?"),
+                getattr(usage, "completion_tokens", "?"),
+                cached,
+            )
+            return resp
+
+    async def _hedged(
+        self, purpose: str, method: str, kwargs: Dict[str, Any], hedge_after: float
+    ) -> Any:
+        stats = self._stat(purpose)
+        primary = asyncio.create_task(self._call(purpose, method, kwargs))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+            if done:
+                return primary.result()
+
+            # Primary lambat → kirim request kedua, pakai yang selesai duluan
+            stats.hedges += 1
+            backup = asyncio.create_task(self._call(purpose, method, kwargs))
+            tasks.append(backup)
+            pending = {primary, backup}
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            stats.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error  # type: ignore[misc]
+        finally:
+            # Termasuk saat pemanggil di-cancel (deadline/disconnect): jangan
+            # biarkan request upstream memegang slot semaphore & koneksi
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _cached(
+        self,
+        purpose: str,
+        method: str,
+        kwargs: Dict[str, Any],
+        deterministic: Optional[bool],
+        hedge_after: Optional[float] = None,
+    ) -> Any:
+        def upstream() -> Awaitable[Any]:
+            if hedge_after is not None:
+                return self._hedged(purpose, method, kwargs, hedge_after)
+            return self._call(purpose, method, kwargs)
+
+        if deterministic is None:
+            deterministic = kwargs.get("temperature") == 0
+        mode = self.cache_mode
+        with span(f"llm.{purpose}", model=kwargs.get("model"), method=method) as s:
+            if self.cache is None or (mode == "auto" and not deterministic):
+                return await upstream()
+
+            stats = self._stat(purpose)
+            key = cache_key(method, kwargs)
+            if mode != "record":
+                raw = self.cache.get(CACHE_NAMESPACE, key)
+                if raw is not None:
+                    stats.cache_hits += 1
+                    s.set(cache="hit")
+                    return _load_cached(method, kwargs, raw)
+                if mode == "replay":
+                    raise LLMCacheMiss(
+                        f"Tidak ada rekaman LLM untuk {purpose} ({key[:12]})"
+                    )
+
+            stats.cache_misses += 1
+            s.set(cache="miss")
+            resp = await upstream()
+            if _is_cacheable(resp):
+                # Rekaman (record) tidak kedaluwarsa agar bisa jadi fixture
+                ttl = 0 if mode == "record" else None
+                self.cache.set(CACHE_NAMESPACE, key, resp.model_dump_json(), ttl=ttl)
+            return resp
+
+    # ------------- API publik (boleh dari loop mana pun) ---------------
+    async def chat(
+        self, purpose: str, *, deterministic: Optional[bool] = None, **kwargs: Any
+    ) -> Any:
+        """``chat.completions.create`` lewat pool, semaphore & retry gateway.
+
+        *deterministic* (default: ``temperature == 0``) mengaktifkan cache respons.
+        """
+        return await self._bg.run(
+            self._cached(purpose, "create", kwargs, deterministic)
+        )
+
+    async def parse(
+        self, purpose: str, *, deterministic: Optional[bool] = None, **kwargs: Any
+    ) -> Any:
+        """``chat.completions.parse`` (structured output)."""
+        return await self._bg.run(self._cached(purpose, "parse", kwargs, deterministic))
+
+    async def hedged(
+        self,
+        purpose: str,
+        method: str = "create",
+        hedge_after: float = settings.llm_hedge_after_sec,
+        *,
+        deterministic: Optional[bool] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """Panggilan idempoten & murah: kirim duplikat jika belum selesai dalam *hedge_after*."""
+        return await self._bg.run(
+            self._cached(purpose, method, kwargs, deterministic, hedge_after)
+        )
+
+    async def run_limited(self, purpose: str, coro: Awaitable[T]) -> T:
+        """Jalankan *coro* (mis. operasi mem0) di bawah semaphore *purpose* + metrik."""
+        stats = self._stat(purpose)
+        start = time.perf_counter()
+        try:
+            result = await self._bg.run(self._limited(purpose, coro))
+        except Exception:
+            stats.errors += 1
+            raise
+        stats.calls += 1
+        stats.latencies.append(time.perf_counter() - start)
+        return result
+
+    def metrics(self) -> Dict[str, Any]:
+        return {purpose: s.snapshot() for purpose, s in self._stats.items()}
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._bg.run(self._client.close())
+            self._client = None
@@ -1,9 +1,9 @@
 from __future__ import annotations
 import asyncio
 import json
-import uuid
 import time
-from contextlib import AsyncExitStack, suppress
+from contextlib import nullcontext, suppress
+from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 import sqlalchemy as sa
@@ -13,22 +13,64 @@ from anyio import ClosedResourceError
 from dotenv import load_dotenv
 
 from utils.logger import get_logger
-from utils.helper import safe_args, truncate_by_tokens, infer_kak_md, best_match
+from utils.helper import safe_args, truncate_by_tokens, infer_kak_md
+from utils.disk_cache import DiskCache, content_key
+from utils.event_loop import get_background_loop
+from utils.fuzzy_index import TrigramIndex
+from utils.profiling import profiled
+from utils.tracing import new_trace_id, span
+from utils.deadline import DeadlineExceeded, check_deadline, within
+from utils import metrics
 from config.mcp_settings import MCPSettings
-from openai import AsyncOpenAI
 from mcp import ClientSession
 from mcp.client.streamable_http import streamablehttp_client
 from .mem0ai import Mem0Manager
+from .llm_gateway import LLMGateway
+from .tool_selector import ToolSelector
 from .routing_workflow_intent import classify_intent
+from .prompt_instruction import PROMPT_CHAT_ASSISTANT
 from .pipeline_product_proposal import run as run_docgen_pipeline
+from .pipeline_checkpoint import PipelineCheckpointStore
+from .admission import AdmissionController
 
 TOOL_TIMEOUT_SEC = 30
 PIPE_TIMEOUT_SEC = 180
+KAK_LISTING_MAX_AGE_SEC = 30
+TEMPLATE_CACHE_TTL_SEC = 60 * 60
+TOOLS_REFRESH_SEC = 60
+PRODUCT_LISTING_TTL_SEC = 10 * 60
+
+# Tool dengan payload besar & jarang berubah → disimpan di cache lokal
+CACHEABLE_TOOLS = {
+    "read_project_markdown",
+    "get_template_placeholders",
+    "list_product_files",
+}
+# TTL per tool (None = hanya berdasarkan version tag)
+CACHE_TTL_SEC = {
+    "get_template_placeholders": TEMPLATE_CACHE_TTL_SEC,
+    "list_product_files": PRODUCT_LISTING_TTL_SEC,
+}
+# Field metadata listing yang dipakai sebagai version tag (urutan prioritas)
+VERSION_FIELDS = ("sha256", "hash", "etag", "mtime", "modified", "updated_at")
 
 load_dotenv()
 settings = MCPSettings()
 logger = get_logger("MCPClient")
 
+CHAT_LATENCY = metrics.histogram(
+    "projectwise_chat_request_seconds", "Latency process_query per intent", ["intent"]
+)
+TOOL_LATENCY = metrics.histogram(
+    "projectwise_tool_call_seconds", "Latency call_tool MCP per tool", ["tool"]
+)
+TOOL_ERRORS = metrics.counter(
+    "projectwise_tool_call_errors_total", "call_tool MCP yang gagal per tool", ["tool"]
+)
+MCP_RECONNECTS = metrics.counter(
+    "projectwise_mcp_reconnects_total", "Reconnect sesi MCP per penyebab", ["reason"]
+)
+
 
 # SQLAlchemy setup for short-term memory
 Base = declarative_base()
@@ -51,6 +93,36 @@ class Message(Base):
     timestamp = sa.Column(sa.DateTime, server_default=sa.func.now())
 
 
+def build_chat_prompt(
+    messages: List[Dict[str, str]], memories: Optional[List[str]]
+) -> List[Dict[str, Any]]:
+    """Susun prompt route chat dari riwayat (+ pesan user terakhir) dan memori mem0.
+
+    Urutan prompt stabil → prefix (system + tools) bisa di-cache provider:
+    system statis, riwayat percakapan, lalu memori & query paling akhir.
+    Blok memori dilewati jika *memories* ``None`` (pencarian mem0 gagal).
+    """
+    *history, user_msg = messages
+    prompt: List[Dict[str, Any]] = [
+        {"role": "system", "content": PROMPT_CHAT_ASSISTANT()},
+        *history,
+    ]
+    if memories is not None:
+        mem_block = (
+            "\n".join(f"- {truncate_by_tokens(text=m)}" for m in memories)
+            or "[Tidak ada]"
+        )
+        logger.debug("mem0 search: %s", mem_block)
+        prompt.append(
+            {
+                "role": "system",
+                "content": f"Memori historis relevan:\n{mem_block}\n\nGunakan memori di atas jika membantu.",
+            }
+        )
+    prompt.append(user_msg)
+    return prompt
+
+
 class MCPClient:
     def __init__(
         self,
@@ -59,24 +131,42 @@ class MCPClient:
     ):
         # LLM and MCP settings
         self.model = model
-        self.llm = AsyncOpenAI()
-        self.memory_mgr = Mem0Manager()
+        self.gateway = LLMGateway()
+        self.memory_mgr = Mem0Manager(gateway=self.gateway)
+        self.admission = AdmissionController()
         self.settings = settings
+        self.logger = logger
         self.session: Optional[ClientSession] = None
         self._connected = False
 
         # Short-term memory DB init
         engine = sa.create_engine(memory_db, connect_args={"check_same_thread": False})
         Base.metadata.create_all(engine)
+        self.engine = engine
         self.DBSession = sessionmaker(bind=engine)
+        self.checkpoints = PipelineCheckpointStore(engine)
 
         # Async tasks and caches
-        self._exit_stack: Optional[AsyncExitStack] = None
+        # Sesi MCP dimiliki satu task di background loop (lihat connect())
+        self._bg = get_background_loop()
+        self._session_task: Optional[asyncio.Task] = None
+        self._closing: Optional[asyncio.Event] = None
         self._keep_alive_task: Optional[asyncio.Task] = None
         self._tools_update_task: Optional[asyncio.Task] = None
         self.tool_cache: List[Dict[str, Any]] = []
+        self.tool_selector = ToolSelector()
+        self.payload_cache = DiskCache(
+            Path(settings.cache_dir) / "payloads",
+            max_bytes=settings.payload_cache_max_mb * 1024 * 1024,
+            default_ttl=settings.payload_cache_ttl_sec,
+        )
+        metrics.register_cache("payload", self.payload_cache)
+        self._kak_listing: List[Any] = []
+        self._kak_listing_at = 0.0
+        self.kak_index = TrigramIndex()
         self._auto_reconnect = True
         self._reconnect_lock = asyncio.Lock()
+        self._connect_lock = asyncio.Lock()
 
         logger.info("MCPClient initialized with short-term memory support")
 
@@ -112,6 +202,7 @@ class MCPClient:
             async with self._reconnect_lock:
                 if not self.is_connected():
                     logger.warning("MCP session lost, reconnecting now...")
+                    MCP_RECONNECTS.inc(reason="session_lost")
                     await self.connect()
 
     async def keep_alive_loop(self, interval: int = 30) -> None:
@@ -133,53 +224,99 @@ class MCPClient:
             if filtered:
                 raise BaseExceptionGroup("Errors in keep_alive_loop", filtered)
         except Exception as e:
-            logger.warning(f"Heartbeat failed: {e}")
+            logger.warning("Heartbeat failed: %s", e)
+            MCP_RECONNECTS.inc(reason="heartbeat")
             asyncio.create_task(self.cleanup())
             asyncio.create_task(self.connect())
 
     async def _periodic_tools_update(self) -> None:
-        """Fetch list_tools() tiap 60 detik dan simpan di cache."""
+        """Refresh skema tool tiap ``TOOLS_REFRESH_SEC`` detik."""
         while True:
-            await asyncio.sleep(60)
+            await asyncio.sleep(TOOLS_REFRESH_SEC)
             if not self.is_connected():
                 continue
             try:
-                tools_result = await self.session.list_tools()  # type: ignore
-                self.tool_cache = [
-                    {
-                        "type": "function",
-                        "function": {
-                            "name": t.name,
-                            "description": t.description,
-                            "parameters": t.inputSchema,
-                        },
-                    }
-                    for t in tools_result.tools
-                ]
+                self.tool_cache = await self._fetch_tools()
                 logger.debug("Tool cache updated")
             except Exception as e:
-                logger.warning(f"Failed to update tool cache: {e}")
+                logger.warning("Failed to update tool cache: %s", e)
+
+    async def _fetch_tools(self) -> List[Dict[str, Any]]:
+        """Skema tool dari store bersama (antar worker) atau ``list_tools()``.
+
+        Entry di ``payload_cache`` (file, aman lintas proses) berumur
+        ``TOOLS_REFRESH_SEC``, sehingga N worker tidak masing-masing memanggil
+        ``list_tools()`` saat start maupun refresh berkala.
+        """
+        key = content_key(self.settings.mcp_server_url)
+        shared = self.payload_cache.get("tools", key)
+        if shared is not None:
+            return json.loads(shared)
+
+        result = await self._bg.run(self.session.list_tools())  # type: ignore[union-attr]
+        tools = [
+            {
+                "type": "function",
+                "function": {
+                    "name": t.name,
+                    "description": t.description,
+                    "parameters": t.inputSchema,
+                },
+            }
+            # Urut nama: urutan list_tools() tidak dijamin, padahal
+            # skema tools adalah bagian prefix prompt yang di-cache
+            for t in sorted(result.tools, key=lambda t: t.name)
+        ]
+        self.payload_cache.set("tools", key, json.dumps(tools), ttl=TOOLS_REFRESH_SEC)
+        return tools
 
     async def connect(self, endpoint: Optional[str] = None) -> bool:
-        url = endpoint or self.settings.mcp_server_url
+        """Buka sesi MCP sekali per proses, di background loop.
+
+        View Flask berjalan di event loop baru per request; stream anyio sesi
+        MCP dan task heartbeat yang dibuat di loop request ikut mati bersama
+        loop itu. Di background loop sesi dipakai bersama semua request.
+        """
         if self._connected:
             return True
+        return await self._bg.run(self._connect(endpoint))
 
-        # 1) Buat stack baru
-        self._exit_stack = AsyncExitStack()
-        await self._exit_stack.__aenter__()
-
+    async def _session_runner(self, url: str, ready: asyncio.Future) -> None:
+        """Pemilik sesi: masuk & keluar context transport di task yang sama."""
         try:
-            # 2) Masuk HTTP transport
-            http_ctx = streamablehttp_client(url)
-            read_s, write_s, _ = await self._exit_stack.enter_async_context(http_ctx)
+            async with streamablehttp_client(url) as (read_s, write_s, _):
+                async with ClientSession(read_s, write_s) as session:
+                    await session.initialize()
+                    self.session = session
+                    ready.set_result(True)
+                    await self._closing.wait()  # type: ignore[union-attr]
+        except BaseException as e:
+            if not ready.done():
+                ready.set_exception(e if isinstance(e, Exception) else RuntimeError(e))
+            elif not isinstance(e, asyncio.CancelledError):
+                logger.warning("Sesi MCP berakhir: %s", e)
+        finally:
+            self.session = None
+            self._connected = False
 
-            # 3) Masuk MCP ClientSession
-            session_ctx = ClientSession(read_s, write_s)
-            self.session = await self._exit_stack.enter_async_context(session_ctx)
+    async def _connect(self, endpoint: Optional[str] = None) -> bool:
+        url = endpoint or self.settings.mcp_server_url
+        async with self._connect_lock:
+            if self._connected:
+                return True
+
+            # 1) Task pemilik sesi: HTTP transport + MCP ClientSession
+            ready = asyncio.get_running_loop().create_future()
+            self._closing = asyncio.Event()
+            self._session_task = asyncio.create_task(self._session_runner(url, ready))
+            try:
+                await ready
+            except Exception as e:
+                logger.error("Gagal terhubung ke MCP server %s: %s", url, e)
+                self._session_task = None
+                return False
 
-            # 4) Inisialisasi & heartbeat
-            await self.session.initialize()
+            # 2) Heartbeat & refresh tool
             self._connected = True
             self._keep_alive_task = asyncio.create_task(self.keep_alive_loop())
             if not self._tools_update_task:
@@ -187,27 +324,24 @@ class MCPClient:
                     self._periodic_tools_update()
                 )
 
-            # 5) Inisialisasi Mem0
-            try:
-                await self.memory_mgr.init()
-            except Exception as e:
-                logger.warning(f"Mem0 init failed: {e}")
-
-            # 6) List tools
-            self.tools = await self.get_tools()
-            logger.info(
-                f"Available tools: {[t['function']['name'] for t in self.tools]}"
-            )
+        # 3) Inisialisasi Mem0
+        try:
+            await self.memory_mgr.init()
+        except Exception as e:
+            logger.warning("Mem0 init failed: %s", e)
 
-            return True
+        # 4) List tools
+        self.tools = await self.get_tools()
+        logger.info("Available tools: %s", [t["function"]["name"] for t in self.tools])
 
-        except Exception:
-            # kalau gagal, tutup stack
-            await self._exit_stack.aclose()
-            self._connected = False
-            return False
+        return True
 
     async def call_tool(self, name: str, args: Dict[str, Any]) -> str:
+        return await within(
+            self._bg.run(self._session_call_tool(name, args)), stage=f"tool.{name}"
+        )
+
+    async def _session_call_tool(self, name: str, args: Dict[str, Any]) -> str:
         # respect manual‐disconnect
         if not self._auto_reconnect and not self.is_connected():
             raise RuntimeError("Session manually disconnected")
@@ -216,15 +350,25 @@ class MCPClient:
         await self.ensure_session_alive()
 
         # sekarang coba kirim
+        start = time.perf_counter()
         try:
-            result = await self.session.call_tool(name, args)  # type: ignore
-            return result.content[0].text  # type: ignore
+            with span(
+                "mcp.call_tool",
+                tool=name,
+                args_bytes=len(json.dumps(args, ensure_ascii=False, default=str)),
+            ) as s:
+                result = await self.session.call_tool(name, args)  # type: ignore
+                text = result.content[0].text  # type: ignore
+                s.set(result_bytes=len(text))
+            TOOL_LATENCY.observe(time.perf_counter() - start, tool=name)
+            return text
 
         except ClosedResourceError:
             # write‐stream closed, reconnect + retry sekali
             logger.warning(
-                f"Write stream closed on tool '{name}', reconnecting and retrying..."
+                "Write stream closed on tool '%s', reconnecting and retrying...", name
             )
+            MCP_RECONNECTS.inc(reason="stream_closed")
             async with self._reconnect_lock:
                 # bersihkan dulu state, new connect
                 await self.cleanup()
@@ -234,110 +378,220 @@ class MCPClient:
 
                 # retry
                 result = await self.session.call_tool(name, args)  # type: ignore
+                TOOL_LATENCY.observe(time.perf_counter() - start, tool=name)
                 return result.content[0].text  # type: ignore
 
         except Exception as e:
-            logger.error(f"Tool call {name} failed: {e}", exc_info=True)
+            TOOL_ERRORS.inc(tool=name)
+            logger.error("Tool call %s failed: %s", name, e, exc_info=True)
             # tandai disconnect agar next call trigger reconnect
             self._connected = False
             raise
 
+    async def list_kak_files(
+        self, max_age: float = KAK_LISTING_MAX_AGE_SEC
+    ) -> List[Any]:
+        """Listing KAK dengan memo singkat; dipakai resolusi proyek & version tag."""
+        if self._kak_listing and time.monotonic() - self._kak_listing_at < max_age:
+            return self._kak_listing
+        try:
+            listing = json.loads(await self.call_tool("list_kak_files", {}))
+        except Exception as e:
+            logger.warning("list_kak_files gagal: %s", e)
+            return self._kak_listing
+        self._kak_listing = listing if isinstance(listing, list) else []
+        self._kak_listing_at = time.monotonic()
+        self.kak_index.update(
+            [
+                e if isinstance(e, str) else str(e.get("name") or e.get("file") or "")
+                for e in self._kak_listing
+            ]
+        )
+        return self._kak_listing
+
+    def invalidate_kak_cache(self) -> None:
+        """Dipanggil setelah ingestion KAK selesai agar listing & markdown di-refresh."""
+        self._kak_listing = []
+        self._kak_listing_at = 0.0
+        self.payload_cache.invalidate("read_project_markdown")
+
+    def invalidate_product_cache(self) -> None:
+        """Dipanggil setelah ingestion product selesai agar listing product di-refresh."""
+        self.payload_cache.invalidate("list_product_files")
+
+    async def _payload_version(self, name: str, args: Dict[str, Any]) -> str:
+        """Version tag untuk key cache.
+
+        Markdown proyek memakai hash/mtime dari metadata ``list_kak_files`` jika
+        server melaporkannya; jika listing hanya berisi nama file, dipakai
+        digest seluruh listing (berubah saat ada KAK baru/dihapus). Placeholder
+        template & listing product memakai digest skema tool + TTL.
+        """
+        if name == "read_project_markdown":
+            listing = await self.list_kak_files()
+            project = str(args.get("project_name", "")).lower()
+            for entry in listing:
+                if not isinstance(entry, dict):
+                    continue
+                fname = str(entry.get("name") or entry.get("file") or "").lower()
+                if fname.rsplit(".", 1)[0] != project:
+                    continue
+                for field in VERSION_FIELDS:
+                    if entry.get(field):
+                        return f"{field}:{entry[field]}:{entry.get('size', '')}"
+            return f"listing:{content_key(listing)}"
+
+        schema = next(
+            (t for t in self.tool_cache if t["function"]["name"] == name), None
+        )
+        return f"schema:{content_key(schema)}"
+
+    async def call_tool_cached(self, name: str, args: Dict[str, Any]) -> str:
+        """call_tool() dengan cache lokal content-addressed untuk CACHEABLE_TOOLS."""
+        with span("tool", tool=name) as s:
+            raw = await self._call_tool_cached(name, args, s)
+            s.set(result_bytes=len(raw) if isinstance(raw, str) else None)
+            return raw
+
+    async def _call_tool_cached(self, name: str, args: Dict[str, Any], s) -> str:
+        if name not in CACHEABLE_TOOLS:
+            return await self.call_tool(name, args)
+
+        version = await self._payload_version(name, args)
+        key = content_key(name, args, version)
+        cached = self.payload_cache.get(name, key)
+        s.set(cache="hit" if cached is not None else "miss")
+        if cached is not None:
+            logger.debug("Payload cache hit: %s %s", name, safe_args(args))
+            return cached
+
+        raw = await self.call_tool(name, args)
+        try:
+            payload = json.loads(raw)
+        except (TypeError, ValueError):
+            return raw
+        ok = isinstance(payload, list) or (
+            isinstance(payload, dict) and payload.get("status", "success") == "success"
+        )
+        if ok:
+            self.payload_cache.set(name, key, raw, ttl=CACHE_TTL_SEC.get(name))
+        return raw
+
     async def get_tools(self) -> List[Dict[str, Any]]:
         # Jika belum ada cache, fetch sekali
         if not self.tool_cache:
             try:
-                result = await self.session.list_tools()  # type: ignore
-                self.tool_cache = [
-                    {
-                        "type": "function",
-                        "function": {
-                            "name": t.name,
-                            "description": t.description,
-                            "parameters": t.inputSchema,
-                        },
-                    }
-                    for t in result.tools
-                ]
+                self.tool_cache = await self._fetch_tools()
             except Exception as e:
-                logger.error(f"Initial get_tools() failed: {e}", exc_info=True)
+                logger.error("Initial get_tools() failed: %s", e, exc_info=True)
         return self.tool_cache
 
+    async def select_tools(
+        self, route: str, query: str, k: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Subset tool untuk *query*: tool pinned milik *route* + top-k relevan."""
+        tools = await self.get_tools()
+        return self.tool_selector.select(tools, query, route=route, k=k)
+
     async def process_query(
         self,
         query: str,
         user_id: str = "default",
         max_turns: int = 20,
+        trace_id: Optional[str] = None,
+        profile: bool = False,
+        client_id: Optional[str] = None,
     ) -> str:
-        trace = uuid.uuid4().hex[:8]
+        trace = trace_id or new_trace_id()
         start = time.perf_counter()
-        logger.info(f"[{trace}] Processing query: {query}")
-
-        # 1) Load recent short-term memory as context
-        history = self._get_short_term(user_id, limit=10)
-        # messages: List[Dict[str, str]] = [
-        #     {"role": msg["role"], "content": msg["content"]} for msg in history
-        # ]
-        # Truncate tiap pesan maksimal 150 token
-        messages = [
-            {
-                "role": m["role"],
-                "content": truncate_by_tokens(text=m["content"], max_tokens=150),
-            }
-            for m in history
-        ]
-        # debug
-        logger.info(f"Short-term memory: {messages}")
+        logger.info("[%s] Processing query: %s", trace, query)
+
+        with (
+            profiled(trace, profile),
+            span(
+                "process_query", trace_id=trace, user_id=user_id, query_chars=len(query)
+            ) as root,
+        ):
+            # 1) Load recent short-term memory as context
+            with span("history.load") as s:
+                history = await asyncio.to_thread(
+                    self._get_short_term, user_id, limit=10
+                )
+                s.set(messages=len(history))
+            # messages: List[Dict[str, str]] = [
+            #     {"role": msg["role"], "content": msg["content"]} for msg in history
+            # ]
+            # Truncate tiap pesan maksimal 150 token
+            messages = [
+                {
+                    "role": m["role"],
+                    "content": truncate_by_tokens(text=m["content"], max_tokens=150),
+                }
+                for m in history
+            ]
+            # debug
+            logger.debug("Short-term memory: %s", messages)
 
-        # 2) Append user message
-        messages.append({"role": "user", "content": query})
-        self._save_short_term(user_id, "user", query)
+            # 2) Append user message
+            messages.append({"role": "user", "content": query})
 
-        # 3) Classify intent
-        intent = "other"
-        for attempt in range(3):
-            try:
-                route = await classify_intent(self.llm, query, self.model)
-                if route.confidence_score >= 0.7:
-                    intent = route.intent
-                logger.info(
-                    f"[{trace}] Intent: {intent} (conf={route.confidence_score:.2f})"
-                )
-                break
-            except Exception as e:
-                logger.error(f"[{trace}] classify_intent error: {e}")
-                await asyncio.sleep(2**attempt)
+            # 3) Classify intent
+            intent = "other"
+            route = await classify_intent(self.gateway, query, self.model)
+            if route.confidence_score >= 0.7:
+                intent = route.intent
+            root.set(intent=intent)
+            logger.info(
+                "[%s] Intent: %s (conf=%.2f)", trace, intent, route.confidence_score
+            )
 
-        # 4) Route to handler
-        if intent == "generate_document":
-            answer = await self._run_docgen(trace, query, user_id, max_turns)
-        else:
-            answer = await self._run_other(query, trace, messages, user_id, max_turns)
+            # 4) Route to handler
+            # Docgen jauh lebih mahal → batas in-flight & kuota user sendiri
+            gate = (
+                self.admission.admit("docgen", client_id or user_id)
+                if intent == "generate_document"
+                else nullcontext()
+            )
+            async with gate:
+                # Disimpan setelah lolos admission: 429 docgen tidak meninggalkan
+                # pesan user tanpa jawaban di history
+                await asyncio.to_thread(self._save_short_term, user_id, "user", query)
+                if intent == "generate_document":
+                    answer = await self._run_docgen(trace, query, user_id, max_turns)
+                else:
+                    answer = await self._run_other(
+                        query, trace, messages, user_id, max_turns
+                    )
 
-        # 5) Save assistant response
-        self._save_short_term(user_id, "assistant", answer)
+            # 5) Save assistant response
+            await asyncio.to_thread(self._save_short_term, user_id, "assistant", answer)
 
         duration = time.perf_counter() - start
-        logger.info(f"[{trace}] Total latency: {duration:.2f}s")
+        CHAT_LATENCY.observe(duration, intent=intent)
+        logger.info("[%s] Total latency: %.2fs", trace, duration)
         return answer
 
     async def cleanup(self):
+        await self._bg.run(self._cleanup())
+
+    async def _cleanup(self):
         # cancel heartbeat
         if self._keep_alive_task:
             self._keep_alive_task.cancel()
             with suppress(asyncio.CancelledError):
                 await self._keep_alive_task
 
-        # close exit stack
-        if self._exit_stack:
+        # minta task pemilik sesi menutup transport dari task-nya sendiri
+        if self._session_task:
+            self._closing.set()  # type: ignore[union-attr]
             try:
-                await self._exit_stack.aclose()
+                await self._session_task
             except Exception as e:
-                # Abaikan error “generator didn’t stop…” atau cancel‐scope mismatch
-                logger.debug(f"Ignored error during exit_stack.aclose(): {e}")
+                logger.debug("Ignored error while closing MCP session: %s", e)
 
         self._connected = False
         self.session = None
-        self._exit_stack = None
+        self._session_task = None
         logger.info("MCPClient disconnected")
 
     async def _run_docgen(
@@ -345,30 +599,31 @@ class MCPClient:
     ):
         slug = infer_kak_md(query)
 
-        try:
-            files_json = await self.call_tool("list_kak_files", {})
-            all_files = json.loads(files_json)
-        except Exception:
-            all_files = []
-        kak_md = best_match(all_files, slug) or slug  # type: ignore
+        await self.list_kak_files()
+        kak_md = self.kak_index.best_match(slug or query) or slug  # type: ignore
 
         try:
-            result = await asyncio.wait_for(
+            result = await within(
                 run_docgen_pipeline(
                     client=self,
                     project_name=kak_md,  # type: ignore
                     user_query=query,
                     override_template=None,
                     max_turns=max_turns,
+                    checkpoint_store=self.checkpoints,
                 ),
-                timeout=PIPE_TIMEOUT_SEC,
+                PIPE_TIMEOUT_SEC,
+                stage="docgen",
             )
             reply = f"Proposal berhasil dibuat untuk proyek “{kak_md}”.\n\nLokasi file: {result}"
+        except DeadlineExceeded:
+            # Deadline request (bukan PIPE_TIMEOUT_SEC) → 504 di view
+            raise
         except asyncio.TimeoutError:
-            logger.error(f"[{trace_id}] run_docgen_pipeline TIMEOUT")
+            logger.error("[%s] run_docgen_pipeline TIMEOUT", trace_id)
             reply = "Maaf, pembuatan proposal melebihi batas waktu."
         except Exception as e:
-            logger.error(f"[{trace_id}] run_docgen_pipeline error: {e}")
+            logger.error("[%s] run_docgen_pipeline error: %s", trace_id, e)
             reply = f"Terjadi kesalahan saat generate proposal: {e}"
 
         await self.memory_mgr.add_conversation(
@@ -389,32 +644,24 @@ class MCPClient:
         max_turns: int,
     ) -> str:
         # Fetch relevant mem0ai if needed
+        raw_mems: Optional[List[str]] = None
         try:
             raw_mems = await self.memory_mgr.get_memories(
                 messages[-1]["content"], limit=5
             )
-            mem_block = (
-                "\n".join(f"- {truncate_by_tokens(text=m)}" for m in raw_mems)
-                or "[Tidak ada]"
-            )
-            # debug
-            logger.info(f"mem0 search: {mem_block}")
-
-            system_mem = {
-                "role": "system",
-                "content": f"Memori historis relevan:\n{mem_block}\n\nGunakan memori di atas jika membantu.",
-            }
-            messages.insert(0, system_mem)
         except Exception as e:
-            logger.error(f"[{trace_id}] mem0 search error: {e}")
+            logger.error("[%s] mem0 search error: %s", trace_id, e)
+        messages = build_chat_prompt(messages, raw_mems)
 
-        # Retrieve tools
-        tools = await self.get_tools()
+        # Retrieve tools (subset relevan; dipilih sekali per query)
+        tools = await self.select_tools("chat", query)
         final_answer: Optional[str] = None
 
         for turn in range(max_turns):
-            logger.info(f"[{trace_id}] - Turn {turn + 1}/{max_turns}")
-            response = await self.llm.chat.completions.create(
+            check_deadline("chat.turn")
+            logger.info("[%s] - Turn %s/%s", trace_id, turn + 1, max_turns)
+            response = await self.gateway.chat(
+                "chat",
                 model=self.model,
                 messages=messages,  # type: ignore
                 tools=tools,  # type: ignore
@@ -433,14 +680,21 @@ class MCPClient:
                 fname = tc.function.name
                 args = json.loads(tc.function.arguments)
                 logger.info(
-                    f"[{trace_id}] · Executing tool {fname} args={safe_args(args)}"
+                    "[%s] · Executing tool %s args=%s",
+                    trace_id,
+                    fname,
+                    safe_args(args),
                 )
                 try:
-                    return await asyncio.wait_for(
-                        self.call_tool(fname, args), timeout=TOOL_TIMEOUT_SEC
+                    return await within(
+                        self.call_tool_cached(fname, args),
+                        TOOL_TIMEOUT_SEC,
+                        stage=f"tool.{fname}",
                     )
+                except DeadlineExceeded:
+                    raise
                 except Exception as e:
-                    logger.error(f"[{trace_id}] tool {fname} error: {e}")
+                    logger.error("[%s] tool %s error: %s", trace_id, fname, e)
                     return f"Error executing {fname}: {e}"
 
             results = await asyncio.gather(
@@ -457,7 +711,7 @@ class MCPClient:
                 )
 
         if not final_answer:
-            logger.warning(f"[{trace_id}] max turns reached without final answer.")
+            logger.warning("[%s] max turns reached without final answer.", trace_id)
             final_answer = (
                 "Maaf, saya belum bisa menyelesaikan permintaan dalam batas waktu."
             )
@@ -6,11 +6,22 @@ import asyncio
 from dotenv import load_dotenv
 from mem0 import AsyncMemory
 from config.mcp_settings import MCPSettings
+from utils.tracing import span
+from utils.deadline import within
+from utils import metrics
+from .llm_gateway import LLMGateway
 
 
 load_dotenv()
 settings = MCPSettings()
 
+MEM0_LATENCY = metrics.histogram(
+    "projectwise_mem0_seconds", "Latency operasi mem0 (search/add)", ["op"]
+)
+MEM0_ERRORS = metrics.counter(
+    "projectwise_mem0_errors_total", "Operasi mem0 yang gagal", ["op"]
+)
+
 # -----------------------------------------------------
 #  Konfigurasi default – dapat dioverride via env/file
 # -----------------------------------------------------
@@ -54,10 +65,21 @@ def _default_config() -> Dict[str, Any]:
 
 
 class Mem0Manager:
-    """Wrapper asinkron untuk mem0 AsyncMemory agar lebih modular."""
+    """Wrapper asinkron untuk mem0 AsyncMemory agar lebih modular.
+
+    Provider OpenAI mem0 membuat client sinkronnya sendiri, sehingga
+    transport-nya tidak bisa diganti; jika *gateway* diberikan, operasi
+    search/add dijalankan di slot ``memory`` gateway (batas konkurensi +
+    metrik latency) agar tidak berebut kuota dengan chat & docgen.
+    """
 
-    def __init__(self, config: Optional[Dict[str, Any]] = None):
+    def __init__(
+        self,
+        config: Optional[Dict[str, Any]] = None,
+        gateway: Optional[LLMGateway] = None,
+    ):
         self._config = config or _default_config()
+        self._gateway = gateway
         self._memory: Optional[AsyncMemory] = None
         # lock sederhana agar init hanya terjadi sekali
         self._init_lock = asyncio.Lock()
@@ -78,6 +100,12 @@ class Mem0Manager:
             )
         return self._memory
 
+    async def _limited(self, coro):
+        # Dibatasi sisa deadline request (jika ada)
+        if self._gateway is None:
+            return await within(coro, stage="mem0")
+        return await within(self._gateway.run_limited("memory", coro), stage="mem0")
+
     # ------------- operasi utama -------------------------------------
     async def get_memories(
         self, query: str, *, user_id: str = "default", limit: int = 5
@@ -85,9 +113,16 @@ class Mem0Manager:
         """Cari memori relevan untuk *query* dan kembalikan list string."""
         await self.init()
         try:
-            result = await self.memory.search(query=query, user_id=user_id, limit=limit)
-            return [item["memory"] for item in result.get("results", [])]
+            with span("mem0.search", limit=limit) as s:
+                with MEM0_LATENCY.time(op="search"):
+                    result = await self._limited(
+                        self.memory.search(query=query, user_id=user_id, limit=limit)
+                    )
+                memories = [item["memory"] for item in result.get("results", [])]
+                s.set(results=len(memories))
+            return memories
         except Exception as e:
+            MEM0_ERRORS.inc(op="search")
             # Jangan memutus alur chatbot – cukup log & kembalikan list kosong
             print(f"[Mem0] Gagal search memory: {e}")
             return []
@@ -98,8 +133,13 @@ class Mem0Manager:
         """Simpan *messages* (urutan dialog) ke memori."""
         await self.init()
         try:
-            await self.memory.add(messages=messages, user_id=user_id)
+            with span("mem0.add", messages=len(messages)):
+                with MEM0_LATENCY.time(op="add"):
+                    await self._limited(
+                        self.memory.add(messages=messages, user_id=user_id)
+                    )
         except Exception as e:
+            MEM0_ERRORS.inc(op="add")
             print(f"[Mem0] Gagal menambah memori: {e}")
 
     # Convenience helper ------------------------------------------------
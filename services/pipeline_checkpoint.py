@@ -0,0 +1,107 @@
+from __future__ import annotations
+import hashlib
+import json
+import time
+from typing import Any, Dict, Optional
+
+import sqlalchemy as sa
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from utils.logger import get_logger
+
+
+logger = get_logger("pipeline_checkpoint")
+
+# Checkpoint yang lebih tua dari ini dianggap basi dan tidak di-resume
+CHECKPOINT_MAX_AGE_SEC = 6 * 60 * 60
+
+Base = declarative_base()
+
+
+class PipelineCheckpoint(Base):
+    __tablename__ = "pipeline_checkpoints"
+    key = sa.Column(sa.String(64), primary_key=True)
+    project_name = sa.Column(sa.String(255), nullable=False)
+    state = sa.Column(sa.String(32), nullable=False)
+    payload = sa.Column(sa.Text, nullable=False)
+    updated_at = sa.Column(sa.Float, nullable=False)
+
+
+def checkpoint_key(
+    project_name: str,
+    user_query: Optional[str],
+    override_template: Optional[str] = None,
+) -> str:
+    """Key deterministik per (proyek, query, template)."""
+    raw = json.dumps(
+        [
+            project_name.strip().lower(),
+            " ".join((user_query or "").lower().split()),
+            override_template or "",
+        ]
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class PipelineCheckpointStore:
+    """Simpan state machine pipeline proposal agar retry bisa resume.
+
+    Disimpan di database SQLite yang sama dengan short-term memory sehingga
+    checkpoint tetap ada walaupun proses di-restart.
+    """
+
+    def __init__(self, engine: sa.Engine, max_age_sec: int = CHECKPOINT_MAX_AGE_SEC):
+        Base.metadata.create_all(engine)
+        self.DBSession = sessionmaker(bind=engine)
+        self.max_age_sec = max_age_sec
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        db = self.DBSession()
+        try:
+            row = db.get(PipelineCheckpoint, key)
+            if row is None:
+                return None
+            if time.time() - row.updated_at > self.max_age_sec:
+                db.delete(row)
+                db.commit()
+                return None
+            data = json.loads(row.payload)
+            data["state"] = row.state
+            return data
+        except Exception as e:
+            logger.warning(f"Gagal membaca checkpoint {key[:8]}: {e}")
+            return None
+        finally:
+            db.close()
+
+    def save(
+        self, key: str, project_name: str, state: str, payload: Dict[str, Any]
+    ) -> None:
+        db = self.DBSession()
+        try:
+            db.merge(
+                PipelineCheckpoint(
+                    key=key,
+                    project_name=project_name,
+                    state=state,
+                    payload=json.dumps(payload, default=str),
+                    updated_at=time.time(),
+                )
+            )
+            db.commit()
+        except Exception as e:
+            # Checkpoint hanya optimasi, jangan sampai memutus pipeline
+            logger.warning(f"Gagal menyimpan checkpoint {key[:8]}: {e}")
+        finally:
+            db.close()
+
+    def clear(self, key: str) -> None:
+        db = self.DBSession()
+        try:
+            db.query(PipelineCheckpoint).filter_by(key=key).delete()
+            db.commit()
+        except Exception as e:
+            # Checkpoint basi akan kedaluwarsa sendiri (max_age_sec)
+            logger.warning(f"Gagal menghapus checkpoint {key[:8]}: {e}")
+        finally:
+            db.close()
@@ -2,10 +2,14 @@
 from __future__ import annotations
 import asyncio
 import json
+import re
 import traceback
+import uuid
 from enum import Enum, auto
 from typing import Any, Dict, List, Optional, Tuple, Union
+from utils.tracing import Timeline, traced
 from .prompt_instruction import PROMPT_PROPOSAL_GUIDELINES
+from .pipeline_checkpoint import PipelineCheckpointStore, checkpoint_key
 
 
 class _State(Enum):
@@ -16,6 +20,80 @@ class _State(Enum):
     DOC_SAVED = auto()
 
 
+def _synthesize_tool_calls(
+    calls: List[Tuple[str, str, Dict[str, Any]]],
+) -> Dict[str, Any]:
+    """Bangun pesan assistant ber-tool_calls untuk tool yang dieksekusi langsung.
+
+    Transcript tetap valid bagi LLM pada turn berikutnya, seolah-olah model
+    sendiri yang meminta tool tersebut.
+    """
+    return {
+        "role": "assistant",
+        "content": None,
+        "tool_calls": [
+            {
+                "id": tc_id,
+                "type": "function",
+                "function": {"name": fname, "arguments": json.dumps(args)},
+            }
+            for tc_id, fname, args in calls
+        ],
+    }
+
+
+_WORD_RE = re.compile(r"[a-z0-9]{3,}")
+# Batas karakter kutipan KAK per shard agar prompt tetap ringkas
+KAK_SLICE_CHARS = 12_000
+KAK_CHUNK_CHARS = 1_500
+
+
+def _shard(items: List[str], size: int) -> List[List[str]]:
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+def _chunk_kak(text: str, chunk_chars: int = KAK_CHUNK_CHARS) -> List[str]:
+    """Gabungkan paragraf KAK menjadi potongan ±chunk_chars karakter."""
+    chunks: List[str] = []
+    buf = ""
+    for para in re.split(r"\n\s*\n", text):
+        if buf and len(buf) + len(para) > chunk_chars:
+            chunks.append(buf)
+            buf = ""
+        buf = f"{buf}\n\n{para}" if buf else para
+    if buf:
+        chunks.append(buf)
+    return chunks
+
+
+def _kak_slice(
+    chunks: List[str], keys: List[str], max_chars: int = KAK_SLICE_CHARS
+) -> str:
+    """Pilih potongan KAK yang paling relevan dengan nama placeholder.
+
+    Potongan pertama (biasanya judul, pelanggan, latar belakang) selalu ikut;
+    sisanya diranking berdasarkan irisan kata dengan nama placeholder dan
+    disusun kembali sesuai urutan asli dokumen.
+    """
+    if sum(len(c) for c in chunks) <= max_chars:
+        return "\n\n".join(chunks)
+
+    words = {w for k in keys for w in _WORD_RE.findall(k.lower().replace("_", " "))}
+    scored = sorted(
+        range(1, len(chunks)),
+        key=lambda i: -len(words & set(_WORD_RE.findall(chunks[i].lower()))),
+    )
+    picked = [0]
+    used = len(chunks[0])
+    for i in scored:
+        if used + len(chunks[i]) > max_chars:
+            continue
+        picked.append(i)
+        used += len(chunks[i])
+    return "\n\n".join(chunks[i] for i in sorted(picked))
+
+
+@traced("docgen.pipeline")
 async def run(
     client,
     project_name: str,
@@ -23,8 +101,26 @@ async def run(
     override_template: Optional[str] = None,
     max_turns: int = 12,
     max_parallel_tools: int = 5,
+    checkpoint_store: Optional[PipelineCheckpointStore] = None,
+    direct_tools: bool = True,
+    shard_size: int = 8,
 ) -> str:
-    """Main async workflow untuk pembuatan proposal docx."""
+    """Main async workflow untuk pembuatan proposal docx.
+
+    Dengan *direct_tools*, langkah ``read_project_markdown`` dan
+    ``get_template_placeholders`` dipanggil langsung (paralel) tanpa LLM;
+    hanya pengisian context yang melalui LLM. Jika langkah langsung gagal,
+    retry berikutnya kembali ke mode LLM.
+
+    Placeholder diisi per shard (*shard_size* key per panggilan LLM) secara
+    paralel, masing-masing dengan kutipan KAK yang relevan. Hasilnya digabung
+    dan hanya key yang masih kosong yang diminta ulang. ``shard_size=0``
+    mengembalikan perilaku lama (satu panggilan untuk semua placeholder).
+
+    Jika *checkpoint_store* diberikan, state disimpan setiap kali terjadi
+    transisi sehingga percobaan ulang (mis. setelah timeout) melanjutkan dari
+    state terakhir yang valid, bukan dari ``INITIAL``.
+    """
 
     log = client.logger
 
@@ -42,20 +138,99 @@ async def run(
 
     state: _State = _State.INITIAL
     placeholders: List[str] = []
+    kak_text = ""
     doc_path: Optional[str] = None
     retries: Dict[str, int] = {}
     sem = asyncio.Semaphore(max_parallel_tools)
+    # Pakai cache payload lokal milik client jika tersedia
+    call_tool = getattr(client, "call_tool_cached", client.call_tool)
+
+    ckpt_key = checkpoint_key(project_name, user_query, override_template)
+    saved_state: Optional[_State] = None
+    if checkpoint_store is not None:
+        ckpt = checkpoint_store.load(ckpt_key)
+        if ckpt:
+            state = saved_state = _State[ckpt["state"]]
+            placeholders = ckpt.get("placeholders", [])
+            kak_text = ckpt.get("kak_text", "")
+            messages = ckpt.get("messages", messages)
+            retries = ckpt.get("retries", {})
+            doc_path = ckpt.get("doc_path")
+            log.info("Resume pipeline '%s' dari state=%s", project_name, state.name)
+
+    def _checkpoint() -> None:
+        nonlocal saved_state
+        if checkpoint_store is None or state is saved_state:
+            return
+        checkpoint_store.save(
+            ckpt_key,
+            project_name,
+            state.name,
+            {
+                "placeholders": placeholders,
+                "kak_text": kak_text,
+                "messages": messages,
+                "retries": retries,
+                "doc_path": doc_path,
+            },
+        )
+        saved_state = state
 
     async def _call_tool(name: str, args: Dict[str, Any]) -> str:
         async with sem:
-            log.info(f"Memanggil tool '{name}' arg={args}")
+            log.info("Memanggil tool '%s' arg=%s", name, args)
             try:
-                raw = await client.call_tool(name, args)
+                raw = await call_tool(name, args)
                 return raw if isinstance(raw, str) else json.dumps(raw)
             except Exception as e:
                 traceback.print_exc()
                 return json.dumps({"status": "failure", "error": str(e)})
 
+    async def _fill_shard(keys: List[str], kak_chunks: List[str]) -> Dict[str, Any]:
+        # Bagian yang sama untuk semua shard di depan (prefix cache provider),
+        # kutipan & key per shard di belakang.
+        prompt = (
+            "Isi placeholder berdasarkan kutipan KAK di bawah. Kembalikan HANYA "
+            "objek JSON dengan key persis seperti daftar di akhir pesan.\n\n"
+            f"Permintaan user: {first_user_msg}\n\n"
+            f"Kutipan KAK proyek '{project_name}':\n"
+            f"{_kak_slice(kak_chunks, keys)}\n\n"
+            f"Key: {json.dumps(keys)}"
+        )
+        async with sem:
+            try:
+                resp = await client.gateway.chat(
+                    "docgen",
+                    model=client.model,
+                    temperature=client.settings.llm_temperature,
+                    messages=[system_prompt, {"role": "user", "content": prompt}],
+                    response_format={"type": "json_object"},
+                )
+                data = json.loads(resp.choices[0].message.content or "{}")
+            except Exception as e:
+                log.warning("Shard placeholder %s gagal: %s", keys, e)
+                return {}
+        if not isinstance(data, dict):
+            return {}
+        # Nilai kosong sah (KAK memang tidak memuatnya); hanya key hilang yang diulang
+        return {k: data[k] for k in keys if k in data}
+
+    async def _fill_context_sharded() -> Dict[str, Any]:
+        kak_chunks = _chunk_kak(kak_text)
+        context: Dict[str, Any] = {}
+        for attempt in range(2):
+            missing = [ph for ph in placeholders if ph not in context]
+            if not missing:
+                break
+            if attempt:
+                log.info("Meminta ulang placeholder kosong: %s", missing)
+            parts = await asyncio.gather(
+                *[_fill_shard(keys, kak_chunks) for keys in _shard(missing, shard_size)]
+            )
+            for part in parts:
+                context.update(part)
+        return context
+
     def _context_complete(ctx_json: str) -> bool:
         try:
             data = json.loads(ctx_json)
@@ -63,8 +238,12 @@ async def run(
         except Exception:
             return False
 
+    # Span per state pipeline (ditutup otomatis saat span pipeline selesai)
+    timeline = Timeline("docgen.state")
     for turn in range(max_turns):
-        log.info(f"— Turn {turn + 1}/{max_turns} | state={state.name}")
+        _checkpoint()
+        timeline.mark(state.name)
+        log.info("— Turn %s/%s | state=%s", turn + 1, max_turns, state.name)
 
         explicit_choice: Union[str, Dict[str, Any]] = "auto"
         if state is _State.INITIAL and retries.get("read_project_markdown", 0) == 0:
@@ -89,79 +268,122 @@ async def run(
                 "function": {"name": "generate_proposal_docx"},
             }
 
-        resp = await client.llm.chat.completions.create(
-            model=client.model,
-            messages=messages,  # type: ignore[arg-type]
-            tools=await client.get_tools(),  # type: ignore[arg-type]
-            tool_choice=explicit_choice,
-        )
-        assistant_msg = resp.choices[0].message
-        messages.append(assistant_msg.model_dump())
-
-        if not assistant_msg.tool_calls:
-            if state is _State.PLACEHOLDERS_OBTAINED:
-                ctx_raw = assistant_msg.content or ""
-                if not _context_complete(ctx_raw):
-                    retries["context"] = retries.get("context", 0) + 1
-                    if retries["context"] <= 1:
-                        missing = [
-                            ph
-                            for ph in placeholders
-                            if ph not in json.loads(ctx_raw or "{}")
-                        ]
-                        messages.append(
-                            {
-                                "role": "user",
-                                "content": (
-                                    "Beberapa placeholder masih kosong: "
-                                    f"{missing}. Mohon lengkapi JSON context sepenuhnya."
-                                ),
-                            }
-                        )
-                        continue
-                    return "Placeholder masih belum lengkap setelah 2× percobaan."
-
-                messages = [system_prompt, {"role": "user", "content": ctx_raw}]
-                state = _State.CONTEXT_SENT
-                continue
-
-            if state is _State.DOC_SAVED:
-                return (
-                    assistant_msg.content or f"Proposal berhasil dibuat di {doc_path}"
+        # Langkah yang argumennya sudah pasti dieksekusi langsung tanpa
+        # round-trip LLM; read & placeholders independen sehingga paralel.
+        direct_calls: List[Tuple[str, Dict[str, Any]]] = []
+        if direct_tools and state is _State.INITIAL:
+            if retries.get("read_project_markdown", 0) == 0:
+                direct_calls.append(
+                    ("read_project_markdown", {"project_name": project_name})
                 )
+                if retries.get("get_template_placeholders", 0) == 0:
+                    direct_calls.append(("get_template_placeholders", {}))
+        elif (
+            direct_tools
+            and state is _State.RAW_READY
+            and retries.get("get_template_placeholders", 0) == 0
+        ):
+            direct_calls.append(("get_template_placeholders", {}))
 
+        if shard_size > 0 and state is _State.PLACEHOLDERS_OBTAINED and placeholders:
+            context = await _fill_context_sharded()
+            missing = [ph for ph in placeholders if ph not in context]
+            if missing:
+                log.warning("Placeholder belum lengkap: %s", missing)
+                return "Placeholder masih belum lengkap setelah 2× percobaan."
+            messages = [
+                system_prompt,
+                {"role": "user", "content": json.dumps(context, ensure_ascii=False)},
+            ]
+            state = _State.CONTEXT_SENT
             continue
 
+        # (tool_call_id, nama tool, args)
+        calls: List[Tuple[str, str, Dict[str, Any]]] = []
+        if direct_calls:
+            calls = [
+                (f"call_direct_{uuid.uuid4().hex[:12]}", fname, args)
+                for fname, args in direct_calls
+            ]
+            log.info("Eksekusi langsung: %s", [fname for _, fname, _ in calls])
+            messages.append(_synthesize_tool_calls(calls))
+        else:
+            resp = await client.gateway.chat(
+                "docgen",
+                model=client.model,
+                temperature=client.settings.llm_temperature,
+                messages=messages,  # type: ignore[arg-type]
+                # Pipeline hanya memproses tool pinned route docgen
+                tools=await client.select_tools("docgen", user_query or "", k=0),  # type: ignore[arg-type]
+                tool_choice=explicit_choice,
+            )
+            assistant_msg = resp.choices[0].message
+            messages.append(assistant_msg.model_dump())
+
+            if not assistant_msg.tool_calls:
+                if state is _State.PLACEHOLDERS_OBTAINED:
+                    ctx_raw = assistant_msg.content or ""
+                    if not _context_complete(ctx_raw):
+                        retries["context"] = retries.get("context", 0) + 1
+                        if retries["context"] <= 1:
+                            missing = [
+                                ph
+                                for ph in placeholders
+                                if ph not in json.loads(ctx_raw or "{}")
+                            ]
+                            messages.append(
+                                {
+                                    "role": "user",
+                                    "content": (
+                                        "Beberapa placeholder masih kosong: "
+                                        f"{missing}. Mohon lengkapi JSON context sepenuhnya."
+                                    ),
+                                }
+                            )
+                            continue
+                        return "Placeholder masih belum lengkap setelah 2× percobaan."
+
+                    messages = [system_prompt, {"role": "user", "content": ctx_raw}]
+                    state = _State.CONTEXT_SENT
+                    continue
+
+                if state is _State.DOC_SAVED:
+                    if checkpoint_store is not None:
+                        checkpoint_store.clear(ckpt_key)
+                    return (
+                        assistant_msg.content
+                        or f"Proposal berhasil dibuat di {doc_path}"
+                    )
+
+                continue
+
+            for tc in assistant_msg.tool_calls:
+                args = json.loads(tc.function.arguments or "{}")
+                if tc.function.name == "read_project_markdown":
+                    args.setdefault("project_name", project_name)
+                elif tc.function.name == "generate_proposal_docx" and override_template:
+                    args.setdefault("override_template", override_template)
+                calls.append((tc.id, tc.function.name, args))
+
         # ----------------------------
         # Tool-calls processing
         # ----------------------------
         tc_results: List[Tuple[str, str, str]] = []
-        exec_tasks = []
-        tc_extra_args: List[Tuple[str, Dict[str, Any]]] = []
-        for tc in assistant_msg.tool_calls:
-            args = json.loads(tc.function.arguments or "{}")
-            if tc.function.name == "read_project_markdown":
-                args.setdefault("project_name", project_name)
-            elif tc.function.name == "generate_proposal_docx" and override_template:
-                args.setdefault("override_template", override_template)
-            exec_tasks.append(_call_tool(tc.function.name, args))
-            tc_extra_args.append((tc.function.name, args))
-
-        tool_raw_results = await asyncio.gather(*exec_tasks)
-
-        for tc, raw, (fname, _) in zip(
-            assistant_msg.tool_calls, tool_raw_results, tc_extra_args
-        ):
+        tool_raw_results = await asyncio.gather(
+            *[_call_tool(fname, args) for _, fname, args in calls]
+        )
+
+        for (tc_id, fname, _), raw in zip(calls, tool_raw_results):
             content_str = raw if isinstance(raw, str) else json.dumps(raw)
             messages.append(
                 {
                     "role": "tool",
-                    "tool_call_id": tc.id,
+                    "tool_call_id": tc_id,
                     "name": fname,
                     "content": content_str,
                 }
             )
-            tc_results.append((fname, content_str, tc.id))
+            tc_results.append((fname, content_str, tc_id))
 
         # ----------------------------
         # Post‑process each tool result
@@ -185,7 +407,8 @@ async def run(
                         state = _State.INITIAL
                         break
                     return payload.get("error", "Dokumen proyek tidak ditemukan.")
-                messages.append({"role": "user", "content": payload.get("text", "")})
+                kak_text = payload.get("text", "")
+                messages.append({"role": "user", "content": kak_text})
                 state = _State.RAW_READY
 
             # get_template_placeholders ---------------------------------
@@ -216,4 +439,6 @@ async def run(
 
         continue
 
+    if doc_path and checkpoint_store is not None:
+        checkpoint_store.clear(ckpt_key)
     return doc_path or "Workflow berhenti: mencapai batas maksimum iterasi."
@@ -1,7 +1,13 @@
 """
 File ini berisi kumpulan prompt instruction yang dapat di-reuse di berbagai module lain dalam ProjectWise.
+
+Prompt di sini sengaja statis (tanpa tanggal, nama user, atau data per query):
+OpenAI prompt caching hanya berlaku untuk prefix yang identik byte-per-byte,
+jadi bagian yang berubah-ubah ditempatkan di akhir daftar messages.
 """
 
+import json
+
 DEFAULT_SYSTEM_PROMPT = (
     'Anda adalah "ProjectWise", asisten virtual untuk tim Presales & Project Manager.\n'
 )
@@ -148,6 +154,22 @@ def FEW_SHOT_EXAMPLES():
     ]
 
 
+def PROMPT_CHAT_ASSISTANT():
+    """System prompt statis route chat, termasuk contoh pemetaan permintaan → tool."""
+    shots = FEW_SHOT_EXAMPLES()
+    examples = "\n".join(
+        f"- {user['content']} → {json.loads(assistant['content'])['tool']}"
+        for user, assistant in zip(shots[::2], shots[1::2])
+    )
+    return (
+        DEFAULT_SYSTEM_PROMPT
+        + "Jawab dalam bahasa Indonesia yang ringkas dan jelas. Gunakan tool hanya jika "
+        "jawaban membutuhkan data dari sistem; jangan sebut nama tool kepada user.\n"
+        "\n"
+        "Contoh permintaan dan tool yang sesuai:\n" + examples + "\n"
+    )
+
+
 def PROMPT_PROPOSAL_GUIDELINES():
     return (
         DEFAULT_SYSTEM_PROMPT
@@ -2,6 +2,7 @@ from __future__ import annotations
 import json
 from typing import Literal
 from utils.logger import get_logger
+from utils.tracing import span
 from pydantic import BaseModel, Field, ValidationError
 from .prompt_instruction import PROMPT_WORKFLOW_INTENT, FEW_SHOT_EXAMPLES
 
@@ -15,9 +16,12 @@ class IntentRoute(BaseModel):
 
 
 # -------- classifier -------------------------------------------
-async def classify_intent(llm, query: str, model: str = "gpt-4o") -> IntentRoute:
+async def classify_intent(gateway, query: str, model: str = "gpt-4o") -> IntentRoute:
     """
     Kembalikan IntentRoute; jika model gagal, default => other, score 0.0
+
+    Panggilan router kecil & idempoten, jadi dikirim sebagai hedged request
+    lewat LLM gateway (retry/backoff ditangani gateway).
     """
     system_msg = PROMPT_WORKFLOW_INTENT()
 
@@ -30,22 +34,29 @@ async def classify_intent(llm, query: str, model: str = "gpt-4o") -> IntentRoute
         {"role": "user", "content": query},
     ]
 
-    try:
-        resp = await llm.chat.completions.parse(
-            model=model,
-            temperature=0,
-            top_p=0,
-            messages=messages,
-            response_format=IntentRoute,
-        )
-        raw_json = resp.choices[0].message.content
-        logger.info(f"Raw router output: {raw_json}")
-
-        return IntentRoute.model_validate_json(raw_json)
-    except (ValidationError, json.JSONDecodeError) as ve:
-        logger.info(f"Router JSON parse error: {ve}")
-    except Exception as e:
-        logger.info(f"Router LLM error: {e}")
+    with span("router.classify_intent") as s:
+        try:
+            resp = await gateway.hedged(
+                "router",
+                method="parse",
+                model=model,
+                temperature=0,
+                top_p=0,
+                messages=messages,
+                response_format=IntentRoute,
+            )
+            raw_json = resp.choices[0].message.content
+            logger.info("Raw router output: %s", raw_json)
+
+            route = IntentRoute.model_validate_json(raw_json)
+            s.set(intent=route.intent, confidence=route.confidence_score)
+            return route
+        except (ValidationError, json.JSONDecodeError) as ve:
+            logger.info("Router JSON parse error: %s", ve)
+            s.set(fallback="parse_error")
+        except Exception as e:
+            logger.info("Router LLM error: %s", e)
+            s.set(fallback=type(e).__name__)
 
     # Fallback aman
     return IntentRoute(intent="other", confidence_score=0.0)
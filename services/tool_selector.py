@@ -0,0 +1,205 @@
+from __future__ import annotations
+import json
+import math
+import re
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils.logger import get_logger
+from utils.helper import ENC
+from utils.disk_cache import content_key
+from config.mcp_settings import MCPSettings
+
+settings = MCPSettings()
+logger = get_logger("tool_selector")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Nama tool lebih informatif daripada deskripsi panjang → bobot lebih besar
+NAME_WEIGHT = 3
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and the of to for in on with by from is are be this that it or "
+    "yang dan di ke dari untuk dengan pada ini itu atau adalah saya tolong "
+    "mohon apa bisa".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Token lexical: huruf kecil, pecah di non-alfanumerik (termasuk ``_``)."""
+    return [
+        t
+        for t in _TOKEN_RE.findall(text.lower().replace("_", " "))
+        if t not in STOPWORDS
+    ]
+
+
+def tool_name(tool: Dict[str, Any]) -> str:
+    return tool["function"]["name"]
+
+
+def _tool_text(tool: Dict[str, Any]) -> List[str]:
+    fn = tool["function"]
+    tokens = tokenize(fn["name"]) * NAME_WEIGHT
+    tokens += tokenize(fn.get("description") or "")
+    props = (fn.get("parameters") or {}).get("properties") or {}
+    for pname, pschema in props.items():
+        tokens += tokenize(pname)
+        if isinstance(pschema, dict):
+            tokens += tokenize(str(pschema.get("description") or ""))
+    return tokens
+
+
+def schema_tokens(tool: Dict[str, Any]) -> int:
+    """Perkiraan token prompt yang dipakai satu skema tool."""
+    return len(ENC.encode(json.dumps(tool, ensure_ascii=False)))
+
+
+class _RouteStats:
+    def __init__(self) -> None:
+        self.queries = 0
+        self.filtered = 0
+        self.tools_offered = 0
+        self.tools_sent = 0
+        self.tokens_full = 0
+        self.tokens_sent = 0
+        self.select_ms = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        q = self.queries or 1
+        saved = self.tokens_full - self.tokens_sent
+        return {
+            "queries": self.queries,
+            "filtered": self.filtered,
+            "avg_tools_offered": round(self.tools_offered / q, 1),
+            "avg_tools_sent": round(self.tools_sent / q, 1),
+            "schema_tokens_full": self.tokens_full,
+            "schema_tokens_sent": self.tokens_sent,
+            "schema_tokens_saved": saved,
+            "saved_ratio": round(saved / (self.tokens_full or 1), 3),
+            "avg_select_ms": round(self.select_ms / q, 3),
+        }
+
+
+class ToolSelector:
+    """Pilih subset tool yang relevan per query (BM25 atas nama+deskripsi+parameter).
+
+    Tool yang di-*pin* untuk sebuah route selalu ikut. Seleksi hanya aktif
+    jika jumlah tool melebihi *top_k* — dengan sedikit tool, mengirim semua
+    lebih aman dan hampir tidak ada penghematan. Index dibangun ulang hanya
+    saat daftar tool berubah.
+    """
+
+    def __init__(
+        self,
+        top_k: int = settings.tool_top_k,
+        pinned: Optional[Dict[str, Sequence[str]]] = None,
+    ):
+        self.top_k = top_k
+        self.pinned = {
+            route: tuple(names)
+            for route, names in (pinned or settings.tool_pinned).items()
+        }
+        self._tools: List[Dict[str, Any]] = []
+        self._signature: Optional[str] = None
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._doc_len: List[int] = []
+        self._avg_len = 0.0
+        self._idf: Dict[str, float] = {}
+        self._schema_tokens: List[int] = []
+        self._stats: Dict[str, _RouteStats] = {}
+
+    # ---------------- index ----------------
+    def _ensure_index(self, tools: List[Dict[str, Any]]) -> None:
+        # tool_cache MCPClient adalah list yang sama sampai di-refresh
+        if tools is self._tools and self._signature is not None:
+            return
+        signature = content_key(tools)
+        self._tools = tools
+        if signature == self._signature:
+            return
+
+        self._signature = signature
+        docs = [Counter(_tool_text(t)) for t in tools]
+        self._doc_len = [sum(d.values()) for d in docs]
+        self._avg_len = sum(self._doc_len) / len(tools) if tools else 0.0
+        self._postings = {}
+        for i, doc in enumerate(docs):
+            for term, tf in doc.items():
+                self._postings.setdefault(term, []).append((i, tf))
+        n = len(tools)
+        self._idf = {
+            term: math.log(1 + (n - len(post) + 0.5) / (len(post) + 0.5))
+            for term, post in self._postings.items()
+        }
+        self._schema_tokens = [schema_tokens(t) for t in tools]
+        logger.info("Index tool dibangun ulang: %s tool", n)
+
+    def _scores(self, query_terms: Iterable[str]) -> List[float]:
+        scores = [0.0] * len(self._doc_len)
+        avg_len = self._avg_len or 1.0
+        for term in set(query_terms):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for i, tf in self._postings[term]:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_len[i] / avg_len)
+                scores[i] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return scores
+
+    # ---------------- seleksi ----------------
+    def select(
+        self,
+        tools: List[Dict[str, Any]],
+        query: str,
+        route: str = "chat",
+        k: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Kembalikan tool pinned + top-k relevan (urutan asli dipertahankan)."""
+        k = self.top_k if k is None else k
+        start = time.perf_counter()
+        self._ensure_index(tools)
+        stats = self._stats.setdefault(route, _RouteStats())
+        stats.queries += 1
+        stats.tools_offered += len(tools)
+        full = sum(self._schema_tokens)
+
+        pinned = set(self.pinned.get(route, ()))
+        if len(tools) <= k + len(pinned):
+            chosen = list(range(len(tools)))
+        else:
+            scores = self._scores(tokenize(query))
+            ranked = sorted(
+                (i for i in range(len(tools)) if scores[i] > 0),
+                key=lambda i: -scores[i],
+            )
+            keep = {i for i, t in enumerate(tools) if tool_name(t) in pinned}
+            keep.update(ranked[:k])
+            if k and not ranked:
+                # Tidak ada sinyal lexical sama sekali → jangan menebak, kirim semua
+                keep = set(range(len(tools)))
+            else:
+                stats.filtered += 1
+            chosen = sorted(keep)
+
+        selected = [tools[i] for i in chosen]
+        sent = sum(self._schema_tokens[i] for i in chosen)
+        stats.tools_sent += len(selected)
+        stats.tokens_full += full
+        stats.tokens_sent += sent
+        stats.select_ms += (time.perf_counter() - start) * 1000
+        if len(selected) < len(tools):
+            logger.info(
+                "Tool %s: %s/%s dikirim (~%s token skema dihemat) %s",
+                route,
+                len(selected),
+                len(tools),
+                full - sent,
+                [tool_name(t) for t in selected],
+            )
+        return selected
+
+    def metrics(self) -> Dict[str, Any]:
+        return {route: s.snapshot() for route, s in self._stats.items()}
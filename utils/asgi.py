@@ -0,0 +1,273 @@
+# utils/asgi.py
+
+from __future__ import annotations
+import asyncio
+import inspect
+import sys
+import tempfile
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from flask import Flask, request, request_started
+from werkzeug.wrappers import Response
+
+from utils.logger import get_logger
+
+logger = get_logger("asgi")
+
+Hook = Callable[[], Awaitable[Any]]
+
+# Body request di atas batas ini di-spool ke file sementara di disk
+BODY_SPOOL_MAX = 1024 * 1024
+_END = object()
+
+
+def _latin1(value: str) -> str:
+    # PEP 3333: string environ adalah byte yang di-decode sebagai latin-1
+    return value.encode("utf-8").decode("latin-1")
+
+
+def build_environ(scope: Dict[str, Any], body) -> Dict[str, Any]:
+    """Environ WSGI dari scope HTTP ASGI (body sudah dibaca ke *body*)."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    root_path = scope.get("root_path", "")
+    path = scope["path"]
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path) :]
+    environ: Dict[str, Any] = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": _latin1(root_path),
+        "PATH_INFO": _latin1(path),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1] or 80),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.input_terminated": True,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+        "asgi.scope": scope,
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            name = f"HTTP_{name}"
+        value = raw_value.decode("latin-1")
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    return environ
+
+
+class FlaskASGI:
+    """Adapter ASGI untuk app Flask yang ada: semua request di satu event loop.
+
+    Flask (WSGI) menjalankan tiap view async sampai selesai di thread-nya
+    sendiri, sehingga request yang menunggu LLM puluhan detik tetap menahan
+    satu thread. Di sini view ``async def`` di-await langsung di loop server,
+    jadi ribuan request yang sedang menunggu I/O hanya berupa coroutine. View
+    sinkron (render template, baca file) dijalankan lewat ``asyncio.to_thread``.
+
+    Siklus request mengikuti ``Flask.full_dispatch_request``: request context,
+    ``before_request`` (sync atau async), view, error handler, ``after_request``
+    dan teardown — sehingga blueprint, hook metrik dan template tetap jalan.
+    Body respons berupa async iterator di-stream langsung dari loop.
+    """
+
+    def __init__(
+        self,
+        app: Flask,
+        on_startup: Iterable[Hook] = (),
+        on_shutdown: Iterable[Hook] = (),
+    ):
+        self.app = app
+        self.on_startup: List[Hook] = list(on_startup)
+        self.on_shutdown: List[Hook] = list(on_shutdown)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "http":
+            await self._http(scope, receive, send)
+        elif scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        else:
+            # WebSocket tidak dipakai blueprint mana pun
+            await send({"type": "websocket.close", "code": 1000})
+
+    # ------------------------------------------------------------- lifespan
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    for hook in self.on_startup:
+                        await hook()
+                except Exception as e:
+                    logger.error("Startup ASGI gagal: %s", e, exc_info=True)
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                for hook in self.on_shutdown:
+                    try:
+                        await hook()
+                    except Exception as e:
+                        logger.warning("Shutdown hook gagal: %s", e)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # ----------------------------------------------------------------- http
+    async def _http(self, scope, receive, send) -> None:
+        body = tempfile.SpooledTemporaryFile(max_size=BODY_SPOOL_MAX)
+        try:
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                body.write(message.get("body", b""))
+                if not message.get("more_body"):
+                    break
+            body.seek(0)
+            environ = build_environ(scope, body)
+            # Sinyal disconnect untuk view (lihat utils.deadline) & streaming
+            disconnected = environ["asgi.disconnect_event"] = asyncio.Event()
+            watcher = asyncio.ensure_future(
+                self._watch_disconnect(receive, disconnected)
+            )
+            try:
+                response = await self._dispatch(environ)
+                await self._send_response(environ, response, send, disconnected)
+            finally:
+                watcher.cancel()
+        finally:
+            body.close()
+
+    async def _call(self, func: Callable, *args, **kwargs) -> Any:
+        if inspect.iscoroutinefunction(func):
+            return await func(*args, **kwargs)
+        return func(*args, **kwargs)
+
+    async def _preprocess(self) -> Optional[Any]:
+        # Versi async dari Flask.preprocess_request
+        app, req = self.app, request
+        names = (None, *reversed(req.blueprints))
+        for name in names:
+            for url_func in app.url_value_preprocessors.get(name, ()):
+                url_func(req.endpoint, req.view_args)
+        for name in names:
+            for before_func in app.before_request_funcs.get(name, ()):
+                rv = await self._call(before_func)
+                if rv is not None:
+                    return rv
+        return None
+
+    async def _view(self) -> Any:
+        # Versi async dari Flask.dispatch_request
+        app, req = self.app, request
+        if req.routing_exception is not None:
+            app.raise_routing_exception(req)
+        rule = req.url_rule
+        if (
+            getattr(rule, "provide_automatic_options", False)
+            and req.method == "OPTIONS"
+        ):
+            return app.make_default_options_response()
+        view = app.view_functions[rule.endpoint]  # type: ignore[union-attr]
+        if inspect.iscoroutinefunction(view):
+            return await view(**req.view_args)  # type: ignore[arg-type]
+        # Context request/app berupa contextvars, ikut tersalin ke thread
+        return await asyncio.to_thread(view, **req.view_args)  # type: ignore[arg-type]
+
+    async def _dispatch(self, environ: Dict[str, Any]) -> Response:
+        app = self.app
+        ctx = app.request_context(environ)
+        error: Optional[BaseException] = None
+        try:
+            try:
+                ctx.push()
+                app._got_first_request = True
+                try:
+                    request_started.send(app)
+                    rv = await self._preprocess()
+                    if rv is None:
+                        rv = await self._view()
+                except Exception as e:
+                    rv = app.handle_user_exception(e)
+                return app.finalize_request(rv)
+            except Exception as e:
+                error = e
+                return app.handle_exception(e)
+        finally:
+            if error is not None and app.should_ignore_error(error):
+                error = None
+            ctx.pop(error)
+
+    async def _send_response(
+        self, environ, response: Response, send, disconnected: asyncio.Event
+    ) -> None:
+        headers = response.get_wsgi_headers(environ)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": [
+                    (k.lower().encode("latin-1"), v.encode("latin-1"))
+                    for k, v in headers.items()
+                ],
+            }
+        )
+        if environ["REQUEST_METHOD"] == "HEAD":
+            await send({"type": "http.response.body", "body": b""})
+            return
+        if response.is_sequence:
+            body = b"".join(response.iter_encoded())
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        # Stream (SSE, file): hentikan begitu client memutus koneksi
+        streamer = asyncio.ensure_future(self._stream(environ, response, send))
+        watcher = asyncio.ensure_future(disconnected.wait())
+        try:
+            await asyncio.wait({streamer, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (streamer, watcher):
+                task.cancel()
+            await asyncio.gather(streamer, watcher, return_exceptions=True)
+            try:
+                response.close()
+            except ValueError:
+                # Generator sinkron masih berjalan di thread; berhenti sendiri
+                pass
+        if streamer.done() and not streamer.cancelled() and streamer.exception():
+            raise streamer.exception()  # type: ignore[misc]
+
+    @staticmethod
+    async def _watch_disconnect(receive, disconnected: asyncio.Event) -> None:
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        disconnected.set()
+
+    async def _stream(self, environ, response: Response, send) -> None:
+        charset = "utf-8"
+        source = response.response
+        if hasattr(source, "__aiter__"):
+            try:
+                async for chunk in source:  # type: ignore[union-attr]
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode(charset)
+                    await send(
+                        {"type": "http.response.body", "body": chunk, "more_body": True}
+                    )
+            finally:
+                await source.aclose()  # type: ignore[union-attr]
+        else:
+            # Iterator sinkron bisa memblokir (file, generator): ambil di thread
+            iterator = iter(response.get_app_iter(environ))
+            while (chunk := await asyncio.to_thread(next, iterator, _END)) is not _END:
+                await send(
+                    {"type": "http.response.body", "body": chunk, "more_body": True}
+                )
+        await send({"type": "http.response.body", "body": b""})
@@ -0,0 +1,181 @@
+# utils/deadline.py
+
+from __future__ import annotations
+import asyncio
+import inspect
+import socket
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+
+from utils.logger import get_logger
+
+logger = get_logger("deadline")
+
+T = TypeVar("T")
+DisconnectWaiter = Callable[[], Awaitable[Any]]
+
+# Interval cek socket client pada mode WSGI (tidak ada event disconnect)
+DISCONNECT_POLL_SEC = 1.0
+
+_current: ContextVar[Optional["Deadline"]] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """Batas waktu request habis sebelum *stage* selesai."""
+
+    def __init__(self, stage: str = "request"):
+        super().__init__(f"Deadline request habis pada {stage}")
+        self.stage = stage
+
+
+class ClientDisconnected(ConnectionError):
+    """Client menutup koneksi sebelum respons siap."""
+
+
+class Deadline:
+    """Batas waktu satu request yang dibawa lewat context variable.
+
+    Dibuat sekali di view (:func:`deadline_scope`) lalu terbaca otomatis di
+    setiap lapisan — ``process_query``, gateway LLM, ``call_tool``, mem0 —
+    termasuk coroutine yang dijalankan di background loop (``bg.run``
+    menyalin context). Tiap tahap membatasi dirinya dengan :func:`within`
+    (min. timeout tahap & sisa waktu); :meth:`run` membatalkan seluruh
+    pekerjaan saat deadline lewat atau client memutus koneksi.
+    """
+
+    def __init__(self, timeout: float, disconnected: Optional[DisconnectWaiter] = None):
+        self.timeout = timeout
+        self.expires_at = time.monotonic() + timeout
+        self._disconnected = disconnected
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def check(self, stage: str = "request") -> None:
+        if self.expired():
+            raise DeadlineExceeded(stage)
+
+    def cap(self, timeout: Optional[float]) -> float:
+        """Timeout efektif sebuah tahap: min(*timeout*, sisa waktu)."""
+        remaining = max(self.remaining(), 0.0)
+        return remaining if timeout is None else min(timeout, remaining)
+
+    async def run(self, aw: Awaitable[T], stage: str = "request") -> T:
+        """Await *aw*; batalkan jika deadline lewat atau client disconnect."""
+        task = asyncio.ensure_future(aw)
+        watcher = (
+            asyncio.ensure_future(self._disconnected())
+            if self._disconnected is not None
+            else None
+        )
+        waiters = {task} if watcher is None else {task, watcher}
+        try:
+            done, _ = await asyncio.wait(
+                waiters,
+                timeout=max(self.remaining(), 0.0),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+            if not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        if task in done:
+            return task.result()
+        if watcher is not None and watcher in done:
+            logger.info("Client disconnect, %s dibatalkan", stage)
+            raise ClientDisconnected(f"Client disconnect saat {stage}")
+        logger.warning("Deadline %.0fs habis, %s dibatalkan", self.timeout, stage)
+        raise DeadlineExceeded(stage)
+
+
+@contextmanager
+def deadline_scope(
+    timeout: float, disconnected: Optional[DisconnectWaiter] = None
+) -> Iterator[Deadline]:
+    """Pasang :class:`Deadline` baru sebagai deadline aktif selama blok."""
+    deadline = Deadline(timeout, disconnected)
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+def check_deadline(stage: str = "request") -> None:
+    """Raise :class:`DeadlineExceeded` jika deadline aktif sudah lewat."""
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.check(stage)
+
+
+def time_left() -> Optional[float]:
+    """Sisa waktu deadline aktif (detik), ``None`` jika tidak ada deadline."""
+    deadline = _current.get()
+    return None if deadline is None else deadline.remaining()
+
+
+async def within(
+    aw: Awaitable[T], timeout: Optional[float] = None, stage: str = "stage"
+) -> T:
+    """Await *aw* dengan batas min(*timeout*, sisa deadline aktif).
+
+    Tanpa deadline aktif perilakunya sama dengan ``asyncio.wait_for`` (atau
+    await biasa jika *timeout* None). Jika yang habis adalah deadline
+    request, yang di-raise :class:`DeadlineExceeded`.
+    """
+    deadline = _current.get()
+    limit = timeout if deadline is None else deadline.cap(timeout)
+    if limit is None:
+        return await aw
+    if deadline is not None and limit <= 0:
+        if inspect.iscoroutine(aw):
+            aw.close()
+        raise DeadlineExceeded(stage)
+    try:
+        return await asyncio.wait_for(aw, limit)
+    except asyncio.TimeoutError:
+        if deadline is not None and deadline.expired():
+            raise DeadlineExceeded(stage) from None
+        raise
+
+
+# ----------------------------------------------------------- client disconnect
+def _socket_closed(sock: socket.socket) -> bool:
+    try:
+        return sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) == b""
+    except BlockingIOError:
+        return False
+    except OSError:
+        return True
+
+
+def disconnect_waiter(environ: Dict[str, Any]) -> Optional[DisconnectWaiter]:
+    """Awaitable yang selesai saat client request ini memutus koneksi.
+
+    Mode ASGI memakai event dari adapter (``asgi.disconnect_event``); mode
+    WSGI memeriksa socket client (gunicorn / werkzeug) secara berkala.
+    ``None`` jika server tidak menyediakan keduanya.
+    """
+    event = environ.get("asgi.disconnect_event")
+    if event is not None:
+        return event.wait
+    sock = environ.get("gunicorn.socket") or environ.get("werkzeug.socket")
+    if sock is None:
+        return None
+
+    async def _poll() -> None:
+        while not _socket_closed(sock):
+            await asyncio.sleep(DISCONNECT_POLL_SEC)
+
+    return _poll
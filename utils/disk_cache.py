@@ -0,0 +1,139 @@
+# utils/disk_cache.py
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from utils.logger import get_logger
+
+logger = get_logger("disk_cache")
+
+
+def content_key(*parts: Any) -> str:
+    """Hash stabil (sha256) dari potongan-potongan key yang JSON-serializable."""
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """Cache key→string berbasis file dengan TTL dan eviksi berbasis ukuran.
+
+    - Setiap entry adalah satu file ``<namespace>__<key>.json`` di *directory*.
+    - Penulisan atomik (tmp file + ``os.replace``) sehingga aman dipakai
+      bersama oleh beberapa proses.
+    - Hit memperbarui mtime file; saat total ukuran melewati *max_bytes*,
+      entry dengan mtime paling lama dibuang lebih dulu (LRU).
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        max_bytes: int = 256 * 1024 * 1024,
+        default_ttl: Optional[float] = None,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._size = self._scan_size()
+
+    def _path(self, namespace: str, key: str) -> Path:
+        return self.directory / f"{namespace}__{key}.json"
+
+    def _scan_size(self) -> int:
+        return sum(p.stat().st_size for p in self.directory.glob("*.json"))
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        path = self._path(namespace, key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        expires = entry.get("expires")
+        if expires is not None and expires < time.time():
+            self._remove(path)
+            self.misses += 1
+            return None
+
+        try:
+            os.utime(path)  # tandai sebagai baru dipakai (LRU)
+        except OSError:
+            pass
+        self.hits += 1
+        return entry.get("value")
+
+    def set(
+        self, namespace: str, key: str, value: str, ttl: Optional[float] = None
+    ) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        entry = {
+            "expires": time.time() + ttl if ttl else None,
+            "value": value,
+        }
+        path = self._path(namespace, key)
+        data = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            old_size = path.stat().st_size if path.exists() else 0
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Gagal menulis cache {namespace}/{key[:8]}: {e}")
+            return
+
+        with self._lock:
+            self._size += len(data) - old_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def invalidate(self, namespace: Optional[str] = None) -> int:
+        """Hapus semua entry (atau hanya *namespace* tertentu)."""
+        pattern = f"{namespace}__*.json" if namespace else "*.json"
+        removed = 0
+        for path in self.directory.glob(pattern):
+            self._remove(path)
+            removed += 1
+        logger.info(f"Cache invalidated: namespace={namespace or '*'} ({removed})")
+        return removed
+
+    def _remove(self, path: Path) -> None:
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except OSError:
+            return
+        with self._lock:
+            self._size -= size
+
+    def _evict(self) -> None:
+        """Buang entry terlama sampai ukuran turun ke 90% *max_bytes*."""
+        entries = []
+        for p in self.directory.glob("*.json"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        entries.sort()
+        self._size = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for _, size, p in entries:
+            if self._size <= target:
+                break
+            try:
+                p.unlink()
+                self._size -= size
+            except OSError:
+                continue
@@ -0,0 +1,104 @@
+# utils/event_loop.py
+
+import asyncio
+import concurrent.futures
+import os
+import threading
+from typing import Any, Awaitable, Optional, TypeVar
+
+from utils.logger import get_logger
+
+logger = get_logger("event_loop")
+
+T = TypeVar("T")
+
+
+class BackgroundLoop:
+    """Event loop persisten yang berjalan di thread daemon tersendiri.
+
+    View async Flask dijalankan di event loop baru per request, sehingga objek
+    yang terikat ke loop (connection pool httpx, semaphore, task polling) tidak
+    bisa dipakai bersama antar request. Objek-objek itu dibuat dan dipakai di
+    loop ini; coroutine dari loop lain cukup ``await bg.run(coro)``.
+    """
+
+    def __init__(self, name: str = "projectwise-io"):
+        self._name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    self._start()
+        return self._loop  # type: ignore[return-value]
+
+    def _start(self) -> None:
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def _run() -> None:
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            loop.run_forever()
+
+        self._thread = threading.Thread(target=_run, name=self._name, daemon=True)
+        self._thread.start()
+        ready.wait()
+        self._loop = loop
+        logger.info(f"Background event loop '{self._name}' started")
+
+    def adopt(self) -> None:
+        """Pakai event loop yang sedang berjalan sebagai background loop.
+
+        Dipanggil saat startup server ASGI: request dan objek yang terikat ke
+        loop (sesi MCP, pool httpx) lalu berbagi satu loop tanpa lompatan
+        antar-thread. Harus dipanggil sebelum loop dipakai pertama kali.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._loop is not None and self._loop is not loop:
+                raise RuntimeError(
+                    f"Background loop '{self._name}' sudah berjalan di thread lain"
+                )
+            self._loop = loop
+            self._thread = threading.current_thread()
+        logger.info(f"Background event loop '{self._name}' memakai loop server")
+
+    def in_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    async def run(self, coro: Awaitable[T]) -> T:
+        """Jalankan *coro* di background loop dan tunggu hasilnya dari loop mana pun.
+
+        Context variables ikut terbawa dan pembatalan di sisi pemanggil
+        diteruskan ke task di background loop.
+        """
+        if self.in_loop():
+            return await coro
+        fut = asyncio.run_coroutine_threadsafe(coro, self.loop)  # type: ignore[arg-type]
+        return await asyncio.wrap_future(fut)
+
+    def submit(self, coro: Awaitable[Any]) -> concurrent.futures.Future:
+        """Jadwalkan *coro* dari kode sinkron; kembalikan ``concurrent.futures.Future``."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)  # type: ignore[arg-type]
+
+    def _reset_after_fork(self) -> None:
+        # Thread loop tidak ikut ter-fork; worker memulai loop-nya sendiri
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+
+_background_loop = BackgroundLoop()
+os.register_at_fork(after_in_child=_background_loop._reset_after_fork)
+
+
+def get_background_loop() -> BackgroundLoop:
+    return _background_loop
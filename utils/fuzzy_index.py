@@ -0,0 +1,171 @@
+# utils/fuzzy_index.py
+
+import difflib
+import heapq
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.helper import slugify
+
+# Anggaran posting untuk tahap hitung-union (trigram paling langka lebih dulu);
+# tahap ini tahan typo karena trigram typo biasanya langka.
+POSTING_BUDGET = 2_000
+# Ukuran maksimum himpunan kandidat yang dinilai dengan Dice
+SHORTLIST_SIZE = 64
+# Kandidat Dice terbaik yang dinilai ulang dengan difflib (skor akhir)
+RERANK_CANDIDATES = 3
+
+
+def _name_slug(name: str) -> str:
+    if name.lower().endswith((".md", ".txt", ".pdf", ".docx")):
+        name = name.rsplit(".", 1)[0]
+    return slugify(name)
+
+
+def trigrams(slug: str) -> Set[str]:
+    padded = f"^{slug}$"
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Indeks trigram atas nama file (di-slugify) untuk fuzzy matching cepat.
+
+    Pengganti ``difflib.get_close_matches`` yang membandingkan query dengan
+    seluruh listing: di sini kandidat diambil dari posting list trigram, lalu
+    hanya beberapa kandidat teratas yang dinilai ulang dengan
+    ``SequenceMatcher`` sehingga skor/cutoff tetap sebanding dengan
+    :func:`utils.helper.best_match`.
+    """
+
+    def __init__(self, names: Iterable[str] = ()):
+        self._ids: Dict[str, int] = {}
+        self._names: List[Optional[str]] = []
+        self._slugs: List[str] = []
+        self._grams: List[frozenset] = []
+        self._postings: Dict[str, Set[int]] = {}
+        self._free: List[int] = []
+        self._source: Optional[object] = None
+        self.update(names)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._ids
+
+    # ------------- maintenance ----------------------------------------
+    def add(self, name: str) -> None:
+        if name in self._ids:
+            return
+        slug = _name_slug(name)
+        grams = frozenset(trigrams(slug))
+        if self._free:
+            idx = self._free.pop()
+            self._names[idx], self._slugs[idx], self._grams[idx] = name, slug, grams
+        else:
+            idx = len(self._names)
+            self._names.append(name)
+            self._slugs.append(slug)
+            self._grams.append(grams)
+        self._ids[name] = idx
+        for g in grams:
+            self._postings.setdefault(g, set()).add(idx)
+
+    def remove(self, name: str) -> None:
+        idx = self._ids.pop(name, None)
+        if idx is None:
+            return
+        for g in self._grams[idx]:
+            posting = self._postings.get(g)
+            if posting is not None:
+                posting.discard(idx)
+                if not posting:
+                    del self._postings[g]
+        self._names[idx], self._slugs[idx], self._grams[idx] = None, "", frozenset()
+        self._free.append(idx)
+
+    def update(self, names: Iterable[str]) -> None:
+        """Sinkronkan indeks dengan listing terbaru secara inkremental.
+
+        Listing yang sama (objek identik) dilewati tanpa biaya; selain itu
+        hanya nama yang bertambah/hilang yang diproses.
+        """
+        if names is self._source:
+            return
+        self._source = names
+        wanted = set(names)
+        for name in [n for n in self._ids if n not in wanted]:
+            self.remove(name)
+        for name in wanted:
+            self.add(name)
+
+    # ------------- query ----------------------------------------------
+    def search(
+        self, query: str, k: int = 5, cutoff: float = 0.0
+    ) -> List[Tuple[str, float]]:
+        """Kembalikan hingga *k* pasangan (nama, skor) terurut dari yang terbaik.
+
+        *query* boleh berupa teks bebas atau slug; skor adalah rasio
+        ``SequenceMatcher`` antara slug query dan slug nama file.
+        """
+        q_slug = slugify(query)
+        if not q_slug or not self._ids:
+            return []
+
+        q_set = trigrams(q_slug)
+        q_grams = sorted(
+            (g for g in q_set if g in self._postings),
+            key=lambda g: len(self._postings[g]),
+        )
+        if not q_grams:
+            return []
+
+        # 1) Hitung-union atas trigram langka
+        counts: Counter = Counter()
+        budget = POSTING_BUDGET
+        for g in q_grams:
+            posting = self._postings[g]
+            if len(posting) > budget:
+                break
+            counts.update(posting)
+            budget -= len(posting)
+        candidates = {idx for idx, _ in counts.most_common(SHORTLIST_SIZE)}
+
+        # 2) Irisan progresif, untuk query yang trigramnya umum semua. Trigram
+        #    yang membuat irisan kosong (mis. typo) dilewati.
+        narrowed: Optional[Set[int]] = None
+        for g in q_grams:
+            nxt = (
+                self._postings[g] if narrowed is None else narrowed & self._postings[g]
+            )
+            if nxt:
+                narrowed = nxt
+            if narrowed is not None and len(narrowed) <= SHORTLIST_SIZE:
+                break
+        if narrowed and (not candidates or len(narrowed) <= SHORTLIST_SIZE):
+            candidates |= narrowed
+
+        # Dice = 2·|A∩B| / (|A|+|B|) menormalkan bias ke nama yang panjang
+        q_len = len(q_set)
+        grams = self._grams
+        shortlist = heapq.nlargest(
+            max(RERANK_CANDIDATES, k),
+            candidates,
+            key=lambda idx: 2 * len(q_set & grams[idx]) / (q_len + len(grams[idx])),
+        )
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(q_slug)
+        scored = []
+        for idx in shortlist:
+            matcher.set_seq1(self._slugs[idx])
+            if matcher.real_quick_ratio() >= cutoff and matcher.quick_ratio() >= cutoff:
+                score = matcher.ratio()
+                if score >= cutoff:
+                    scored.append((self._names[idx], score))
+        scored.sort(key=lambda item: -item[1])
+        return scored[:k]  # type: ignore[return-value]
+
+    def best_match(self, query: str, cutoff: float = 0.5) -> Optional[str]:
+        """Padanan :func:`utils.helper.best_match` berbasis indeks."""
+        hits = self.search(query, k=1, cutoff=cutoff)
+        return hits[0][0] if hits else None
@@ -1,56 +1,246 @@
 # utils/logger.py
 
+import atexit
+import itertools
+import json
 import logging
+import os
+import queue
+import random
 import sys
+import threading
 from pathlib import Path
-from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+from typing import Any, Dict, Optional
 
+from config.mcp_settings import MCPSettings
 
-def get_logger(name: str) -> logging.Logger:
+settings = MCPSettings()
+
+LOG_DIR = Path(__file__).resolve().parent.parent / "logs"
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+CONSOLE_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+# Batas argumen log: item per container & kedalaman (list history, payload)
+MAX_ITEMS = 20
+MAX_DEPTH = 3
+
+_lock = threading.Lock()
+_queue_handler: Optional["_CappedQueueHandler"] = None
+_listener: Optional[QueueListener] = None
+
+
+def _to_level(name: str, default: int = logging.INFO) -> int:
+    level = logging.getLevelName(name.strip().upper())
+    return level if isinstance(level, int) else default
+
+
+def _parse_levels(spec: str) -> Dict[str, int]:
+    """``"MCPClient=DEBUG,llm_gateway=WARNING"`` → {nama: level}."""
+    levels: Dict[str, int] = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = _to_level(level)
+    return levels
+
+
+_LEVELS = _parse_levels(settings.log_levels)
+_DEFAULT_LEVEL = _to_level(settings.log_level)
+
+
+def _level_for(name: str) -> int:
+    return _LEVELS.get(name, _LEVELS.get(name.split(".")[-1], _DEFAULT_LEVEL))
+
+
+def _cap(value: Any, depth: int = 0) -> Any:
+    """Salinan argumen yang dibatasi ukurannya; repr-nya dikerjakan listener.
+
+    String dipotong, container disalin dangkal (maks. ``MAX_ITEMS`` item per
+    level) sehingga biaya di thread pemanggil kecil dan mutasi objek asli
+    setelah log dipanggil tidak ikut tertulis.
+    """
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    limit = settings.log_max_arg_chars
+    if isinstance(value, str):
+        if len(value) <= limit:
+            return value
+        return f"{value[:limit]}…(+{len(value) - limit} chars)"
+    if depth < MAX_DEPTH:
+        if isinstance(value, (list, tuple)):
+            items = [_cap(v, depth + 1) for v in value[:MAX_ITEMS]]
+            if len(value) > MAX_ITEMS:
+                items.append(f"…(+{len(value) - MAX_ITEMS} items)")
+            return items
+        if isinstance(value, dict):
+            capped = {
+                k: _cap(v, depth + 1)
+                for k, v in itertools.islice(value.items(), MAX_ITEMS)
+            }
+            if len(value) > MAX_ITEMS:
+                capped["…"] = f"+{len(value) - MAX_ITEMS} keys"
+            return capped
+    return _cap(str(value), MAX_DEPTH)
+
+
+def _sampled(record: logging.LogRecord) -> bool:
+    """``logger.info(..., extra={"sample_rate": 0.1})`` → hanya ~10% yang ditulis."""
+    rate = getattr(record, "sample_rate", None)
+    return rate is None or random.random() < rate
+
+
+class _CappedQueueHandler(QueueHandler):
+    """Enqueue record tanpa memformat pesan di thread pemanggil.
+
+    Argumen dipotong (string) atau di-repr berbatas (objek lain) agar aman
+    diformat belakangan oleh listener; jika antrean penuh record dibuang
+    daripada memblokir request.
+    """
+
+    def __init__(self, q: "queue.Queue[logging.LogRecord]"):
+        super().__init__(q)
+        self.dropped = 0
+        self.addFilter(_sampled)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if isinstance(record.args, dict):
+            record.args = {k: _cap(v) for k, v in record.args.items()}
+        elif record.args:
+            record.args = tuple(_cap(a) for a in record.args)
+        if record.exc_info:
+            # Traceback harus diformat sekarang (objek frame tidak ikut antre)
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        tracing = sys.modules.get("utils.tracing")
+        if tracing is not None:
+            record.trace_id = tracing.current_trace_id()
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """Satu objek JSON per baris (mudah di-grep / dikirim ke log collector)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S")
+            + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+        }
+        if getattr(record, "trace_id", None):
+            payload["trace_id"] = record.trace_id
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class _ModuleFileHandler(logging.Handler):
+    """Di thread listener: arahkan record ke ``logs/<modul>.log`` masing-masing.
+
+    Rotating file handler dibuat lazily per nama file (bagian terakhir nama
+    logger), rotasi setiap tengah malam dengan retensi 90 hari.
     """
-    Mengembalikan logger dengan:
-    - File handler rotating harian, retention 90 hari.
-    - Console handler.
-    - Nama file log diambil dari bagian terakhir `name`.
+
+    def __init__(self, formatter: logging.Formatter):
+        super().__init__(logging.DEBUG)
+        self._formatter = formatter
+        self._files: Dict[str, TimedRotatingFileHandler] = {}
+
+    def emit(self, record: logging.LogRecord) -> None:
+        file_name = record.name.split(".")[-1] + ".log"
+        handler = self._files.get(file_name)
+        if handler is None:
+            handler = TimedRotatingFileHandler(
+                filename=LOG_DIR / file_name,
+                when="midnight",
+                interval=1,
+                backupCount=90,
+                encoding="utf-8",
+            )
+            handler.setFormatter(self._formatter)
+            self._files[file_name] = handler
+        handler.emit(record)
+
+    def close(self) -> None:
+        for handler in self._files.values():
+            handler.close()
+        super().close()
+
+
+def _start_listener(q: "queue.Queue[logging.LogRecord]") -> QueueListener:
+    file_handler = _ModuleFileHandler(
+        JsonFormatter() if settings.log_json else logging.Formatter(TEXT_FORMAT)
+    )
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setLevel(logging.INFO)
+    console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+
+    listener = QueueListener(
+        q, file_handler, console_handler, respect_handler_level=True
+    )
+    listener.start()
+    return listener
+
+
+def _start() -> "_CappedQueueHandler":
+    global _queue_handler, _listener
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+
+    q: "queue.Queue[logging.LogRecord]" = queue.Queue(settings.log_queue_size)
+    _queue_handler = _CappedQueueHandler(q)
+    _listener = _start_listener(q)
+    # Flush sisa antrean saat proses berhenti
+    atexit.register(lambda: _listener and _listener.stop())
+    return _queue_handler
+
+
+def _after_fork_in_child() -> None:
+    """Worker hasil fork (gunicorn ``preload_app``) tidak mewarisi thread
+    listener; buat antrean & listener baru (file dibuka ulang per proses)."""
+    global _listener, _lock
+    _lock = threading.Lock()
+    if _queue_handler is None:
+        return
+    q: "queue.Queue[logging.LogRecord]" = queue.Queue(settings.log_queue_size)
+    _queue_handler.queue = q
+    _listener = _start_listener(q)
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def get_logger(name: str) -> logging.Logger:
     """
-    # Tentukan folder logs
-    log_dir = Path(__file__).resolve().parent.parent / "logs"
-    log_dir.mkdir(parents=True, exist_ok=True)
+    Mengembalikan logger yang menulis lewat antrean ke thread listener:
+    - File ``logs/<bagian terakhir name>.log`` (JSON per baris, rotasi harian 90 hari).
+    - Console (INFO ke atas).
+    - Level per modul via env ``LOG_LEVELS`` (mis. ``MCPClient=DEBUG``),
+      default ``LOG_LEVEL``.
 
-    # Ambil nama modul / blueprint terakhir untuk nama file
-    file_name = name.split(".")[-1] + ".log"
-    log_file = log_dir / file_name
+    Pemanggil hanya membayar filter level + enqueue; format pesan dan I/O
+    disk dikerjakan listener. Gunakan argumen gaya ``%s`` (bukan f-string)
+    agar pesan yang levelnya tidak aktif tidak pernah diformat.
+    """
+    with _lock:
+        handler = _queue_handler or _start()
 
-    # Buat logger
     logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
+    logger.setLevel(_level_for(name))
     logger.propagate = False  # Hindari duplikasi handler
 
-    if not logger.handlers:
-        # Rotating file handler: setiap tengah malam, simpan 90 hari
-        file_handler = TimedRotatingFileHandler(
-            filename=log_file,
-            when="midnight",
-            interval=1,
-            backupCount=90,
-            encoding="utf-8",
-        )
-        file_handler.setLevel(logging.DEBUG)
-        file_formatter = logging.Formatter(
-            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-        )
-        file_handler.setFormatter(file_formatter)
-        logger.addHandler(file_handler)
-
-        # Console handler
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setLevel(logging.INFO)
-        console_formatter = logging.Formatter(
-            "%(asctime)s - %(levelname)s - %(message)s"
-        )
-        console_handler.setFormatter(console_formatter)
-        logger.addHandler(console_handler)
-
-        logger.debug(f"[Logger] Initialized '{name}', output → {log_file}")
+    if handler not in logger.handlers:
+        logger.handlers.clear()
+        logger.addHandler(handler)
+        logger.debug("[Logger] Initialized '%s'", name)
 
     return logger
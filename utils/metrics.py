@@ -0,0 +1,252 @@
+# utils/metrics.py
+
+from __future__ import annotations
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from utils.logger import get_logger
+
+logger = get_logger("metrics")
+
+# Detik; mencakup tool cepat (ms) s/d docgen panjang (menit)
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+    300.0,
+)
+
+LabelKey = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._functions: Dict[LabelKey, Callable[[], float]] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> LabelKey:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name}: label harus {self.labelnames}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: LabelKey, extra: str = "") -> str:
+        parts = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, key)]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def set_function(self, fn: Callable[[], float], **labels: Any) -> None:
+        """Nilai dibaca dari *fn* saat scrape (mis. counter milik objek lain)."""
+        self._functions[self._key(labels)] = fn
+
+    def _samples(self) -> List[Tuple[LabelKey, float]]:
+        with self._lock:
+            samples = list(self._values.items())  # type: ignore[attr-defined]
+        for key, fn in list(self._functions.items()):
+            try:
+                samples.append((key, float(fn())))
+            except Exception as e:
+                logger.debug("Metric %s gagal dibaca: %s", self.name, e)
+        return samples
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in self._samples():
+            lines.append(f"{self.name}{self._labels(key)} {_fmt(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, doc, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, doc, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_inprogress(self, **labels: Any) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        doc: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, doc, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key → [count per bucket (non-kumulatif) + overflow, sum]
+        self._values: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 2)
+            row[idx] += 1
+            row[-1] += value
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            rows = [(key, list(row)) for key, row in self._values.items()]
+        for key, row in rows:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), row[:-1]):
+                cumulative += count
+                le = f'le="{_fmt(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{self._labels(key, le)} {_fmt(cumulative)}"
+                )
+            lines.append(f"{self.name}_sum{self._labels(key)} {_fmt(row[-1])}")
+            lines.append(f"{self.name}_count{self._labels(key)} {_fmt(cumulative)}")
+        return lines
+
+
+class Registry:
+    """Kumpulan metric in-process, dirender dalam format teks Prometheus.
+
+    Operasi hot path hanya lock + penjumlahan dict, sehingga aman dibiarkan
+    aktif di produksi. Mendaftarkan nama yang sama dua kali mengembalikan
+    metric yang sudah ada (aman untuk reload modul / beberapa instance).
+    """
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} sudah terdaftar sebagai {metric.kind}")
+            return metric
+
+    def counter(self, name: str, doc: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, doc, labelnames)
+
+    def gauge(self, name: str, doc: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, doc, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        doc: str,
+        labelnames: Sequence[str] = (),
+        buckets: Optional[Sequence[float]] = None,
+    ) -> Histogram:
+        return self._get_or_create(
+            Histogram, name, doc, labelnames, buckets=buckets or DEFAULT_BUCKETS
+        )
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+
+def register_cache(name: str, cache: Any) -> None:
+    """Ekspos hit/miss objek cache (atribut ``hits``/``misses``) + rasio hit."""
+    requests = counter(
+        "projectwise_cache_requests_total",
+        "Lookup cache lokal per hasil",
+        ["cache", "result"],
+    )
+    requests.set_function(lambda: cache.hits, cache=name, result="hit")
+    requests.set_function(lambda: cache.misses, cache=name, result="miss")
+
+    def ratio() -> float:
+        total = cache.hits + cache.misses
+        return cache.hits / total if total else 0.0
+
+    gauge(
+        "projectwise_cache_hit_ratio", "Rasio hit cache lokal sejak start", ["cache"]
+    ).set_function(ratio, cache=name)
@@ -0,0 +1,123 @@
+# utils/multipart_stream.py
+
+import asyncio
+import hashlib
+from typing import AsyncIterator, BinaryIO, Dict, List, Optional, Tuple
+
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.sansio.multipart import (
+    NEED_DATA,
+    Data,
+    Epilogue,
+    Field,
+    File,
+    MultipartDecoder,
+)
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+MAX_FIELD_SIZE = 64 * 1024
+
+
+class StreamingUpload:
+    """Baca body multipart dari request secara bertahap tanpa spool ke memori.
+
+    Byte mentah diteruskan apa adanya (boundary & header part tetap utuh),
+    sementara parser inkremental mengamati field form dan part file. Field
+    biasa (``project_name``, ``pelanggan``, ...) dikirim browser sebelum file
+    sehingga bisa divalidasi lewat :meth:`read_head` sebelum upload dimulai.
+    """
+
+    def __init__(
+        self,
+        stream: BinaryIO,
+        boundary: str,
+        chunk_size: int = UPLOAD_CHUNK_SIZE,
+    ):
+        self._stream = stream
+        self._chunk_size = chunk_size
+        # Batas memori decoder berlaku per potongan data (termasuk isi file),
+        # jadi ukuran field dibatasi sendiri di _feed
+        self._decoder = MultipartDecoder(boundary.encode("latin-1"))
+        self._head: List[bytes] = []
+        self._part: Optional[Tuple[str, str]] = None
+        self._buf = bytearray()
+        self.fields: Dict[str, str] = {}
+        self.files: List[Tuple[str, str]] = []  # (nama field, filename)
+        self.bytes_read = 0
+        self.eof = False
+
+    @property
+    def filename(self) -> Optional[str]:
+        return self.files[0][1] if self.files else None
+
+    def _on_file_data(self, data: bytes) -> None:
+        """Hook untuk isi part file (mis. hashing); default tidak melakukan apa pun."""
+
+    def _feed(self, chunk: bytes) -> None:
+        self._decoder.receive_data(chunk or None)
+        while True:
+            event = self._decoder.next_event()
+            if event is NEED_DATA or isinstance(event, Epilogue):
+                break
+            if isinstance(event, File):
+                self._part = ("file", event.name)
+                self.files.append((event.name, event.filename))
+            elif isinstance(event, Field):
+                self._part = ("field", event.name)
+                self._buf.clear()
+            elif isinstance(event, Data) and self._part is not None:
+                kind, name = self._part
+                if kind == "file":
+                    self._on_file_data(event.data)
+                    continue
+                self._buf += event.data
+                if len(self._buf) > MAX_FIELD_SIZE:
+                    raise RequestEntityTooLarge()
+                if not event.more_data:
+                    self.fields[name] = self._buf.decode("utf-8", "replace")
+
+    async def _read_chunk(self) -> bytes:
+        chunk = await asyncio.to_thread(self._stream.read, self._chunk_size)
+        self.bytes_read += len(chunk)
+        self._feed(chunk)
+        if not chunk:
+            self.eof = True
+        return chunk
+
+    async def read_head(self) -> Dict[str, str]:
+        """Baca body sampai part file pertama dimulai; kembalikan field form."""
+        while not self.files and not self.eof:
+            chunk = await self._read_chunk()
+            if chunk:
+                self._head.append(chunk)
+        return self.fields
+
+    async def body(self) -> AsyncIterator[bytes]:
+        """Iterator byte mentah: potongan head yang sudah terbaca lalu sisa stream."""
+        for chunk in self._head:
+            yield chunk
+        self._head = []
+        while not self.eof:
+            chunk = await self._read_chunk()
+            if chunk:
+                yield chunk
+
+
+class HashingUpload(StreamingUpload):
+    """:class:`StreamingUpload` yang menghitung SHA-256 isi file sambil di-stream."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._sha = hashlib.sha256()
+        self.file_size = 0
+
+    def _on_file_data(self, data: bytes) -> None:
+        # Hanya part file pertama (endpoint upload menerima satu file)
+        if len(self.files) == 1:
+            self._sha.update(data)
+            self.file_size += len(data)
+
+    @property
+    def sha256(self) -> Optional[str]:
+        """Hex digest isi file; tersedia setelah body habis dibaca."""
+        return self._sha.hexdigest() if self.eof and self.files else None
@@ -0,0 +1,192 @@
+# utils/profiling.py
+
+from __future__ import annotations
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, ContextManager, Dict, Iterator, List, Optional, Tuple
+
+from utils.logger import get_logger
+from utils.event_loop import get_background_loop
+from config.mcp_settings import MCPSettings
+
+settings = MCPSettings()
+logger = get_logger("profiling")
+
+PROFILE_DIR = Path(settings.profile_dir)
+_TRACE_ID_RE = re.compile(r"^[0-9a-f]{4,32}$")
+# Frame teratas yang berarti thread sedang menunggu (I/O upstream, future)
+WAIT_FRAMES = {
+    ("selectors", "select"),
+    ("selectors", "EpollSelector.select"),
+    ("selectors", "KqueueSelector.select"),
+    ("threading", "wait"),
+    ("threading", "Condition.wait"),
+}
+
+_active = 0
+_active_lock = threading.Lock()
+_labels: Dict[Any, Tuple[str, str]] = {}
+
+
+def _frame_label(code) -> Tuple[str, str]:
+    label = _labels.get(code)
+    if label is None:
+        module = os.path.splitext(os.path.basename(code.co_filename))[0]
+        label = _labels[code] = (module, getattr(code, "co_qualname", code.co_name))
+    return label
+
+
+class _Sampler(threading.Thread):
+    """Ambil stack thread target setiap *interval* detik (statistical profiler).
+
+    Tidak memasang hook tracing pada interpreter, sehingga kode yang diprofil
+    berjalan dengan kecepatan normal; biayanya hanya satu thread yang bangun
+    ~200×/detik selama request yang diprofil.
+    """
+
+    def __init__(self, threads: Dict[str, int], interval: float):
+        super().__init__(name="projectwise-profiler", daemon=True)
+        self.threads = threads
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples: Counter = Counter()
+        self.waiting: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            for name, ident in self.threads.items():
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                top = _frame_label(frame.f_code)
+                stack: List[str] = []
+                while frame is not None:
+                    module, func = _frame_label(frame.f_code)
+                    stack.append(f"{module}:{func}")
+                    frame = frame.f_back
+                stack.append(name)
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples[name] += 1
+                if top in WAIT_FRAMES:
+                    self.waiting[name] += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+def should_profile(header_value: Optional[str] = None) -> bool:
+    """Profil request ini? (header ``X-Profile: 1`` atau ``profile_sample_rate``)."""
+    if settings.profile_header_enabled and header_value in ("1", "true", "yes"):
+        return True
+    rate = settings.profile_sample_rate
+    return rate > 0 and random.random() < rate
+
+
+def _self_time(stacks: Counter, limit: int = 15) -> List[Dict[str, Any]]:
+    leaf: Counter = Counter()
+    for stack, count in stacks.items():
+        thread, _, rest = stack.partition(";")
+        leaf[(thread, rest.rsplit(";", 1)[-1])] += count
+    return [
+        {"thread": t, "frame": f, "samples": n} for (t, f), n in leaf.most_common(limit)
+    ]
+
+
+def _purge(keep: int) -> None:
+    files = sorted(PROFILE_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime)
+    for path in files[:-keep] if keep else files:
+        for suffix in (".json", ".folded"):
+            path.with_suffix(suffix).unlink(missing_ok=True)
+
+
+def _save(trace_id: str, summary: Dict[str, Any], stacks: Counter) -> None:
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    # Format "folded stacks" (flamegraph.pl / speedscope / inferno)
+    folded = "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+    (PROFILE_DIR / f"{trace_id}.folded").write_text(folded, encoding="utf-8")
+    (PROFILE_DIR / f"{trace_id}.json").write_text(
+        json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8"
+    )
+    _purge(settings.profile_keep)
+
+
+@contextmanager
+def _profile(trace_id: str) -> Iterator[None]:
+    global _active
+    with _active_lock:
+        skip = _active >= settings.profile_max_concurrent
+        if not skip:
+            _active += 1
+    if skip:
+        # Body request dijalankan di luar lock
+        logger.info("Profil %s dilewati: batas profil paralel tercapai", trace_id)
+        yield
+        return
+
+    # Thread event loop request + background loop (dipakai bersama request lain)
+    threads = {"request": threading.get_ident()}
+    bg = get_background_loop()
+    if bg._thread is not None and bg._thread.ident != threads["request"]:
+        threads["bg-loop"] = bg._thread.ident  # type: ignore[assignment]
+
+    sampler = _Sampler(threads, settings.profile_interval_ms / 1000)
+    wall0, cpu0 = time.perf_counter(), time.thread_time()
+    sampler.start()
+    try:
+        yield
+    finally:
+        cpu_ms = (time.thread_time() - cpu0) * 1000
+        wall_ms = (time.perf_counter() - wall0) * 1000
+        sampler.stop()
+        with _active_lock:
+            _active -= 1
+
+        summary = {
+            "trace_id": trace_id,
+            "wall_ms": round(wall_ms, 1),
+            # CPU thread request saja; kerja di bg-loop hanya terlihat dari sampel
+            "cpu_ms": round(cpu_ms, 1),
+            "interval_ms": settings.profile_interval_ms,
+            "threads": {
+                name: {
+                    "samples": sampler.samples[name],
+                    "waiting_samples": sampler.waiting[name],
+                }
+                for name in threads
+            },
+            "top_self": _self_time(sampler.stacks),
+        }
+        try:
+            _save(trace_id, summary, sampler.stacks)
+        except OSError as e:
+            logger.warning("Gagal menyimpan profil %s: %s", trace_id, e)
+        else:
+            logger.info("Profil %s: wall=%.0fms cpu=%.0fms", trace_id, wall_ms, cpu_ms)
+
+
+def profiled(trace_id: str, enabled: bool) -> ContextManager[None]:
+    """Context manager profil; ``nullcontext`` (tanpa biaya) jika tidak aktif."""
+    if not enabled:
+        return nullcontext()
+    return _profile(trace_id)
+
+
+def load_profile(trace_id: str, folded: bool = False) -> Optional[str]:
+    if not _TRACE_ID_RE.match(trace_id):
+        return None
+    path = PROFILE_DIR / f"{trace_id}.{'folded' if folded else 'json'}"
+    try:
+        return path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,284 @@
+# utils/tracing.py
+
+from __future__ import annotations
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+from utils.logger import get_logger
+from config.mcp_settings import MCPSettings
+
+settings = MCPSettings()
+logger = get_logger("tracing")
+
+# Span aktif di context saat ini (ikut ke task asyncio & BackgroundLoop.run)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("trace_span", default=None)
+RECENT_TRACES = 200
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:8]
+
+
+class Span:
+    """Satu unit kerja bertimer di dalam trace (mis. panggilan LLM, tool, state)."""
+
+    __slots__ = (
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "name",
+        "start",
+        "end",
+        "status",
+        "attrs",
+        "_on_end",
+    )
+
+    def __init__(
+        self,
+        trace_id: str,
+        name: str,
+        parent_id: Optional[str] = None,
+        start: Optional[float] = None,
+        attrs: Optional[Dict[str, Any]] = None,
+    ):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:12]
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.time() if start is None else start
+        self.end: Optional[float] = None
+        self.status = "ok"
+        self.attrs: Dict[str, Any] = dict(attrs or {})
+        self._on_end: List[Callable[[float], None]] = []
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def on_end(self, fn: Callable[[float], None]) -> None:
+        """Panggil *fn(end_time)* tepat sebelum span ini ditutup."""
+        self._on_end.append(fn)
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.end is None:
+            return None
+        return round((self.end - self.start) * 1000, 2)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "attrs": self.attrs,
+        }
+
+
+class _NoopSpan:
+    """Dipakai jika tidak ada trace aktif / tracing dimatikan."""
+
+    trace_id = None
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+    def on_end(self, fn: Callable[[float], None]) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class JsonlSpanSink:
+    """Tulis span ke file JSONL lokal (satu baris per span) dengan rotasi ukuran.
+
+    Ringkasan root span terbaru juga disimpan di memori untuk halaman daftar.
+    """
+
+    def __init__(self, path: str | Path, max_bytes: int):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=RECENT_TRACES)
+
+    def _rotate(self) -> None:
+        try:
+            if self.path.stat().st_size < self.max_bytes:
+                return
+        except FileNotFoundError:
+            return
+        os.replace(self.path, self.path.with_name(self.path.name + ".1"))
+
+    def write(self, span: Span) -> None:
+        record = span.to_dict()
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            try:
+                self._rotate()
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+            except OSError as e:
+                logger.warning("Gagal menulis span %s: %s", span.name, e)
+            if span.parent_id is None:
+                self._recent.append(record)
+
+    def read(self, trace_id: str) -> List[Dict[str, Any]]:
+        """Semua span milik *trace_id*, urut waktu mulai."""
+        spans: List[Dict[str, Any]] = []
+        needle = f'"trace_id": "{trace_id}"'
+        for path in (self.path.with_name(self.path.name + ".1"), self.path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    for line in f:
+                        if needle in line:
+                            spans.append(json.loads(line))
+            except (OSError, ValueError):
+                continue
+        return sorted(spans, key=lambda s: s["start"])
+
+    def recent(self) -> List[Dict[str, Any]]:
+        return list(reversed(self._recent))
+
+
+class Tracer:
+    def __init__(self, sink: Optional[JsonlSpanSink], enabled: bool = True):
+        self.sink = sink
+        self.enabled = enabled and sink is not None
+
+    def _finish(self, span: Span, end: Optional[float] = None) -> None:
+        end = time.time() if end is None else end
+        for fn in span._on_end:
+            try:
+                fn(end)
+            except Exception as e:
+                logger.debug("Callback akhir span %s gagal: %s", span.name, e)
+        span.end = end
+        self.sink.write(span)  # type: ignore[union-attr]
+
+    @contextmanager
+    def span(
+        self, name: str, *, trace_id: Optional[str] = None, **attrs: Any
+    ) -> Iterator[Any]:
+        """Buka span anak dari span aktif; ``trace_id`` memulai trace (root) baru.
+
+        Tanpa trace aktif (mis. task latar belakang) span tidak dicatat.
+        """
+        parent = _current_span.get()
+        if not self.enabled or (parent is None and trace_id is None):
+            yield _NOOP
+            return
+
+        span = Span(
+            trace_id or parent.trace_id,  # type: ignore[union-attr]
+            name,
+            parent_id=None if trace_id else parent.span_id,  # type: ignore[union-attr]
+            attrs=attrs,
+        )
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.attrs["error"] = f"{type(e).__name__}: {e}"[:300]
+            raise
+        finally:
+            _current_span.reset(token)
+            self._finish(span)
+
+    def record(self, name: str, start: float, end: float, **attrs: Any) -> None:
+        """Catat span anak yang waktunya sudah diketahui (retroaktif)."""
+        parent = _current_span.get()
+        if not self.enabled or parent is None:
+            return
+        span = Span(
+            parent.trace_id, name, parent_id=parent.span_id, start=start, attrs=attrs
+        )
+        self._finish(span, end)
+
+
+class Timeline:
+    """Segmen berurutan dalam satu span (mis. state pipeline docgen).
+
+    ``mark(label)`` menutup segmen sebelumnya dan membuka segmen baru; segmen
+    terakhir ditutup otomatis saat span induknya selesai.
+    """
+
+    def __init__(self, name: str, tracer: Optional[Tracer] = None):
+        self.name = name
+        self._tracer = tracer or get_tracer()
+        self._label: Optional[str] = None
+        self._attrs: Dict[str, Any] = {}
+        self._start = 0.0
+        self._parent = _current_span.get()
+        if self._parent is not None:
+            self._parent.on_end(self._close)
+
+    def mark(self, label: str, **attrs: Any) -> None:
+        if label == self._label:
+            return
+        now = time.time()
+        self._close(now)
+        self._label, self._attrs, self._start = label, attrs, now
+
+    def _close(self, end: float) -> None:
+        if self._label is None or self._parent is None:
+            return
+        token = _current_span.set(self._parent)
+        try:
+            self._tracer.record(
+                f"{self.name} {self._label}", self._start, end, **self._attrs
+            )
+        finally:
+            _current_span.reset(token)
+        self._label = None
+
+
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Tracer:
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer(
+            JsonlSpanSink(settings.trace_file, settings.trace_max_mb * 1024 * 1024),
+            enabled=settings.trace_enabled,
+        )
+    return _tracer
+
+
+def span(name: str, **attrs: Any):
+    """``with span("tool.call", tool=name) as s: ...`` — shortcut tracer global."""
+    return get_tracer().span(name, **attrs)
+
+
+def current_trace_id() -> Optional[str]:
+    current = _current_span.get()
+    return current.trace_id if current is not None else None
+
+
+def traced(name: str):
+    """Dekorator: bungkus coroutine function dalam satu span."""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator